@@ -2,6 +2,8 @@
 Script principal pour générer les résultats et préparer la soutenance
 """
 
+import argparse
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -10,8 +12,25 @@ from supernutriscore import (
     NutriScore, ElectreTri, AnalyseResultats,
     creer_profils_limites, definir_poids_criteres
 )
+from ingestion import charger_base, preparer_export
+from instrumentation import etape, trace
+from stockage import StockageSQLite
+from calibration import calibrer, valider
+
+# Coca-Cola 0,5 L
+CODE_PRODUIT_TEST = 54491472
+
 
-def main():
+@trace('analyser_donnees.main')
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Analyse complète de la base de boissons")
+    parser.add_argument('--calibrer', action='store_true',
+                        help="Calibre aussi poids, profils et λ sur les labels Nutri-Score "
+                             "(validation croisée)")
+    parser.add_argument('--plis', type=int, default=5,
+                        help="Plis de la validation croisée de la calibration")
+    args = parser.parse_args(arguments)
+    
     print("=" * 80)
     print("SUPERNUTRISCORE - Analyse complète")
     print("=" * 80)
@@ -19,8 +38,8 @@ def main():
     
     # 1. Chargement des données
     print("📂 Chargement de la base de données...")
-    df = pd.read_csv('base_donnees_boissons.csv', encoding='utf-8')
-    df.columns = df.columns.str.strip()
+    base = charger_base('base_donnees_boissons.csv')
+    df = base.dataframe()
     print(f"✓ {len(df)} produits chargés")
     print()
     
@@ -31,7 +50,7 @@ def main():
     print(f"\nDistribution des labels Nutri-Score:")
     print(df['Label_Nutriscore'].value_counts().sort_index())
     print(f"\nNombre de catégories: {df['Categorie'].nunique()}")
-    print(f"Produits BIO: {(df['Label_Bio'] == 'OUI').sum()} ({(df['Label_Bio'] == 'OUI').sum()/len(df)*100:.1f}%)")
+    print(f"Produits BIO: {df['Label_Bio'].sum()} ({df['Label_Bio'].mean()*100:.1f}%)")
     print()
     
     # 3. Vérification du calcul Nutri-Score
@@ -39,7 +58,7 @@ def main():
     print("-" * 80)
     
     # Test avec un produit de la base
-    produit_test = df.iloc[6]  # Coca Cola
+    produit_test = df.iloc[base.position(CODE_PRODUIT_TEST)]
     print(f"Produit test: {produit_test['Nom_Produit']}")
     print(f"Marque: {produit_test['Marque']}")
     
@@ -59,6 +78,11 @@ def main():
     print(f"  Score base de données: {produit_test['Score_Nutriscore']}")
     print(f"  Label base de données: {produit_test['Label_Nutriscore']}")
     print(f"  ✓ Concordance: {resultat['label'] == produit_test['Label_Nutriscore']}")
+    
+    # Vérification sur toute la base (calcul vectorisé)
+    scores_lot = NutriScore.scorer_lot(df)
+    concordance_base = (scores_lot['label'] == df['Label_Nutriscore']).mean()
+    print(f"  ✓ Concordance sur toute la base: {concordance_base:.1%}")
     print()
     
     # 4. Création des profils ELECTRE TRI
@@ -79,10 +103,22 @@ def main():
         print(f"  {crit}: {poids_val:.2f}")
     print()
     
+    # Concordances calculées une seule fois pour tous les couples (λ, procédure)
+    electre = ElectreTri(poids, profils)
+    balayage = electre.balayer_lambdas(df, [0.6, 0.7])
+    classes_balayage = balayage.set_index(['Lambda', 'Methode', 'Produit'])['Classe'].sort_index()
+    
+    def classification(lambda_val, methode):
+        """Labels Nutri-Score et classe obtenue pour un couple (λ, procédure)"""
+        classes = classes_balayage.loc[(lambda_val, methode)]
+        return pd.DataFrame({
+            'Label_Nutriscore': df['Label_Nutriscore'],
+            f'Classe_ELECTRE_{methode.capitalize()}': classes
+        })
+    
     # Procédure pessimiste
     print("Procédure PESSIMISTE:")
-    electre_pess = ElectreTri(poids, profils, lambda_seuil=0.6)
-    df_pess_06 = electre_pess.classifier_base_donnees(df, 'pessimiste')
+    df_pess_06 = classification(0.6, 'pessimiste')
     
     print("Distribution des classes:")
     print(df_pess_06['Classe_ELECTRE_Pessimiste'].value_counts().sort_index())
@@ -103,8 +139,7 @@ def main():
     
     # Procédure optimiste
     print("Procédure OPTIMISTE:")
-    electre_opt = ElectreTri(poids, profils, lambda_seuil=0.6)
-    df_opt_06 = electre_opt.classifier_base_donnees(df, 'optimiste')
+    df_opt_06 = classification(0.6, 'optimiste')
     
     print("Distribution des classes:")
     print(df_opt_06['Classe_ELECTRE_Optimiste'].value_counts().sort_index())
@@ -128,8 +163,7 @@ def main():
     
     # Procédure pessimiste
     print("Procédure PESSIMISTE:")
-    electre_pess_07 = ElectreTri(poids, profils, lambda_seuil=0.7)
-    df_pess_07 = electre_pess_07.classifier_base_donnees(df, 'pessimiste')
+    df_pess_07 = classification(0.7, 'pessimiste')
     
     print("Distribution des classes:")
     print(df_pess_07['Classe_ELECTRE_Pessimiste'].value_counts().sort_index())
@@ -146,8 +180,7 @@ def main():
     
     # Procédure optimiste
     print("Procédure OPTIMISTE:")
-    electre_opt_07 = ElectreTri(poids, profils, lambda_seuil=0.7)
-    df_opt_07 = electre_opt_07.classifier_base_donnees(df, 'optimiste')
+    df_opt_07 = classification(0.7, 'optimiste')
     
     print("Distribution des classes:")
     print(df_opt_07['Classe_ELECTRE_Optimiste'].value_counts().sort_index())
@@ -162,6 +195,25 @@ def main():
     print(f"\nAccuracy: {metriques_opt_07['accuracy']:.2%}")
     print()
     
+    # Calibration des poids, profils et λ sur les labels Nutri-Score (--calibrer)
+    # Elle ajuste une quarantaine de valeurs sur ces mêmes labels : seule
+    # l'accuracy de validation croisée entre dans la comparaison.
+    if args.calibrer:
+        print("🎯 Calibration ELECTRE TRI sur les labels Nutri-Score (pessimiste)")
+        print("-" * 80)
+        
+        validation = valider(df, poids, profils, methode='pessimiste', n_plis=args.plis)
+        print(f"Accuracy en validation croisée ({args.plis} plis): "
+              f"{validation['score_initial']:.2%} -> {validation['score_validation']:.2%}")
+        calibrage = calibrer(df, poids, profils, methode='pessimiste')
+        print(f"Accuracy en échantillon (toute la base): {calibrage['score_initial']:.2%} "
+              f"-> {calibrage['score']:.2%} ({len(calibrage['historique'])} ajustements, "
+              f"λ={calibrage['lambda_seuil']:.2f})")
+        print("Poids calibrés:")
+        for critere, poids_critere in calibrage['poids'].items():
+            print(f"  {critere}: {poids_critere:.3f}")
+        print()
+    
     # 7. Comparaison des méthodes
     print("📊 Comparaison des méthodes")
     print("-" * 80)
@@ -180,6 +232,11 @@ def main():
             metriques_opt_07['accuracy']
         ]
     })
+    if args.calibrer:
+        comparaison.loc[len(comparaison)] = [
+            f"ELECTRE TRI Pessimiste calibré (validation croisée {args.plis} plis)",
+            validation['score_validation']
+        ]
     
     print(comparaison.to_string(index=False))
     print()
@@ -189,15 +246,17 @@ def main():
     print("-" * 80)
     
     # Ajouter toutes les colonnes de classification au DataFrame original
-    df_final = df.copy()
-    df_final['Classe_ELECTRE_Pessimiste_06'] = df_pess_06['Classe_ELECTRE_Pessimiste']
-    df_final['Classe_ELECTRE_Optimiste_06'] = df_opt_06['Classe_ELECTRE_Optimiste']
-    df_final['Classe_ELECTRE_Pessimiste_07'] = df_pess_07['Classe_ELECTRE_Pessimiste']
-    df_final['Classe_ELECTRE_Optimiste_07'] = df_opt_07['Classe_ELECTRE_Optimiste']
+    df_final = preparer_export(df).assign(
+        Classe_ELECTRE_Pessimiste_06=df_pess_06['Classe_ELECTRE_Pessimiste'],
+        Classe_ELECTRE_Optimiste_06=df_opt_06['Classe_ELECTRE_Optimiste'],
+        Classe_ELECTRE_Pessimiste_07=df_pess_07['Classe_ELECTRE_Pessimiste'],
+        Classe_ELECTRE_Optimiste_07=df_opt_07['Classe_ELECTRE_Optimiste']
+    )
     
     # Sauvegarder
     output_file = 'resultats_complets.xlsx'
-    df_final.to_excel(output_file, index=False)
+    with etape('export.excel', lignes=len(df_final), fichier=output_file):
+        df_final.to_excel(output_file, index=False)
     print(f"✓ Résultats sauvegardés dans: {output_file}")
     
     # Sauvegarder les profils
@@ -207,7 +266,7 @@ def main():
     
     # Sauvegarder les matrices de confusion
     matrices_file = 'matrices_confusion.xlsx'
-    with pd.ExcelWriter(matrices_file) as writer:
+    with etape('export.excel', fichier=matrices_file), pd.ExcelWriter(matrices_file) as writer:
         matrice_pess_06.to_excel(writer, sheet_name='Pessimiste_06')
         matrice_opt_06.to_excel(writer, sheet_name='Optimiste_06')
         matrice_pess_07.to_excel(writer, sheet_name='Pessimiste_07')
@@ -218,6 +277,31 @@ def main():
     comparaison_file = 'comparaison_methodes.csv'
     comparaison.to_csv(comparaison_file, index=False)
     print(f"✓ Comparaison sauvegardée dans: {comparaison_file}")
+    
+    # Base SQLite : produits, Nutri-Scores calculés et les 4 classifications
+    stockage_file = 'supernutriscore.db'
+    classifications = {
+        (0.6, 'pessimiste'): df_pess_06['Classe_ELECTRE_Pessimiste'],
+        (0.6, 'optimiste'): df_opt_06['Classe_ELECTRE_Optimiste'],
+        (0.7, 'pessimiste'): df_pess_07['Classe_ELECTRE_Pessimiste'],
+        (0.7, 'optimiste'): df_opt_07['Classe_ELECTRE_Optimiste']
+    }
+    with etape('export.sqlite', lignes=len(df), fichier=stockage_file), \
+            StockageSQLite(stockage_file) as stockage:
+        stockage.importer_produits(df, base.meta['empreinte'])
+        stockage.enregistrer_scores(df['ID'], scores_lot['score'], scores_lot['label'])
+        executions = {
+            (lambda_val, methode): stockage.enregistrer_execution(
+                poids, lambda_val, methode, classes, profils, ids=df['ID'])
+            for (lambda_val, methode), classes in classifications.items()
+        }
+        
+        # Sous-ensemble lu par requête sur index, sans parcourir la base
+        labels_classe_e = stockage.compter('Label_Nutriscore', classe="E'",
+                                           execution=executions[(0.6, 'pessimiste')])
+    print(f"✓ Base SQLite sauvegardée dans: {stockage_file}")
+    print("  Labels Nutri-Score des produits classés E' (pessimiste, λ=0.6): "
+          + ', '.join(f"{label}: {n}" for label, n in labels_classe_e.items()))
     print()
     
     # 9. Génération de visualisations
@@ -233,8 +317,9 @@ def main():
     ax.set_xlabel('Label', fontsize=12)
     ax.set_ylabel('Nombre de produits', fontsize=12)
     ax.set_xticklabels(ax.get_xticklabels(), rotation=0)
-    plt.tight_layout()
-    plt.savefig('distribution_nutriscore.png', dpi=300, bbox_inches='tight')
+    with etape('graphique', fichier='distribution_nutriscore.png'):
+        plt.tight_layout()
+        plt.savefig('distribution_nutriscore.png', dpi=300, bbox_inches='tight')
     print("✓ Graphique 1 sauvegardé: distribution_nutriscore.png")
     plt.close()
     
@@ -244,8 +329,9 @@ def main():
     ax.set_title('Matrice de confusion - ELECTRE TRI Pessimiste (λ=0.6)', fontsize=14, fontweight='bold')
     ax.set_xlabel('ELECTRE TRI', fontsize=12)
     ax.set_ylabel('Nutri-Score', fontsize=12)
-    plt.tight_layout()
-    plt.savefig('matrice_confusion_pessimiste_06.png', dpi=300, bbox_inches='tight')
+    with etape('graphique', fichier='matrice_confusion_pessimiste_06.png'):
+        plt.tight_layout()
+        plt.savefig('matrice_confusion_pessimiste_06.png', dpi=300, bbox_inches='tight')
     print("✓ Graphique 2 sauvegardé: matrice_confusion_pessimiste_06.png")
     plt.close()
     
@@ -267,8 +353,9 @@ def main():
                 f'{comparaison["Accuracy"].iloc[i]:.1%}',
                 ha='center', va='bottom', fontsize=10, fontweight='bold')
     
-    plt.tight_layout()
-    plt.savefig('comparaison_accuracies.png', dpi=300, bbox_inches='tight')
+    with etape('graphique', fichier='comparaison_accuracies.png'):
+        plt.tight_layout()
+        plt.savefig('comparaison_accuracies.png', dpi=300, bbox_inches='tight')
     print("✓ Graphique 3 sauvegardé: comparaison_accuracies.png")
     plt.close()
     
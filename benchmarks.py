@@ -0,0 +1,364 @@
+"""
+Benchmarks de SuperNutriScore
+Temps de chaque étape (Nutri-Score, profils, ELECTRE TRI, balayage de lambda,
+matrices de confusion) pour des bases de 1e3 à 1e6 produits (1e7 sur demande),
+résultats en JSON et comparaison à une référence pour détecter les régressions
+
+Exemples :
+    python benchmarks.py executer --tailles 1e3 1e4 1e5 --sortie reference.json
+    python benchmarks.py executer --tailles 1e6 1e7 --sortie grandes_bases.json
+    python benchmarks.py executer --sortie nouveau.json --comparer-a reference.json
+    python benchmarks.py comparer reference.json nouveau.json --tolerance 0.15
+
+Les bases de test sont générées par generateur_synthetique.py, ajusté sur
+base_donnees_boissons.csv : aucun accès réseau n'est nécessaire.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from supernutriscore import (
+    NutriScore, ElectreTri, AnalyseResultats,
+    creer_profils_limites, definir_poids_criteres
+)
+from ingestion import charger_dataframe
+import nutriscore_coeur
+from generateur_synthetique import ModeleSynthetique
+
+
+# Tailles par défaut : pic mémoire d'environ 600 Mo à 1e6 produits. Une base
+# de 1e7 produits demande environ 6 Go : à demander avec --tailles.
+TAILLES = (1_000, 10_000, 100_000, 1_000_000)
+
+# Seuils de lambda du balayage
+LAMBDAS = tuple(np.round(np.arange(0.5, 1.0001, 0.05), 2))
+
+# Au-delà, le calcul scalaire est mesuré sur un échantillon puis extrapolé
+LIMITE_SCALAIRE = 20_000
+
+# Une étape plus longue que cette durée n'est pas répétée
+DUREE_MAX_REPETITION = 10.0
+
+# Produits générés par bloc (mémoire de génération bornée)
+TAILLE_BLOC_GENERATION = 1_000_000
+
+
+def generer_base(source: pd.DataFrame, n: int, graine: int = 0) -> pd.DataFrame:
+    """
+    Base de n produits synthétiques suivant la loi jointe des critères de la
+    base source (par catégorie, voir generateur_synthetique.py)
+    """
+    modele = ModeleSynthetique.ajuster(source)
+    return pd.concat(modele.generer_flux(n, TAILLE_BLOC_GENERATION, graine),
+                     ignore_index=True)
+
+
+def chronometrer(fonction: Callable, repetitions: int) -> float:
+    """Meilleur temps (en secondes) sur plusieurs exécutions"""
+    meilleur = np.inf
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        duree = time.perf_counter() - debut
+        meilleur = min(meilleur, duree)
+        if duree > DUREE_MAX_REPETITION:
+            break
+    return meilleur
+
+
+def points_reference(valeur: float, table: list) -> int:
+    """Points d'une valeur, table parcourue ligne à ligne (calcul d'origine)"""
+    for seuil, points in table:
+        if valeur < seuil:
+            return points
+    return table[-1][1]
+
+
+def score_reference(energie_kj: float, acides_gras_satures: float, sucres: float,
+                    sodium: float, proteines: float, fibres: float,
+                    fruits_legumes: float) -> Dict:
+    """
+    Copie figée de NutriScore.calculer_score_nutritionnel avant le cœur en
+    Python pur (nutriscore_coeur) : référence des étapes scalaires
+    """
+    points_energie = points_reference(energie_kj, nutriscore_coeur.ENERGIE_POINTS)
+    points_ag_sat = points_reference(acides_gras_satures,
+                                     nutriscore_coeur.ACIDES_GRAS_SATURES_POINTS)
+    points_sucres = points_reference(sucres, nutriscore_coeur.SUCRES_POINTS)
+    points_sodium = points_reference(sodium, nutriscore_coeur.SODIUM_POINTS)
+    
+    score_negatif = points_energie + points_ag_sat + points_sucres + points_sodium
+    
+    points_proteines = points_reference(proteines, nutriscore_coeur.PROTEINES_POINTS)
+    points_fibres = points_reference(fibres, nutriscore_coeur.FIBRES_POINTS)
+    points_fruits_legumes = points_reference(fruits_legumes,
+                                             nutriscore_coeur.FRUITS_LEGUMES_POINTS)
+    
+    if score_negatif >= 11 and fruits_legumes < 80:
+        score_positif = points_fibres + points_fruits_legumes
+        proteines_comptees = False
+    else:
+        score_positif = points_proteines + points_fibres + points_fruits_legumes
+        proteines_comptees = True
+    
+    score_final = score_negatif - score_positif
+    
+    label = 'E'
+    for min_val, max_val, classe, couleur in nutriscore_coeur.CLASSES:
+        if min_val <= score_final <= max_val:
+            label = classe
+            break
+    
+    return {
+        'score': score_final,
+        'label': label,
+        'details': {
+            'score_negatif': score_negatif,
+            'score_positif': score_positif,
+            'points_energie': points_energie,
+            'points_acides_gras_satures': points_ag_sat,
+            'points_sucres': points_sucres,
+            'points_sodium': points_sodium,
+            'points_proteines': points_proteines if proteines_comptees else 0,
+            'points_fibres': points_fibres,
+            'points_fruits_legumes': points_fruits_legumes,
+            'proteines_comptees': proteines_comptees
+        }
+    }
+
+
+def nutriscore_reference(lignes: list):
+    """Nutri-Score produit par produit avec le calcul d'origine (score_reference)"""
+    for ligne in lignes:
+        score_reference(*ligne)
+
+
+def nutriscore_scalaire(lignes: list):
+    """Nutri-Score produit par produit (résultat en dict)"""
+    for ligne in lignes:
+        NutriScore.calculer_score_nutritionnel(*ligne)
+
+
+def nutriscore_coeur_scalaire(lignes: list):
+    """Nutri-Score produit par produit avec le cœur en Python pur"""
+    scorer = nutriscore_coeur.scorer
+    for ligne in lignes:
+        scorer(*ligne)
+
+
+def mesurer_import(module: str, repetitions: int = 5) -> Dict:
+    """Temps d'import à froid d'un module (nouvel interpréteur à chaque mesure)"""
+    code = ("import time; debut = time.perf_counter(); "
+            f"import {module}; print(time.perf_counter() - debut)")
+    dossier = os.path.dirname(os.path.abspath(__file__))
+    secondes = min(
+        float(subprocess.run([sys.executable, '-c', code], cwd=dossier, check=True,
+                             capture_output=True, text=True).stdout)
+        for _ in range(max(repetitions, 1))
+    )
+    print(f"  import_{module:<15} {secondes * 1e3:10.1f} ms", file=sys.stderr)
+    return {'etape': f'import_{module}', 'n': 1, 'secondes': secondes,
+            'par_produit': secondes, 'extrapole': False}
+
+
+def mesurer_taille(source: pd.DataFrame, n: int, repetitions: int = 3,
+                   graine: int = 0) -> List[Dict]:
+    """
+    Mesure toutes les étapes pour une base de n produits
+    
+    Returns:
+        Liste de résultats {etape, n, secondes, par_produit, extrapole}
+    """
+    df = generer_base(source, n, graine)
+    poids = definir_poids_criteres()
+    resultats = []
+    
+    def enregistrer(etape: str, fonction: Callable, n_mesure: int = n):
+        secondes = chronometrer(fonction, repetitions)
+        # Temps ramené à la base complète si seul un échantillon a été traité
+        secondes_total = secondes * n / n_mesure
+        resultats.append({
+            'etape': etape,
+            'n': n,
+            'secondes': secondes_total,
+            'par_produit': secondes_total / n,
+            'extrapole': n_mesure < n
+        })
+        print(f"  {etape:<22} n={n:>10,}  {secondes_total:10.4f} s"
+              + ("  (extrapolé)" if n_mesure < n else ""), file=sys.stderr)
+    
+    # Valeurs Python (float) comme les reçoit un service produit par produit
+    echantillon = df[list(NutriScore.COLONNES_LOT.values())].iloc[:min(n, LIMITE_SCALAIRE)]
+    lignes = [tuple(ligne) for ligne in echantillon.to_numpy(dtype=float).tolist()]
+    enregistrer('nutriscore_reference', lambda: nutriscore_reference(lignes), len(lignes))
+    enregistrer('nutriscore_scalaire', lambda: nutriscore_scalaire(lignes), len(lignes))
+    enregistrer('nutriscore_coeur', lambda: nutriscore_coeur_scalaire(lignes), len(lignes))
+    enregistrer('nutriscore_lot', lambda: NutriScore.scorer_lot(df))
+    enregistrer('profils', lambda: creer_profils_limites(df))
+    
+    profils = creer_profils_limites(df)
+    electre = ElectreTri(poids, profils)
+    
+    enregistrer('concordances', lambda: electre.concordances_lot(df))
+    enregistrer('electre_pessimiste', lambda: electre.classifier_base_donnees(df, 'pessimiste'))
+    enregistrer('electre_optimiste', lambda: electre.classifier_base_donnees(df, 'optimiste'))
+    
+    def balayage():
+        ruptures = electre.points_rupture_lambda(df)
+        for lambda_seuil in LAMBDAS:
+            for methode in ('pessimiste', 'optimiste'):
+                ruptures.classes_pour(lambda_seuil, methode)
+    
+    enregistrer('balayage_lambda', balayage)
+    
+    classes = electre.classifier_base_donnees(df, 'pessimiste')
+    
+    def confusion():
+        matrice = AnalyseResultats.matrice_confusion(df['Label_Nutriscore'], classes)
+        AnalyseResultats.calculer_metriques(matrice)
+    
+    enregistrer('matrice_confusion', confusion)
+    
+    return resultats
+
+
+def environnement() -> Dict:
+    """Description de la machine et des versions (pour comparer à bon escient)"""
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'systeme': platform.platform(),
+        'processeur': platform.processor() or platform.machine(),
+        'coeurs': os.cpu_count()
+    }
+
+
+def executer(tailles=TAILLES, repetitions: int = 3, graine: int = 0,
+             source: str = 'base_donnees_boissons.csv') -> Dict:
+    """
+    Lance la suite complète
+    
+    Returns:
+        Dict {environnement, parametres, resultats}
+    """
+    base = charger_dataframe(source)
+    resultats = [mesurer_import(module, repetitions)
+                 for module in ('nutriscore_coeur', 'supernutriscore')]
+    for n in tailles:
+        resultats.extend(mesurer_taille(base, int(n), repetitions, graine))
+    
+    return {
+        'environnement': environnement(),
+        'parametres': {'tailles': [int(n) for n in tailles],
+                       'repetitions': repetitions, 'graine': graine},
+        'resultats': resultats
+    }
+
+
+def comparer(reference: Dict, nouveau: Dict, tolerance: float = 0.10,
+             seuil_absolu: float = 0.005) -> pd.DataFrame:
+    """
+    Compare deux séries de résultats, étape par étape et taille par taille
+    
+    Une régression est signalée lorsque le nouveau temps dépasse la référence
+    de plus de tolerance (en relatif) et de plus de seuil_absolu secondes
+    (les écarts de quelques millisecondes relèvent du bruit de mesure). Une
+    mesure de la référence absente des nouveaux résultats (étape supprimée
+    ou qui a échoué) est signalée comme manquante ; une mesure nouvelle est
+    seulement affichée.
+    
+    Returns:
+        DataFrame etape, n, reference, nouveau, ratio, regression, manquant
+    """
+    cles = ['etape', 'n']
+    ancien = pd.DataFrame(reference['resultats'], columns=cles + ['secondes'])
+    recent = pd.DataFrame(nouveau['resultats'], columns=cles + ['secondes'])
+    
+    table = ancien.merge(recent, on=cles, how='outer', suffixes=('_reference', '_nouveau'))
+    table = table.rename(columns={'secondes_reference': 'reference',
+                                  'secondes_nouveau': 'nouveau'})
+    table['ratio'] = table['nouveau'] / table['reference']
+    table['regression'] = ((table['ratio'] > 1 + tolerance)
+                           & (table['nouveau'] - table['reference'] > seuil_absolu))
+    table['manquant'] = table['reference'].notna() & table['nouveau'].isna()
+    
+    return table
+
+
+def afficher_comparaison(table: pd.DataFrame):
+    """Affiche la comparaison et le nombre de régressions"""
+    print(table.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    n_regressions = int(table['regression'].sum())
+    n_manquants = int(table['manquant'].sum())
+    if n_regressions:
+        print(f"\n⚠️  {n_regressions} régression(s) détectée(s)")
+    if n_manquants:
+        print(f"\n⚠️  {n_manquants} mesure(s) de la référence absente(s) des nouveaux résultats")
+    if not n_regressions and not n_manquants:
+        print("\n✓ Aucune régression")
+
+
+def charger_resultats(chemin: str) -> Dict:
+    with open(chemin, encoding='utf-8') as fichier:
+        return json.load(fichier)
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de SuperNutriScore")
+    commandes = parser.add_subparsers(dest='commande', required=True)
+    
+    parser_executer = commandes.add_parser('executer', help="Lance les mesures")
+    parser_executer.add_argument('--tailles', type=float, nargs='+', default=TAILLES,
+                                 help="Nombres de produits (défaut: 1e3 à 1e6 ; 1e7 demande ~6 Go)")
+    parser_executer.add_argument('--repetitions', type=int, default=3,
+                                 help="Répétitions par mesure, meilleur temps retenu (défaut: 3)")
+    parser_executer.add_argument('--graine', type=int, default=0)
+    parser_executer.add_argument('--source', default='base_donnees_boissons.csv',
+                                 help="Base servant à générer les produits")
+    parser_executer.add_argument('--sortie', default='resultats_benchmarks.json',
+                                 help="Fichier JSON des résultats")
+    parser_executer.add_argument('--comparer-a', help="Référence JSON à comparer")
+    parser_executer.add_argument('--tolerance', type=float, default=0.10,
+                                 help="Ralentissement relatif toléré (défaut: 0.10)")
+    
+    parser_comparer = commandes.add_parser('comparer', help="Compare deux fichiers de résultats")
+    parser_comparer.add_argument('reference')
+    parser_comparer.add_argument('nouveau')
+    parser_comparer.add_argument('--tolerance', type=float, default=0.10,
+                                 help="Ralentissement relatif toléré (défaut: 0.10)")
+    
+    args = parser.parse_args(arguments)
+    
+    if args.commande == 'executer':
+        resultats = executer(args.tailles, args.repetitions, args.graine, args.source)
+        with open(args.sortie, 'w', encoding='utf-8') as fichier:
+            json.dump(resultats, fichier, ensure_ascii=False, indent=2)
+        print(f"✓ Résultats sauvegardés dans: {args.sortie}", file=sys.stderr)
+        if not args.comparer_a:
+            return 0
+        reference = charger_resultats(args.comparer_a)
+    else:
+        reference = charger_resultats(args.reference)
+        resultats = charger_resultats(args.nouveau)
+    
+    table = comparer(reference, resultats, args.tolerance)
+    afficher_comparaison(table)
+    # Code de sortie non nul en cas de régression ou de mesure manquante
+    # (utilisable en intégration continue)
+    return 1 if (table['regression'] | table['manquant']).any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
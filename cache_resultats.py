@@ -0,0 +1,141 @@
+"""
+Cache des résultats de classification partagé entre sessions Streamlit
+Éviction LRU sous un budget mémoire, sûr en accès concurrent
+"""
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def empreinte_donnees(df: pd.DataFrame) -> str:
+    """Empreinte du contenu d'un DataFrame (valeurs, index et colonnes)"""
+    hachage = hashlib.sha1()
+    hachage.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    hachage.update(repr(list(df.columns)).encode('utf-8'))
+    return hachage.hexdigest()
+
+
+def normaliser_poids(poids: Dict[str, float], decimales: int = 12) -> Tuple:
+    """
+    Forme canonique des poids pour une clé de cache
+    
+    Deux jeux de poids proportionnels donnent la même classification : ils
+    sont ramenés à une somme de 1 (et arrondis pour absorber les écarts
+    d'arrondi flottant).
+    """
+    somme = sum(poids.values())
+    if somme == 0:
+        return tuple(sorted(poids.items()))
+    return tuple(sorted((critere, round(valeur / somme, decimales))
+                        for critere, valeur in poids.items()))
+
+
+def taille_octets(objet: Any) -> int:
+    """Estimation de la mémoire occupée par un résultat mis en cache"""
+    if isinstance(objet, np.ndarray):
+        return objet.nbytes
+    if isinstance(objet, (pd.DataFrame, pd.Series, pd.Index)):
+        utilisation = objet.memory_usage(deep=True)
+        return int(utilisation.sum() if hasattr(utilisation, 'sum') else utilisation)
+    if isinstance(objet, dict):
+        return sum(taille_octets(v) for v in objet.values()) + sys.getsizeof(objet)
+    if isinstance(objet, (list, tuple)):
+        return sum(taille_octets(v) for v in objet) + sys.getsizeof(objet)
+    if hasattr(objet, '__dict__'):
+        return taille_octets(vars(objet))
+    return sys.getsizeof(objet)
+
+
+class CacheResultats:
+    """
+    Cache LRU borné en mémoire
+    
+    Une entrée est calculée une seule fois même si plusieurs sessions la
+    demandent en même temps : les suivantes attendent le premier calcul.
+    Les entrées les moins récemment utilisées sont évincées lorsque le
+    budget mémoire est dépassé.
+    """
+    
+    def __init__(self, budget_octets: int = 512 * 1024 ** 2):
+        """
+        Args:
+            budget_octets: Mémoire maximale occupée par les résultats (défaut 512 Mo)
+        """
+        self.budget_octets = budget_octets
+        self.entrees: 'OrderedDict[Hashable, Tuple[Any, int]]' = OrderedDict()
+        self.octets = 0
+        self.verrou = threading.Lock()
+        self.calculs_en_cours: Dict[Hashable, threading.Lock] = {}
+        self.succes = 0
+        self.echecs = 0
+    
+    def obtenir(self, cle: Hashable, calcul: Callable[[], Any]) -> Any:
+        """
+        Retourne le résultat associé à la clé, en le calculant si besoin
+        
+        Args:
+            cle: Clé hachable décrivant complètement le calcul
+            calcul: Fonction sans argument produisant le résultat
+        """
+        with self.verrou:
+            if cle in self.entrees:
+                self.entrees.move_to_end(cle)
+                self.succes += 1
+                return self.entrees[cle][0]
+            verrou_cle = self.calculs_en_cours.setdefault(cle, threading.Lock())
+        
+        with verrou_cle:
+            # Le résultat a pu être calculé par une autre session pendant l'attente
+            with self.verrou:
+                if cle in self.entrees:
+                    self.entrees.move_to_end(cle)
+                    self.succes += 1
+                    return self.entrees[cle][0]
+                self.echecs += 1
+            
+            try:
+                resultat = calcul()
+                self.stocker(cle, resultat)
+            finally:
+                with self.verrou:
+                    self.calculs_en_cours.pop(cle, None)
+        
+        return resultat
+    
+    def stocker(self, cle: Hashable, resultat: Any):
+        """Ajoute une entrée puis évince les plus anciennes au-delà du budget"""
+        taille = taille_octets(resultat)
+        with self.verrou:
+            if cle in self.entrees:
+                self.octets -= self.entrees.pop(cle)[1]
+            # Un résultat plus gros que le budget n'est pas conservé
+            if taille > self.budget_octets:
+                return
+            self.entrees[cle] = (resultat, taille)
+            self.octets += taille
+            while self.octets > self.budget_octets:
+                _, (_, taille_evincee) = self.entrees.popitem(last=False)
+                self.octets -= taille_evincee
+    
+    def vider(self):
+        """Supprime toutes les entrées"""
+        with self.verrou:
+            self.entrees.clear()
+            self.octets = 0
+    
+    def statistiques(self) -> Dict:
+        """Nombre d'entrées, mémoire occupée et taux de succès"""
+        with self.verrou:
+            total = self.succes + self.echecs
+            return {
+                'entrees': len(self.entrees),
+                'octets': self.octets,
+                'budget_octets': self.budget_octets,
+                'taux_succes': self.succes / total if total else 0
+            }
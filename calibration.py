@@ -0,0 +1,480 @@
+"""
+Calibration d'ELECTRE TRI sur les labels Nutri-Score
+Recherche des poids, des valeurs des profils limites et de λ qui maximisent
+l'accord (exactitude ou kappa pondéré) entre les classes A' à E' et
+Label_Nutriscore
+
+Descente par coordonnées : λ, chaque poids, puis chaque valeur de profil,
+en plusieurs passes à pas décroissant. Aucun candidat ne reclasse la base :
+
+- les comparaisons produits/profils sont codées une seule fois en masques
+  de bits (moteur à masques) ; les poids n'interviennent que par la table
+  des 2^m sous-ensembles de critères
+- poids et λ : les produits sont regroupés par couple de masques (motifs),
+  avec leurs effectifs par label ; seuls les motifs sont classés
+- λ : la classe ne change qu'aux valeurs de la table, toutes essayées
+- valeur d'un profil : seuls les produits dont la valeur du critère est
+  entre l'ancienne et la nouvelle valeur changent de bit (colonne triée une
+  fois par critère) ; eux seuls sont reclassés et la matrice de confusion
+  est mise à jour par différence
+
+Les candidats d'une coordonnée sont évalués en parallèle (threads : numpy
+libère le GIL et les masques sont partagés sans copie).
+
+Le score de la calibration est mesuré sur les labels ajustés ; valider()
+(option --plis) donne celui d'une validation croisée.
+
+Exemple :
+    python calibration.py base_donnees_boissons.csv --objectif kappa --plis 5 --sortie calibration.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from supernutriscore import (
+    ElectreTri, AnalyseResultats, creer_profils_limites, definir_poids_criteres
+)
+from instrumentation import etape
+
+
+COLONNE_LABEL = 'Label_Nutriscore'
+OBJECTIFS = ('exactitude', 'kappa')
+
+
+class Calibrage:
+    """
+    État de la descente par coordonnées : masques de comparaison, classes
+    courantes et matrice de confusion de tous les produits étiquetés
+    
+    Les profils restent ordonnés (chaque valeur reste entre celles des
+    profils voisins) : le modèle calibré s'utilise tel quel avec la
+    classification par dichotomie.
+    """
+    
+    def __init__(self, df: pd.DataFrame, poids: Dict[str, float] = None,
+                 profils: pd.DataFrame = None, lambda_seuil: float = 0.6,
+                 methode: str = 'pessimiste', objectif: str = 'exactitude',
+                 lambda_min: float = 0.5, poids_min: float = 0.01,
+                 n_travailleurs: int = None):
+        """
+        Args:
+            df: Produits avec leurs critères et Label_Nutriscore (les produits
+                sans label valide sont ignorés)
+            poids: Poids de départ (par défaut definir_poids_criteres)
+            profils: Profils de départ, 6 profils (par défaut creer_profils_limites)
+            lambda_seuil: λ de départ
+            methode: Procédure d'affectation 'pessimiste' ou 'optimiste'
+            objectif: 'exactitude' ou 'kappa' (kappa pondéré quadratique)
+            lambda_min: Plus petite valeur de λ autorisée
+            poids_min: Plus petit poids normalisé autorisé
+            n_travailleurs: Threads d'évaluation des candidats (par défaut le
+                            nombre de cœurs)
+        """
+        if objectif not in OBJECTIFS:
+            raise ValueError(f"Objectif inconnu : {objectif} ({', '.join(OBJECTIFS)})")
+        if poids is None:
+            poids = definir_poids_criteres()
+        if profils is None:
+            profils = creer_profils_limites(df, criteres=list(poids))
+        
+        self.criteres = list(poids)
+        self.methode = methode
+        self.objectif = objectif
+        self.lambda_min = lambda_min
+        self.poids_min = poids_min
+        self.n_travailleurs = n_travailleurs or os.cpu_count() or 1
+        
+        total = sum(poids.values())
+        self.poids = np.array([poids[c] / total for c in self.criteres])
+        self.lambda_seuil = lambda_seuil
+        self.electre = ElectreTri(self.dict_poids(self.poids), profils.copy(),
+                                  lambda_seuil, moteur='masques')
+        self.classes = AnalyseResultats.CLASSES
+        if len(self.electre.CLASSES) != len(self.classes):
+            raise ValueError("La calibration compare 5 classes aux labels A à E : 6 profils attendus")
+        self.P = self.electre.matrice_profils().copy()
+        self.a_maximiser = [c in self.electre.criteres_a_maximiser for c in self.criteres]
+        
+        labels = AnalyseResultats.codes_classes(df[COLONNE_LABEL], self.classes)
+        etiquetes = labels >= 0
+        self.labels = labels[etiquetes]
+        self.X = self.electre.matrice_criteres(df)[etiquetes]
+        
+        with etape('calibration.preparation', lignes=len(self.X)):
+            self.M_ab, self.M_ba = self.electre.masques_comparaison(self.X)
+            # Chaque colonne triée une fois : les produits touchés par un
+            # déplacement de profil forment une tranche contiguë
+            self.ordres = [np.argsort(self.X[:, j], kind='stable')
+                           for j in range(len(self.criteres))]
+            self.valeurs_triees = [self.X[ordre, j] for j, ordre in enumerate(self.ordres)]
+            self.table = self.electre.table_poids_sous_ensembles()
+            self.reclasser()
+        
+        self.historique: List[Dict] = []
+        self.executeur = None
+    
+    def dict_poids(self, poids: np.ndarray) -> Dict[str, float]:
+        return dict(zip(self.criteres, poids.tolist()))
+    
+    def table_pour(self, poids: np.ndarray) -> np.ndarray:
+        """Table des sous-ensembles pour un vecteur de poids (mêmes arrondis qu'ElectreTri)"""
+        return ElectreTri(self.dict_poids(poids), self.electre.profils,
+                          moteur='masques').table_poids_sous_ensembles()
+    
+    def confusion(self, labels: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """Matrice de confusion (labels x classes) en effectifs entiers"""
+        n = len(self.classes)
+        return np.bincount(labels * n + indices, minlength=n * n).reshape(n, n)
+    
+    def score(self, confusion: np.ndarray) -> float:
+        """Valeur de l'objectif pour une matrice de confusion"""
+        if self.objectif == 'kappa':
+            return float(AnalyseResultats.kappa_pondere(pd.DataFrame(confusion)))
+        total = confusion.sum()
+        return float(np.trace(confusion) / total) if total else 0.0
+    
+    def reclasser(self):
+        """Classes et matrice de confusion de tous les produits (poids, λ courants)"""
+        self.indices = self.electre.indices_classes_lot(
+            self.table[self.M_ab], self.table[self.M_ba], self.methode, self.lambda_seuil)
+        self.matrice = self.confusion(self.labels, self.indices)
+        self.valeur = self.score(self.matrice)
+        self.motifs = None
+    
+    def construire_motifs(self):
+        """Regroupe les produits par couple de masques, avec leurs effectifs par label"""
+        k = self.M_ab.shape[1]
+        cles = np.ascontiguousarray(np.concatenate([self.M_ab, self.M_ba], axis=1))
+        vue = cles.view(np.dtype((np.void, cles.itemsize * cles.shape[1]))).ravel()
+        uniques, inverse = np.unique(vue, return_inverse=True)
+        motifs = uniques.view(cles.dtype).reshape(len(uniques), -1)
+        
+        n = len(self.classes)
+        self.motifs = (motifs[:, :k], motifs[:, k:])
+        self.effectifs = np.bincount(inverse.ravel() * n + self.labels,
+                                     minlength=len(uniques) * n).reshape(-1, n)
+    
+    def confusion_motifs(self, table: np.ndarray, lambda_seuil: float) -> np.ndarray:
+        """Matrice de confusion obtenue en ne classant que les motifs"""
+        motifs_ab, motifs_ba = self.motifs
+        indices = self.electre.indices_classes_lot(table[motifs_ab], table[motifs_ba],
+                                                   self.methode, lambda_seuil)
+        n = len(self.classes)
+        return np.stack([self.effectifs[indices == c].sum(axis=0) for c in range(n)], axis=1)
+    
+    def evaluer(self, fonction, candidats: list) -> list:
+        """Évalue les candidats d'une coordonnée, en parallèle si possible"""
+        if self.executeur is not None and len(candidats) > 1:
+            return list(self.executeur.map(fonction, candidats))
+        return [fonction(candidat) for candidat in candidats]
+    
+    def noter(self, parametre: str, ancienne, nouvelle, valeur: float):
+        self.historique.append({'parametre': parametre, 'ancienne_valeur': ancienne,
+                                'nouvelle_valeur': nouvelle, 'score': valeur})
+    
+    def optimiser_lambda(self) -> bool:
+        """λ optimal pour les poids et profils courants (toutes les ruptures)"""
+        if self.motifs is None:
+            self.construire_motifs()
+        candidats = np.unique(self.table[(self.table >= self.lambda_min) & (self.table <= 1)])
+        scores = self.evaluer(lambda l: self.score(self.confusion_motifs(self.table, l)),
+                              candidats.tolist())
+        meilleur = int(np.argmax(scores))
+        if scores[meilleur] <= self.valeur:
+            return False
+        
+        self.noter('lambda', self.lambda_seuil, float(candidats[meilleur]), scores[meilleur])
+        self.lambda_seuil = float(candidats[meilleur])
+        self.electre.lambda_seuil = self.lambda_seuil
+        self.reclasser()
+        return True
+    
+    def optimiser_poids(self, j: int, pas: float, n_candidats: int) -> bool:
+        """Multiplie le poids j par des facteurs dans [1/(1+pas), 1+pas], puis renormalise"""
+        if self.motifs is None:
+            self.construire_motifs()
+        candidats = []
+        for facteur in np.geomspace(1 / (1 + pas), 1 + pas, n_candidats):
+            poids = self.poids.copy()
+            poids[j] *= facteur
+            poids /= poids.sum()
+            if facteur != 1 and poids.min() >= self.poids_min:
+                candidats.append(poids)
+        
+        def evaluer_poids(poids):
+            table = self.table_pour(poids)
+            return self.score(self.confusion_motifs(table, self.lambda_seuil)), table
+        
+        resultats = self.evaluer(evaluer_poids, candidats)
+        if not resultats:
+            return False
+        meilleur = int(np.argmax([score for score, _ in resultats]))
+        score, table = resultats[meilleur]
+        if score <= self.valeur:
+            return False
+        
+        self.noter(f'poids {self.criteres[j]}', float(self.poids[j]),
+                   float(candidats[meilleur][j]), score)
+        self.poids = candidats[meilleur]
+        self.electre.poids = self.dict_poids(self.poids)
+        self.table = table
+        # Motifs inchangés (les masques ne dépendent pas des poids)
+        motifs, effectifs = self.motifs, self.effectifs
+        self.reclasser()
+        self.motifs, self.effectifs = motifs, effectifs
+        return True
+    
+    def deplacement_profil(self, i: int, j: int, valeur: float) -> Tuple:
+        """
+        Effet du passage du profil i à valeur sur le critère j
+        
+        Returns:
+            Tuple (matrice de confusion, lignes touchées, nouveaux masques
+            ab et ba de ces lignes, nouvelles classes de ces lignes)
+        """
+        bas, haut = sorted((self.P[i, j], valeur))
+        triees = self.valeurs_triees[j]
+        lignes = self.ordres[j][np.searchsorted(triees, bas, 'left'):
+                                np.searchsorted(triees, haut, 'right')]
+        
+        x = self.X[lignes, j]
+        a_sup_b, b_sup_a = x >= valeur, valeur >= x
+        c_ab, c_ba = (a_sup_b, b_sup_a) if self.a_maximiser[j] else (b_sup_a, a_sup_b)
+        
+        type_masque = self.M_ab.dtype.type
+        garder = type_masque(~type_masque(1 << j))
+        M_ab, M_ba = self.M_ab[lignes], self.M_ba[lignes]
+        M_ab[:, i] = (M_ab[:, i] & garder) | (c_ab.astype(type_masque) << j)
+        M_ba[:, i] = (M_ba[:, i] & garder) | (c_ba.astype(type_masque) << j)
+        
+        indices = self.electre.indices_classes_lot(self.table[M_ab], self.table[M_ba],
+                                                   self.methode, self.lambda_seuil)
+        labels = self.labels[lignes]
+        matrice = (self.matrice + self.confusion(labels, indices)
+                   - self.confusion(labels, self.indices[lignes]))
+        return matrice, lignes, M_ab, M_ba, indices
+    
+    def optimiser_profil(self, i: int, j: int, pas: float, n_candidats: int) -> bool:
+        """
+        Essaie des valeurs du critère j prises dans la base, entre les profils
+        voisins de i (fenêtre de pas x l'intervalle autour de la valeur courante)
+        """
+        voisins = self.P[[max(i - 1, 0), min(i + 1, len(self.P) - 1)], j]
+        triees = self.valeurs_triees[j]
+        debut = np.searchsorted(triees, min(voisins.min(), self.P[i, j]), 'left')
+        fin = np.searchsorted(triees, max(voisins.max(), self.P[i, j]), 'right')
+        if fin - debut < 2:
+            return False
+        
+        courant = np.searchsorted(triees, self.P[i, j])
+        rayon = max(1, int(pas * (fin - debut)))
+        positions = np.unique(np.linspace(max(debut, courant - rayon),
+                                          min(fin - 1, courant + rayon),
+                                          n_candidats).astype(np.int64))
+        candidats = [v for v in np.unique(triees[positions]).tolist() if v != self.P[i, j]]
+        
+        resultats = self.evaluer(lambda v: self.deplacement_profil(i, j, v), candidats)
+        if not resultats:
+            return False
+        scores = [self.score(resultat[0]) for resultat in resultats]
+        meilleur = int(np.argmax(scores))
+        if scores[meilleur] <= self.valeur:
+            return False
+        
+        matrice, lignes, M_ab, M_ba, indices = resultats[meilleur]
+        profil, critere = self.electre.PROFILS[i], self.criteres[j]
+        self.noter(f'profil {profil} {critere}', float(self.P[i, j]),
+                   candidats[meilleur], scores[meilleur])
+        self.M_ab[lignes], self.M_ba[lignes] = M_ab, M_ba
+        self.indices[lignes] = indices
+        self.matrice, self.valeur = matrice, scores[meilleur]
+        self.P[i, j] = candidats[meilleur]
+        self.electre.profils.loc[profil, critere] = candidats[meilleur]
+        self.motifs = None
+        return True
+    
+    def passe(self, pas: float, n_candidats: int) -> int:
+        """Une passe sur toutes les coordonnées ; retourne le nombre d'améliorations"""
+        ameliorations = int(self.optimiser_lambda())
+        for j in range(len(self.criteres)):
+            ameliorations += self.optimiser_poids(j, pas, n_candidats)
+        for i in range(len(self.P)):
+            for j in range(len(self.criteres)):
+                ameliorations += self.optimiser_profil(i, j, pas, n_candidats)
+        return ameliorations
+    
+    def executer(self, n_passes: int = 4, pas: float = 1.0, n_candidats: int = 8) -> Dict:
+        """
+        Lance la descente par coordonnées (pas divisé par 2 à chaque passe)
+        
+        Returns:
+            Dict contenant :
+                - 'poids', 'profils', 'lambda_seuil': Modèle calibré
+                - 'electre': ElectreTri correspondant (moteur 'tenseur')
+                - 'score_initial', 'score': Objectif avant et après
+                - 'matrice_confusion': DataFrame labels x classes
+                - 'historique': DataFrame des améliorations successives
+        """
+        score_initial = self.valeur
+        with ThreadPoolExecutor(max_workers=self.n_travailleurs) as executeur:
+            self.executeur = executeur if self.n_travailleurs > 1 else None
+            for numero in range(n_passes):
+                with etape('calibration.passe', passe=numero + 1, pas=pas):
+                    self.passe(pas, n_candidats)
+                pas /= 2
+            self.executeur = None
+        
+        poids = self.dict_poids(self.poids)
+        profils = self.electre.profils.copy()
+        return {
+            'poids': poids,
+            'profils': profils,
+            'lambda_seuil': self.lambda_seuil,
+            'electre': ElectreTri(poids, profils, self.lambda_seuil),
+            'score_initial': score_initial,
+            'score': self.valeur,
+            'matrice_confusion': pd.DataFrame(self.matrice, index=self.classes,
+                                              columns=self.electre.CLASSES),
+            'historique': pd.DataFrame(self.historique,
+                                       columns=['parametre', 'ancienne_valeur',
+                                                'nouvelle_valeur', 'score'])
+        }
+
+
+def calibrer(df: pd.DataFrame, poids: Dict[str, float] = None,
+             profils: pd.DataFrame = None, lambda_seuil: float = 0.6,
+             methode: str = 'pessimiste', objectif: str = 'exactitude',
+             n_passes: int = 4, n_candidats: int = 8,
+             n_travailleurs: int = None) -> Dict:
+    """
+    Calibre poids, profils et λ d'ELECTRE TRI sur Label_Nutriscore
+    
+    Voir Calibrage (paramètres) et Calibrage.executer (résultat).
+    """
+    calibrage = Calibrage(df, poids, profils, lambda_seuil, methode, objectif,
+                          n_travailleurs=n_travailleurs)
+    return calibrage.executer(n_passes, n_candidats=n_candidats)
+
+
+def plis_stratifies(labels, n_plis: int, graine: int = 0) -> np.ndarray:
+    """Numéro de pli de chaque produit, chaque label étant réparti sur tous les plis"""
+    codes = AnalyseResultats.codes_classes(labels, AnalyseResultats.CLASSES)
+    aleatoire = np.random.default_rng(graine)
+    plis = np.empty(len(codes), dtype=np.int64)
+    decalage = 0
+    for code in np.unique(codes):
+        lignes = aleatoire.permutation(np.flatnonzero(codes == code))
+        plis[lignes] = (np.arange(len(lignes)) + decalage) % n_plis
+        decalage += len(lignes)
+    return plis
+
+
+def valider(df: pd.DataFrame, poids: Dict[str, float] = None,
+            profils: pd.DataFrame = None, lambda_seuil: float = 0.6,
+            methode: str = 'pessimiste', objectif: str = 'exactitude',
+            n_plis: int = 5, graine: int = 0, n_passes: int = 4,
+            n_candidats: int = 8, n_travailleurs: int = None) -> Dict:
+    """
+    Validation croisée de la calibration
+    
+    La calibration ajuste une quarantaine de valeurs sur les labels qu'elle
+    note : son score sur ces labels surestime l'accord sur d'autres produits.
+    Chaque pli est ici noté par un modèle calibré sur les autres plis
+    (stratifiés par label). Sans profils de départ, ils sont recalculés sur
+    la partie d'apprentissage.
+    
+    Returns:
+        Dict contenant :
+            - 'score_initial': Modèle de départ, moyenne sur les plis de validation
+            - 'score_apprentissage': Modèles calibrés, moyenne sur leurs plis
+              d'apprentissage (en échantillon)
+            - 'score_validation': Modèles calibrés, moyenne sur les plis
+              non vus pendant la calibration
+            - 'plis': DataFrame des scores de chaque pli
+    """
+    if poids is None:
+        poids = definir_poids_criteres()
+    plis = plis_stratifies(df[COLONNE_LABEL], n_plis, graine)
+    
+    lignes = []
+    for pli in range(n_plis):
+        apprentissage, validation = df[plis != pli], df[plis == pli]
+        depart = (profils if profils is not None
+                  else creer_profils_limites(apprentissage, criteres=list(poids)))
+        with etape('calibration.pli', pli=pli + 1, lignes=len(apprentissage)):
+            resultat = calibrer(apprentissage, poids, depart, lambda_seuil, methode,
+                                objectif, n_passes, n_candidats, n_travailleurs)
+        initial = Calibrage(validation, poids, depart, lambda_seuil, methode, objectif)
+        calibre = Calibrage(validation, resultat['poids'], resultat['profils'],
+                            resultat['lambda_seuil'], methode, objectif)
+        lignes.append({'pli': pli + 1, 'produits': len(validation),
+                       'score_initial': initial.valeur,
+                       'score_apprentissage': resultat['score'],
+                       'score_validation': calibre.valeur})
+    
+    scores = pd.DataFrame(lignes)
+    return {
+        'score_initial': float(scores['score_initial'].mean()),
+        'score_apprentissage': float(scores['score_apprentissage'].mean()),
+        'score_validation': float(scores['score_validation'].mean()),
+        'plis': scores
+    }
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Calibration des poids, profils et λ d'ELECTRE TRI sur les labels Nutri-Score")
+    parser.add_argument('source', help="Base de produits (CSV ou XLSX)")
+    parser.add_argument('--methode', choices=['pessimiste', 'optimiste'], default='pessimiste')
+    parser.add_argument('--objectif', choices=OBJECTIFS, default='exactitude')
+    parser.add_argument('--passes', type=int, default=4, help="Nombre de passes")
+    parser.add_argument('--candidats', type=int, default=8,
+                        help="Valeurs essayées par coordonnée")
+    parser.add_argument('--travailleurs', type=int, help="Threads (par défaut le nombre de cœurs)")
+    parser.add_argument('--plis', type=int, default=0,
+                        help="Validation croisée en n plis avant la calibration finale "
+                             "(score sur des produits non vus ; 0 pour ne pas valider)")
+    parser.add_argument('--sortie', help="Fichier JSON du modèle calibré (poids, λ, profils)")
+    args = parser.parse_args(arguments)
+    
+    from ingestion import lire_source
+    
+    df = lire_source(args.source)
+    if args.plis > 1:
+        validation = valider(df, methode=args.methode, objectif=args.objectif,
+                             n_plis=args.plis, n_passes=args.passes,
+                             n_candidats=args.candidats, n_travailleurs=args.travailleurs)
+        print(f"✓ Validation croisée ({args.plis} plis) : {validation['score_initial']:.3f} "
+              f"-> {validation['score_validation']:.3f} sur les plis non vus "
+              f"({validation['score_apprentissage']:.3f} en apprentissage)", file=sys.stderr)
+    
+    resultat = calibrer(df, methode=args.methode,
+                        objectif=args.objectif, n_passes=args.passes,
+                        n_candidats=args.candidats, n_travailleurs=args.travailleurs)
+    
+    print(f"✓ {args.objectif} ({args.methode}), en échantillon : {resultat['score_initial']:.3f} "
+          f"-> {resultat['score']:.3f} ({len(resultat['historique'])} améliorations)",
+          file=sys.stderr)
+    print(f"  λ = {resultat['lambda_seuil']:.3f}", file=sys.stderr)
+    for critere, poids in resultat['poids'].items():
+        print(f"  {critere}: {poids:.3f}", file=sys.stderr)
+    
+    if args.sortie:
+        with open(args.sortie, 'w', encoding='utf-8') as fichier:
+            json.dump({'methode': args.methode,
+                       'lambda_seuil': resultat['lambda_seuil'],
+                       'poids': resultat['poids'],
+                       'profils': resultat['profils'].to_dict(orient='index')},
+                      fichier, ensure_ascii=False, indent=2)
+        print(f"✓ Modèle calibré écrit dans: {args.sortie}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
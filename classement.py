@@ -0,0 +1,287 @@
+"""
+Classement de tous les produits entre eux par surclassement deux à deux
+Même logique de concordance (et de seuils) qu'ELECTRE TRI, mais chaque
+produit est comparé à tous les autres au lieu des seuls profils : flux
+positif (produits qu'il surclasse), flux négatif (produits qui le
+surclassent), flux net et rang
+
+La matrice n x n n'est jamais construite : elle est parcourue par tuiles
+de taille_tuile x taille_tuile, dont seules les sommes par ligne et par
+colonne sont gardées (mémoire bornée par la taille des tuiles). Une tuile
+(I, J) donne à la fois a S b et b S a : seules les tuiles I <= J sont
+calculées. Les produits aux critères identiques sont regroupés avant le
+calcul et comptés avec leur effectif.
+
+Exemple :
+    python classement.py base_donnees_boissons.csv --lambda 0.6 --sortie classement.csv
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from supernutriscore import ElectreTri, creer_profils_limites, definir_poids_criteres
+from instrumentation import etape
+
+
+VALEURS = ('surclassement', 'credibilite')
+
+# État des processus de travail, initialisé une seule fois par processus
+_ETAT: Dict = {}
+
+
+def rangs_criteres(X: np.ndarray) -> np.ndarray:
+    """
+    Remplace chaque valeur par son rang parmi les valeurs distinctes du
+    critère (int16, ou int32 au-delà de 32767 valeurs)
+    
+    L'ordre et les égalités sont conservés : les masques de comparaison sont
+    identiques, mais les comparaisons d'entiers courts sont plus rapides.
+    Sans objet si une valeur manque (NaN n'est ni >= ni <= à rien).
+    """
+    rangs = [np.unique(X[:, j], return_inverse=True)[1].ravel() for j in range(X.shape[1])]
+    type_rangs = np.int16 if max(r.max(initial=0) for r in rangs) <= np.iinfo(np.int16).max else np.int32
+    return np.stack(rangs, axis=1).astype(type_rangs)
+
+
+def flux_tuile(electre: ElectreTri, X: np.ndarray, effectifs: np.ndarray,
+               bloc_a: slice, bloc_b: slice,
+               valeurs: str = 'surclassement') -> Tuple[np.ndarray, ...]:
+    """
+    Sommes d'une tuile de la matrice de surclassement
+    
+    Args:
+        electre: Poids, seuils q, p, v et λ (les profils ne servent pas)
+        X: Critères des produits distincts (ordre des poids), ou leurs rangs
+           (rangs_criteres) en l'absence de seuils
+        effectifs: Nombre de produits identiques à chaque ligne de X
+        bloc_a, bloc_b: Lignes et colonnes de la tuile (bloc_a avant bloc_b,
+                        ou le même bloc pour une tuile diagonale)
+        valeurs: 'surclassement' (compte des a S b, σ >= λ) ou
+                 'credibilite' (somme des σ)
+    
+    Returns:
+        Tuple (flux positif, flux négatif, surclassé strictement par) des
+        lignes de bloc_a, puis les mêmes pour bloc_b (None si diagonale)
+    """
+    diagonale = bloc_a == bloc_b
+    if electre.a_seuils():
+        colonnes_a = np.ascontiguousarray(X[bloc_a].T)[:, :, None]
+        colonnes_b = np.ascontiguousarray(X[bloc_b].T)[:, None, :]
+        sigma_ab, sigma_ba = electre.credibilites_colonnes(colonnes_a, colonnes_b,
+                                                           avec_ba=not diagonale)
+    else:
+        # Concordances nettes : masques de bits lus dans la table des
+        # sous-ensembles (mêmes valeurs que somme_ponderee)
+        M_ab, M_ba = electre.masques_lot(X[bloc_a], X[bloc_b])
+        table = electre.table_poids_sous_ensembles()
+        sigma_ab, sigma_ba = table[M_ab], (None if diagonale else table[M_ba])
+    
+    a_S_b = sigma_ab >= electre.lambda_seuil
+    b_S_a = a_S_b.T if diagonale else sigma_ba >= electre.lambda_seuil
+    if valeurs == 'surclassement':
+        V_ab = a_S_b.astype(float)
+        V_ba = None if diagonale else b_S_a.astype(float)
+    else:
+        V_ab, V_ba = sigma_ab, sigma_ba
+    # a P b : a surclasse b sans que b surclasse a
+    a_P_b = (a_S_b & ~b_S_a).astype(float)
+    e_a, e_b = effectifs[bloc_a], effectifs[bloc_b]
+    
+    if diagonale:
+        # Chaque produit face aux autres copies de sa ligne, pas à lui-même
+        soi = np.diagonal(V_ab)
+        return (V_ab @ e_b - soi, e_a @ V_ab - soi, e_a @ a_P_b,
+                None, None, None)
+    
+    b_P_a = (b_S_a & ~a_S_b).astype(float)
+    return (V_ab @ e_b, V_ba @ e_b, b_P_a @ e_b,
+            e_a @ V_ba, e_a @ V_ab, e_a @ a_P_b)
+
+
+def _initialiser_processus(electre: ElectreTri, entree: Tuple[str, tuple],
+                           type_criteres: type, valeurs: str):
+    """
+    Reçoit le modèle une seule fois et se rattache aux produits distincts
+    partagés (critères et effectifs ; les rangs entiers sont copiés une fois
+    dans leur type)
+    """
+    nom, forme = entree
+    memoire = shared_memory.SharedMemory(name=nom)
+    tableau = np.ndarray(forme, dtype=np.float64, buffer=memoire.buf)
+    X = tableau[:, :-1]
+    if type_criteres is not np.float64:
+        X = X.astype(type_criteres)
+    _ETAT.update(electre=electre, memoire=memoire, X=X,
+                 effectifs=tableau[:, -1], valeurs=valeurs)
+
+
+def _liberer_processus():
+    """Détache les tableaux puis la zone de mémoire partagée du processus"""
+    memoire = _ETAT.get('memoire')
+    _ETAT.clear()
+    if memoire is not None:
+        memoire.close()
+
+
+def _initialiser_travailleur(*initargs):
+    """Initialisation d'un processus du pool, détaché de la zone partagée à sa sortie"""
+    _initialiser_processus(*initargs)
+    util.Finalize(None, _liberer_processus, exitpriority=10)
+
+
+def _flux_tache(tuile: Tuple[Tuple[int, int], Tuple[int, int]]) -> Tuple:
+    """Calcule une tuile ; retourne ses bornes et ses sommes"""
+    (debut_a, fin_a), (debut_b, fin_b) = tuile
+    sommes = flux_tuile(_ETAT['electre'], _ETAT['X'], _ETAT['effectifs'],
+                        slice(debut_a, fin_a), slice(debut_b, fin_b), _ETAT['valeurs'])
+    return tuile, sommes
+
+
+def classer_produits(df: pd.DataFrame, electre: ElectreTri,
+                     valeurs: str = 'surclassement',
+                     taille_tuile: int = 1024,
+                     n_processus: int = None) -> pd.DataFrame:
+    """
+    Flux de surclassement et rang de chaque produit face à tous les autres
+    
+    Un produit a surclasse b si σ(a,b) >= λ (σ = C sans seuils ; les
+    comparaisons se font alors sur les rangs des valeurs). Chaque tuile
+    occupe quelques matrices taille_tuile x taille_tuile de flottants par
+    processus, quel que soit le nombre de produits ; le calcul reste en
+    n² / 2 comparaisons (sur les produits distincts). Les tuiles sont
+    réparties sur un pool de processus ; le résultat ne dépend ni de leur
+    taille ni du nombre de processus.
+    
+    Args:
+        df: DataFrame contenant les produits
+        electre: Poids, seuils et λ (profils ignorés)
+        valeurs: 'surclassement' (flux en nombres de produits) ou
+                 'credibilite' (flux en sommes de σ)
+        taille_tuile: Nombre de produits distincts par côté de tuile
+        n_processus: Nombre de processus (par défaut le nombre de cœurs)
+    
+    Returns:
+        DataFrame (même index que df) avec Flux_Positif, Flux_Negatif,
+        Flux_Net, Surclasse_Strictement_Par (produits qui le surclassent
+        sans être surclassés par lui ; 0 : produit non dominé) et Rang
+        (1 = meilleur flux net)
+    """
+    if valeurs not in VALEURS:
+        raise ValueError(f"Valeurs inconnues : {valeurs} ({', '.join(VALEURS)})")
+    if n_processus is None:
+        n_processus = os.cpu_count() or 1
+    
+    X = electre.matrice_criteres(df)
+    with etape('classement.regroupement', lignes=len(X)):
+        distincts, inverse, effectifs = np.unique(X, axis=0, return_inverse=True,
+                                                  return_counts=True)
+    inverse = inverse.ravel()
+    n = len(distincts)
+    
+    # Concordances nettes : seuls les rangs des valeurs comptent
+    criteres = distincts
+    if not electre.a_seuils() and not np.isnan(distincts).any():
+        criteres = rangs_criteres(distincts)
+    
+    bornes = [(debut, min(debut + taille_tuile, n)) for debut in range(0, n, taille_tuile)]
+    tuiles = [(bornes[i], bornes[j]) for i in range(len(bornes))
+              for j in range(i, len(bornes))]
+    
+    plus = np.zeros(n)
+    moins = np.zeros(n)
+    strict = np.zeros(n)
+    
+    def accumuler(tuile, sommes):
+        (debut_a, fin_a), (debut_b, fin_b) = tuile
+        for debut, fin, (p, m, s) in ((debut_a, fin_a, sommes[:3]),
+                                      (debut_b, fin_b, sommes[3:])):
+            if p is not None:
+                plus[debut:fin] += p
+                moins[debut:fin] += m
+                strict[debut:fin] += s
+    
+    forme = (n, X.shape[1] + 1)
+    memoire = shared_memory.SharedMemory(create=True, size=max(int(np.prod(forme)) * 8, 1))
+    try:
+        entree = np.ndarray(forme, dtype=np.float64, buffer=memoire.buf)
+        entree[:, :-1] = criteres
+        entree[:, -1] = effectifs
+        initargs = (electre, (memoire.name, forme), criteres.dtype.type, valeurs)
+        
+        with etape('classement.tuiles', produits=n, tuiles=len(tuiles)):
+            if n_processus > 1 and len(tuiles) > 1:
+                with ProcessPoolExecutor(max_workers=n_processus,
+                                         initializer=_initialiser_travailleur,
+                                         initargs=initargs) as executeur:
+                    taille_lot = max(1, len(tuiles) // (4 * n_processus))
+                    for tuile, sommes in executeur.map(_flux_tache, tuiles,
+                                                       chunksize=taille_lot):
+                        accumuler(tuile, sommes)
+            else:
+                _initialiser_processus(*initargs)
+                try:
+                    for tuile in tuiles:
+                        accumuler(*_flux_tache(tuile))
+                finally:
+                    _liberer_processus()
+        del entree
+    finally:
+        memoire.close()
+        memoire.unlink()
+    
+    if valeurs == 'surclassement':
+        plus, moins = plus.astype(np.int64), moins.astype(np.int64)
+    net = plus - moins
+    
+    resultat = pd.DataFrame({
+        'Flux_Positif': plus[inverse],
+        'Flux_Negatif': moins[inverse],
+        'Flux_Net': net[inverse],
+        'Surclasse_Strictement_Par': strict.astype(np.int64)[inverse]
+    }, index=df.index)
+    resultat['Rang'] = resultat['Flux_Net'].rank(ascending=False, method='min').astype(np.int64)
+    return resultat
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Classement de tous les produits par surclassement deux à deux (flux net)")
+    parser.add_argument('source', help="Base de produits (CSV ou XLSX)")
+    parser.add_argument('--lambda', dest='lambda_seuil', type=float, default=0.6,
+                        help="Seuil de majorité")
+    parser.add_argument('--valeurs', choices=VALEURS, default='surclassement')
+    parser.add_argument('--tuile', type=int, default=1024,
+                        help="Produits par côté de tuile (borne la mémoire)")
+    parser.add_argument('--processus', type=int, help="Nombre de processus")
+    parser.add_argument('--premiers', type=int, default=10,
+                        help="Nombre de produits affichés en tête du classement")
+    parser.add_argument('--sortie', help="Fichier CSV du classement")
+    args = parser.parse_args(arguments)
+    
+    from ingestion import lire_source
+    
+    df = lire_source(args.source)
+    electre = ElectreTri(definir_poids_criteres(), creer_profils_limites(df), args.lambda_seuil)
+    classement = classer_produits(df, electre, args.valeurs, args.tuile, args.processus)
+    
+    colonnes = [c for c in ('ID', 'Nom_Produit', 'Marque', 'Categorie') if c in df.columns]
+    resultat = df[colonnes].join(classement).sort_values('Rang', kind='stable')
+    
+    print(f"✓ {len(df)} produits classés (λ={args.lambda_seuil}), "
+          f"{(classement['Surclasse_Strictement_Par'] == 0).sum()} non dominés", file=sys.stderr)
+    print(resultat.head(args.premiers).to_string(index=False), file=sys.stderr)
+    
+    if args.sortie:
+        resultat.to_csv(args.sortie, index=False)
+        print(f"✓ Classement écrit dans: {args.sortie}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
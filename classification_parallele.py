@@ -0,0 +1,226 @@
+"""
+Classification parallèle de grandes bases de produits
+Nutri-Score et ELECTRE TRI répartis par tranches sur un pool de processus
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from supernutriscore import NutriScore, ElectreTri
+
+
+# Colonnes de la matrice de sortie partagée
+SORTIES = ['Classe_Pessimiste', 'Classe_Optimiste', 'Score_Nutriscore']
+
+# État des processus de travail, initialisé une seule fois par processus
+_ETAT: Dict = {}
+
+
+def _initialiser_processus(electre: ElectreTri, colonnes: list):
+    """Reçoit le modèle (poids, profils, lambda) une seule fois par processus"""
+    _ETAT.update(electre=electre, colonnes=colonnes)
+
+
+def _rattacher(entree: Tuple[str, tuple], sortie: Tuple[str, tuple]):
+    """
+    Se rattache aux zones de mémoire partagée d'entrée et de sortie (une
+    seule fois par zone : les tâches suivantes ne refont que les vues)
+    """
+    noms = (entree[0], sortie[0])
+    if _ETAT.get('noms') != noms:
+        _detacher()
+        _ETAT.update(noms=noms, memoires=[shared_memory.SharedMemory(name=nom)
+                                          for nom in noms])
+    
+    memoires = _ETAT['memoires']
+    _ETAT['entree'] = np.ndarray(entree[1], dtype=np.float64, buffer=memoires[0].buf)
+    _ETAT['sortie'] = np.ndarray(sortie[1], dtype=np.int64, buffer=memoires[1].buf)
+
+
+def _detacher():
+    """Détache les tableaux puis les zones de mémoire partagée du processus"""
+    for cle in ('entree', 'sortie', 'noms'):
+        _ETAT.pop(cle, None)
+    for memoire in _ETAT.pop('memoires', []):
+        memoire.close()
+
+
+def _liberer_processus():
+    """Détache les zones partagées et oublie le modèle"""
+    _detacher()
+    _ETAT.clear()
+
+
+def _initialiser_travailleur(*initargs):
+    """
+    Initialisation d'un processus du pool : les zones partagées sont
+    détachées à la sortie du processus (atexit n'est pas exécuté dans les
+    processus de multiprocessing, contrairement à ses finaliseurs)
+    """
+    _initialiser_processus(*initargs)
+    util.Finalize(None, _liberer_processus, exitpriority=10)
+
+
+def _classer_tranche(tache: Tuple[Tuple[str, tuple], Tuple[str, tuple], Tuple[int, int]]) -> int:
+    """Classe les lignes [debut, fin) et écrit les résultats à leur place"""
+    entree, sortie, (debut, fin) = tache
+    _rattacher(entree, sortie)
+    electre = _ETAT['electre']
+    
+    df_tranche = pd.DataFrame(_ETAT['entree'][debut:fin], columns=_ETAT['colonnes'])
+    sortie = _ETAT['sortie']
+    
+    C_ab, C_ba = electre.concordances_lot(df_tranche)
+    sortie[debut:fin, 0] = electre.indices_classes_lot(C_ab, C_ba, 'pessimiste')
+    sortie[debut:fin, 1] = electre.indices_classes_lot(C_ab, C_ba, 'optimiste')
+    sortie[debut:fin, 2] = NutriScore.scorer_lot(df_tranche)['score'].to_numpy()
+    
+    return fin - debut
+
+
+class ClassifieurParallele:
+    """
+    Classification parallèle de bases successives (ex. blocs d'un flux)
+    
+    Le pool de processus et les zones de mémoire partagée sont créés une
+    seule fois et réutilisés d'une base à l'autre ; les zones ne sont
+    recréées que pour une base plus grande que les précédentes. Les
+    processus reçoivent le modèle à leur initialisation, puis seulement les
+    bornes de leurs tranches, et écrivent leurs résultats directement à la
+    bonne position. Chaque ligne est calculée indépendamment : le résultat
+    est identique quel que soit le nombre de processus.
+    """
+    
+    def __init__(self, electre: ElectreTri, n_processus: int = None):
+        """
+        Args:
+            electre: Modèle ELECTRE TRI (poids, profils, lambda)
+            n_processus: Nombre de processus (par défaut le nombre de cœurs)
+        """
+        self.electre = electre
+        self.n_processus = n_processus or os.cpu_count() or 1
+        self.colonnes = list(dict.fromkeys(list(electre.poids) +
+                                           list(NutriScore.COLONNES_LOT.values())))
+        self.executeur = None
+        self.memoires = None
+        self.capacite = 0
+    
+    def __enter__(self) -> 'ClassifieurParallele':
+        return self
+    
+    def __exit__(self, *exc):
+        self.fermer()
+    
+    def reserver(self, n: int):
+        """Zones d'entrée et de sortie d'au moins n lignes (agrandies au besoin)"""
+        if self.memoires is not None and n <= self.capacite:
+            return
+        self.liberer_memoires()
+        self.capacite = max(n, 1)
+        self.memoires = tuple(
+            shared_memory.SharedMemory(create=True, size=self.capacite * largeur * 8)
+            for largeur in (len(self.colonnes), len(SORTIES)))
+    
+    def liberer_memoires(self):
+        if self.memoires is not None:
+            for memoire in self.memoires:
+                memoire.close()
+                memoire.unlink()
+        self.memoires = None
+        self.capacite = 0
+    
+    def fermer(self):
+        """Arrête le pool et supprime les zones partagées"""
+        if self.executeur is not None:
+            self.executeur.shutdown()
+            self.executeur = None
+        self.liberer_memoires()
+    
+    def classifier(self, df: pd.DataFrame, taille_tranche: int = None) -> pd.DataFrame:
+        """
+        Calcule le Nutri-Score et les classes ELECTRE TRI de df
+        
+        Args:
+            df: DataFrame contenant les produits
+            taille_tranche: Nombre de produits par tâche (par défaut une
+                            tranche par processus, d'au plus 100 000 produits)
+        
+        Returns:
+            DataFrame (même index que df) avec Score_Nutriscore_Calcule,
+            Label_Nutriscore_Calcule, Classe_ELECTRE_Pessimiste et
+            Classe_ELECTRE_Optimiste
+        """
+        n = len(df)
+        if taille_tranche is None:
+            taille_tranche = max(min(-(-n // self.n_processus), 100_000), 1)
+        tranches = [(debut, min(debut + taille_tranche, n))
+                    for debut in range(0, n, taille_tranche)]
+        
+        self.reserver(n)
+        memoire_entree, memoire_sortie = self.memoires
+        forme_entree = (n, len(self.colonnes))
+        forme_sortie = (n, len(SORTIES))
+        entree = np.ndarray(forme_entree, dtype=np.float64, buffer=memoire_entree.buf)
+        entree[:] = df[self.colonnes].to_numpy(dtype=float)
+        del entree
+        
+        zones = ((memoire_entree.name, forme_entree), (memoire_sortie.name, forme_sortie))
+        taches = [zones + (tranche,) for tranche in tranches]
+        
+        if self.n_processus > 1 and len(tranches) > 1:
+            if self.executeur is None:
+                self.executeur = ProcessPoolExecutor(
+                    max_workers=self.n_processus,
+                    initializer=_initialiser_travailleur,
+                    initargs=(self.electre, self.colonnes))
+            list(self.executeur.map(_classer_tranche, taches))
+        else:
+            _initialiser_processus(self.electre, self.colonnes)
+            try:
+                for tache in taches:
+                    _classer_tranche(tache)
+            finally:
+                _liberer_processus()
+        
+        sortie = np.ndarray(forme_sortie, dtype=np.int64,
+                            buffer=memoire_sortie.buf).copy()
+        classes = np.array(self.electre.CLASSES, dtype=object)
+        
+        return pd.DataFrame({
+            'Score_Nutriscore_Calcule': sortie[:, 2],
+            'Label_Nutriscore_Calcule': NutriScore.get_labels_lot(sortie[:, 2]),
+            'Classe_ELECTRE_Pessimiste': classes[sortie[:, 0]],
+            'Classe_ELECTRE_Optimiste': classes[sortie[:, 1]]
+        }, index=df.index)
+
+
+def classifier_parallele(df: pd.DataFrame, electre: ElectreTri,
+                         n_processus: int = None,
+                         taille_tranche: int = None) -> pd.DataFrame:
+    """
+    Calcule le Nutri-Score et les classes ELECTRE TRI d'une grande base en
+    parallèle (voir ClassifieurParallele)
+    
+    Les colonnes utiles sont copiées une seule fois en mémoire partagée ;
+    pour classer plusieurs bases à la suite, utiliser ClassifieurParallele,
+    qui garde le même pool.
+    
+    Args:
+        df: DataFrame contenant les produits
+        electre: Modèle ELECTRE TRI (poids, profils, lambda)
+        n_processus: Nombre de processus (par défaut le nombre de cœurs)
+        taille_tranche: Nombre de produits par tâche (par défaut une tranche
+                        par processus, d'au plus 100 000 produits)
+    
+    Returns:
+        DataFrame (même index que df) avec Score_Nutriscore_Calcule,
+        Label_Nutriscore_Calcule, Classe_ELECTRE_Pessimiste et
+        Classe_ELECTRE_Optimiste
+    """
+    with ClassifieurParallele(electre, n_processus) as classifieur:
+        return classifieur.classifier(df, taille_tranche)
@@ -0,0 +1,165 @@
+"""
+Esquisses de quantiles fusionnables (KLL) pour construire les profils limites
+sur des bases qui ne tiennent pas en mémoire
+
+Erreur : pour une esquisse de paramètre k, l'erreur sur le rang normalisé d'un
+quantile est d'environ 3.3 / (k / 100) % avec 99 % de confiance, soit ~1.65 %
+pour k = 200 et ~0.4 % pour k = 800 (Karnin, Lang, Liberty, 2016). La mémoire
+utilisée est au plus de l'ordre de 3k valeurs par critère, quelle que soit la taille
+du flux. Les minimums et maximums sont exacts.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from supernutriscore import (
+    CRITERES, QUANTILES_PROFILS, FACTEUR_MIN_PROFILS, FACTEUR_MAX_PROFILS,
+    profils_depuis_statistiques
+)
+
+
+class EsquisseQuantiles:
+    """Esquisse KLL d'une variable numérique, alimentée par blocs et fusionnable"""
+    
+    def __init__(self, k: int = 200, graine: int = 0):
+        """
+        Args:
+            k: Capacité du niveau le plus haut (précision de l'esquisse)
+            graine: Graine du tirage des compactions (résultat reproductible)
+        """
+        self.k = k
+        self.rng = np.random.default_rng(graine)
+        self.niveaux: List[np.ndarray] = [np.empty(0)]
+        self.n = 0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+    
+    def capacite(self, niveau: int) -> int:
+        """Capacité d'un niveau : décroît géométriquement (facteur 2/3) vers le bas"""
+        profondeur = len(self.niveaux) - 1 - niveau
+        return max(int(np.ceil(self.k * (2 / 3) ** profondeur)), 2)
+    
+    def mettre_a_jour(self, valeurs) -> 'EsquisseQuantiles':
+        """Ajoute un bloc de valeurs (les NaN sont ignorés)"""
+        valeurs = np.asarray(valeurs, dtype=float)
+        valeurs = valeurs[~np.isnan(valeurs)]
+        if len(valeurs) == 0:
+            return self
+        
+        self.n += len(valeurs)
+        self.minimum = min(self.minimum, valeurs.min())
+        self.maximum = max(self.maximum, valeurs.max())
+        
+        self.niveaux[0] = np.concatenate([self.niveaux[0], valeurs])
+        self._compacter()
+        return self
+    
+    def fusionner(self, autre: 'EsquisseQuantiles') -> 'EsquisseQuantiles':
+        """Ajoute le contenu d'une autre esquisse (ex. calculée par un autre processus)"""
+        while len(self.niveaux) < len(autre.niveaux):
+            self.niveaux.append(np.empty(0))
+        for niveau, valeurs in enumerate(autre.niveaux):
+            self.niveaux[niveau] = np.concatenate([self.niveaux[niveau], valeurs])
+        
+        self.n += autre.n
+        self.minimum = min(self.minimum, autre.minimum)
+        self.maximum = max(self.maximum, autre.maximum)
+        
+        self._compacter()
+        return self
+    
+    def _compacter(self):
+        """Compacte les niveaux pleins : une valeur sur deux monte d'un niveau"""
+        niveau = 0
+        while niveau < len(self.niveaux):
+            valeurs = self.niveaux[niveau]
+            if len(valeurs) > self.capacite(niveau):
+                if niveau + 1 == len(self.niveaux):
+                    self.niveaux.append(np.empty(0))
+                
+                valeurs = np.sort(valeurs)
+                # Un nombre impair de valeurs laisse la plus grande au niveau courant
+                reste = valeurs[len(valeurs) - len(valeurs) % 2:]
+                paires = valeurs[:len(valeurs) - len(valeurs) % 2]
+                decalage = self.rng.integers(2)
+                
+                self.niveaux[niveau] = reste
+                self.niveaux[niveau + 1] = np.concatenate(
+                    [self.niveaux[niveau + 1], paires[decalage::2]])
+                # Les capacités ont pu changer avec le nouveau niveau : on repart du bas
+                niveau = 0
+                continue
+            niveau += 1
+    
+    def quantiles(self, niveaux: List[float]) -> np.ndarray:
+        """
+        Estime les quantiles demandés
+        
+        Les extrêmes (0 et 1) sont exacts ; les autres respectent la borne
+        d'erreur de rang décrite en tête de module.
+        """
+        if self.n == 0:
+            return np.full(len(niveaux), np.nan)
+        
+        valeurs = np.concatenate(self.niveaux)
+        poids = np.concatenate([np.full(len(v), 2.0 ** h) for h, v in enumerate(self.niveaux)])
+        ordre = np.argsort(valeurs, kind='stable')
+        valeurs = valeurs[ordre]
+        rangs = np.cumsum(poids[ordre])
+        
+        resultat = []
+        for q in niveaux:
+            if q <= 0:
+                resultat.append(self.minimum)
+            elif q >= 1:
+                resultat.append(self.maximum)
+            else:
+                position = np.searchsorted(rangs, q * rangs[-1], side='left')
+                resultat.append(valeurs[min(position, len(valeurs) - 1)])
+        return np.array(resultat)
+    
+    def taille(self) -> int:
+        """Nombre de valeurs conservées"""
+        return sum(len(v) for v in self.niveaux)
+
+
+class EsquissesProfils:
+    """Esquisses de tous les critères, pour construire les profils limites en flux"""
+    
+    def __init__(self, criteres: List[str] = None, k: int = 200, graine: int = 0):
+        self.criteres = list(criteres or CRITERES)
+        self.esquisses: Dict[str, EsquisseQuantiles] = {
+            critere: EsquisseQuantiles(k, graine + i)
+            for i, critere in enumerate(self.criteres)
+        }
+    
+    def mettre_a_jour(self, df: pd.DataFrame) -> 'EsquissesProfils':
+        """Ajoute un bloc de produits"""
+        for critere, esquisse in self.esquisses.items():
+            esquisse.mettre_a_jour(df[critere].to_numpy(dtype=float))
+        return self
+    
+    def fusionner(self, autre: 'EsquissesProfils') -> 'EsquissesProfils':
+        """Fusionne les esquisses d'un autre bloc de données"""
+        for critere, esquisse in self.esquisses.items():
+            esquisse.fusionner(autre.esquisses[critere])
+        return self
+    
+    def profils(self, quantiles: Tuple[float, ...] = QUANTILES_PROFILS,
+                facteur_min: float = FACTEUR_MIN_PROFILS,
+                facteur_max: float = FACTEUR_MAX_PROFILS) -> pd.DataFrame:
+        """
+        Construit les profils limites (mêmes règles que creer_profils_limites)
+        """
+        niveaux = sorted(quantiles)
+        table_quantiles = pd.DataFrame(
+            {critere: esquisse.quantiles(niveaux) for critere, esquisse in self.esquisses.items()},
+            index=niveaux
+        )
+        minimums = pd.Series({c: e.minimum for c, e in self.esquisses.items()})
+        maximums = pd.Series({c: e.maximum for c, e in self.esquisses.items()})
+        
+        return profils_depuis_statistiques(minimums, maximums, table_quantiles,
+                                           facteur_min, facteur_max)
@@ -0,0 +1,314 @@
+"""
+Classification en flux des exports Open Food Facts (CSV/TSV de plusieurs Go)
+Lecture par blocs de taille bornée, Nutri-Score + ELECTRE TRI, écriture incrémentale
+
+Exemple :
+    python flux_openfoodfacts.py en.openfoodfacts.org.products.csv resultats.csv \\
+        --profils profils_limites.csv --taille-bloc 200000
+"""
+
+import argparse
+import sys
+import time
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from supernutriscore import (
+    NutriScore, ElectreTri, AccumulateurConfusion, definir_poids_criteres,
+    QUANTILES_PROFILS, FACTEUR_MIN_PROFILS, FACTEUR_MAX_PROFILS
+)
+from classification_parallele import ClassifieurParallele
+from esquisses_quantiles import EsquissesProfils
+
+
+# Colonnes Open Food Facts -> schéma du projet (valeurs pour 100 g)
+COLONNES_OFF = {
+    'code': 'Code_Barres',
+    'product_name': 'Nom_Produit',
+    'brands': 'Marque',
+    'main_category': 'Categorie',
+    'nutriscore_grade': 'Label_Nutriscore',
+    'energy-kj_100g': 'Energie_kJ',
+    'saturated-fat_100g': 'Acides_Gras_Satures_g',
+    'sugars_100g': 'Sucres_g',
+    'sodium_100g': 'Sodium_mg',
+    'proteins_100g': 'Proteines_g',
+    'fiber_100g': 'Fibres_g',
+    'fruits-vegetables-nuts-estimate-from-ingredients_100g': 'Fruits_Legumes_Pct',
+    'additives_n': 'Nombre_Additifs'
+}
+
+# Colonnes de repli lorsque la colonne principale est absente ou vide
+REPLIS_OFF = {
+    'Energie_kJ': 'energy_100g',
+    'Fruits_Legumes_Pct': 'fruits-vegetables-nuts_100g'
+}
+
+# Critères obligatoires : les produits sans ces valeurs sont ignorés
+CRITERES_OBLIGATOIRES = ['Energie_kJ', 'Acides_Gras_Satures_g', 'Sucres_g',
+                         'Sodium_mg', 'Proteines_g']
+
+# Critères souvent non renseignés, comptés à 0 (convention du Nutri-Score)
+CRITERES_ZERO_PAR_DEFAUT = ['Fibres_g', 'Fruits_Legumes_Pct', 'Nombre_Additifs']
+
+# Colonnes d'identification recopiées dans la sortie
+COLONNES_IDENTITE = ['Code_Barres', 'Nom_Produit', 'Marque', 'Categorie',
+                     'Label_Nutriscore']
+
+# Colonnes texte lues en chaînes, même dans un bloc où elles sont toutes
+# vides (pandas les lirait alors en float64)
+COLONNES_TEXTE = {colonne: 'string' for colonne in
+                  COLONNES_IDENTITE + [off for off, projet in COLONNES_OFF.items()
+                                       if projet in COLONNES_IDENTITE]}
+
+
+def detecter_separateur(chemin: str) -> str:
+    """Devine le séparateur à partir de l'en-tête du fichier"""
+    with open(chemin, encoding='utf-8', errors='replace') as fichier:
+        entete = fichier.readline()
+    return '\t' if entete.count('\t') > entete.count(',') else ','
+
+
+def lire_par_blocs(chemin: str, taille_bloc: int, separateur: str = None
+                   ) -> Iterator[pd.DataFrame]:
+    """
+    Lit le fichier par blocs de taille bornée et les convertit au schéma du projet
+    
+    Seules les colonnes utiles sont lues ; un fichier déjà au schéma du projet
+    (comme base_donnees_boissons.csv) est accepté tel quel.
+    """
+    if separateur is None:
+        separateur = detecter_separateur(chemin)
+    
+    entete = pd.read_csv(chemin, sep=separateur, nrows=0, encoding='utf-8').columns
+    entete = entete.str.strip()
+    utiles = set(COLONNES_OFF) | set(REPLIS_OFF.values()) | set(COLONNES_OFF.values())
+    usecols = [colonne for colonne in entete if colonne in utiles]
+    
+    blocs = pd.read_csv(chemin, sep=separateur, usecols=lambda c: c.strip() in usecols,
+                        chunksize=taille_bloc, encoding='utf-8',
+                        dtype=COLONNES_TEXTE,
+                        on_bad_lines='skip', low_memory=True)
+    for bloc in blocs:
+        bloc.columns = bloc.columns.str.strip()
+        yield convertir_bloc_off(bloc)
+
+
+def convertir_bloc_off(bloc: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convertit un bloc au format Open Food Facts vers le schéma du projet
+    
+    Returns:
+        Bloc contenant les colonnes d'identification présentes et les 8 critères
+    """
+    resultat = bloc.rename(columns={off: projet for off, projet in COLONNES_OFF.items()
+                                    if off in bloc.columns})
+    
+    for critere, repli in REPLIS_OFF.items():
+        if repli in resultat.columns:
+            if critere in resultat.columns:
+                resultat[critere] = resultat[critere].fillna(resultat[repli])
+            else:
+                resultat[critere] = resultat[repli]
+    
+    # Open Food Facts donne le sodium en g/100 g
+    if 'sodium_100g' in bloc.columns:
+        resultat['Sodium_mg'] = pd.to_numeric(resultat['Sodium_mg'], errors='coerce') * 1000
+    if 'nutriscore_grade' in bloc.columns:
+        resultat['Label_Nutriscore'] = resultat['Label_Nutriscore'].astype('string').str.upper()
+    
+    criteres = list(definir_poids_criteres())
+    for critere in criteres:
+        if critere not in resultat.columns:
+            resultat[critere] = np.nan
+        resultat[critere] = pd.to_numeric(resultat[critere], errors='coerce')
+    resultat[CRITERES_ZERO_PAR_DEFAUT] = resultat[CRITERES_ZERO_PAR_DEFAUT].fillna(0)
+    
+    identite = [colonne for colonne in COLONNES_IDENTITE if colonne in resultat.columns]
+    return resultat[identite + criteres]
+
+
+def profils_premiere_passe(chemin: str, taille_bloc: int, separateur: str = None,
+                           k: int = 800, graine: int = 0,
+                           quantiles: Tuple[float, ...] = QUANTILES_PROFILS,
+                           facteur_min: float = FACTEUR_MIN_PROFILS,
+                           facteur_max: float = FACTEUR_MAX_PROFILS) -> pd.DataFrame:
+    """
+    Première passe sur le fichier pour construire les profils limites
+    
+    Les quantiles de chaque critère sont estimés par des esquisses KLL
+    (voir esquisses_quantiles) : la mémoire utilisée ne dépend pas de la
+    taille du fichier.
+    """
+    esquisses = EsquissesProfils(k=k, graine=graine)
+    
+    for bloc in lire_par_blocs(chemin, taille_bloc, separateur):
+        esquisses.mettre_a_jour(bloc.dropna(subset=CRITERES_OBLIGATOIRES))
+    
+    return esquisses.profils(quantiles, facteur_min, facteur_max)
+
+
+class EcrivainResultats:
+    """
+    Écriture incrémentale des résultats en CSV ou Parquet
+    
+    En Parquet, le schéma est fixé au premier bloc (colonnes texte en
+    chaînes) et chaque bloc y est converti : une colonne entièrement vide
+    dans un bloc (type null ou double) ne change pas le schéma du fichier.
+    """
+    
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self.parquet = chemin.endswith('.parquet')
+        self.ecrivain = None
+        self.schema = None
+        self.premier_bloc = True
+    
+    @staticmethod
+    def schema_fichier(bloc: pd.DataFrame, schema):
+        """Schéma Parquet du fichier : colonnes texte ou vides en chaînes"""
+        import pyarrow as pa
+        
+        champs = []
+        for champ in schema:
+            type_pandas = bloc[champ.name].dtype
+            texte = type_pandas == object or isinstance(type_pandas, pd.StringDtype)
+            if texte or pa.types.is_null(champ.type):
+                champ = champ.with_type(pa.string())
+            champs.append(champ)
+        return pa.schema(champs, metadata=schema.metadata)
+    
+    def ecrire(self, bloc: pd.DataFrame):
+        """Ajoute un bloc à la fin du fichier de sortie"""
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            table = pa.Table.from_pandas(bloc, preserve_index=False)
+            if self.ecrivain is None:
+                self.schema = self.schema_fichier(bloc, table.schema)
+                self.ecrivain = pq.ParquetWriter(self.chemin, self.schema)
+            self.ecrivain.write_table(table.cast(self.schema))
+        else:
+            bloc.to_csv(self.chemin, mode='w' if self.premier_bloc else 'a',
+                        header=self.premier_bloc, index=False, encoding='utf-8')
+        self.premier_bloc = False
+    
+    def fermer(self):
+        if self.ecrivain is not None:
+            self.ecrivain.close()
+
+
+def classifier_flux(entree: str, sortie: str, profils: pd.DataFrame,
+                    lambda_seuil: float = 0.6, taille_bloc: int = 100_000,
+                    separateur: str = None, n_processus: int = 1,
+                    verbeux: bool = True,
+                    evaluation: Dict[str, AccumulateurConfusion] = None) -> int:
+    """
+    Classifie un fichier bloc par bloc et écrit les résultats au fur et à mesure
+    
+    Args:
+        entree: Fichier CSV/TSV (export Open Food Facts ou schéma du projet)
+        sortie: Fichier de résultats (.csv ou .parquet)
+        profils: Profils limites communs à tous les blocs
+        lambda_seuil: Seuil de majorité ELECTRE TRI
+        taille_bloc: Nombre de lignes lues par bloc
+        separateur: Séparateur (détecté automatiquement si absent)
+        n_processus: Processus utilisés pour classer chaque bloc (un même
+                     pool pour tout le fichier)
+        verbeux: Affiche le débit après chaque bloc
+        evaluation: Accumulateurs de confusion par colonne de classe
+                    (ex. 'Classe_ELECTRE_Pessimiste'), mis à jour face à
+                    Label_Nutriscore lorsque la colonne est présente
+    
+    Returns:
+        Nombre de produits classés
+    """
+    electre = ElectreTri(definir_poids_criteres(), profils, lambda_seuil)
+    ecrivain = EcrivainResultats(sortie)
+    classifieur = ClassifieurParallele(electre, n_processus) if n_processus > 1 else None
+    
+    n_classes = 0
+    n_ignores = 0
+    debut = time.perf_counter()
+    
+    try:
+        for bloc in lire_par_blocs(entree, taille_bloc, separateur):
+            valides = bloc.dropna(subset=CRITERES_OBLIGATOIRES)
+            n_ignores += len(bloc) - len(valides)
+            
+            if classifieur is not None:
+                # Une tranche par processus : chaque bloc occupe tout le pool
+                resultats = classifieur.classifier(
+                    valides, taille_tranche=max(-(-len(valides) // n_processus), 1))
+            else:
+                scores = NutriScore.scorer_lot(valides)
+                resultats = electre.classifier_lot(valides)
+                resultats.insert(0, 'Score_Nutriscore_Calcule', scores['score'])
+                resultats.insert(1, 'Label_Nutriscore_Calcule', scores['label'])
+            
+            if evaluation and 'Label_Nutriscore' in valides.columns:
+                for colonne, accumulateur in evaluation.items():
+                    accumulateur.mettre_a_jour(valides['Label_Nutriscore'], resultats[colonne])
+            
+            identite = [c for c in COLONNES_IDENTITE if c in valides.columns]
+            ecrivain.ecrire(pd.concat([valides[identite], resultats], axis=1))
+            
+            n_classes += len(valides)
+            if verbeux:
+                duree = time.perf_counter() - debut
+                print(f"  {n_classes:>12,} produits classés "
+                      f"({n_ignores:,} ignorés) - {n_classes / duree:,.0f} lignes/s",
+                      file=sys.stderr)
+    finally:
+        ecrivain.fermer()
+        if classifieur is not None:
+            classifieur.fermer()
+    
+    return n_classes
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Classification Nutri-Score + ELECTRE TRI en flux d'un export Open Food Facts")
+    parser.add_argument('entree', help="Fichier CSV/TSV d'entrée")
+    parser.add_argument('sortie', help="Fichier de résultats (.csv ou .parquet)")
+    parser.add_argument('--profils', help="Profils limites (profils_limites.csv) ; "
+                                          "sinon calculés par une première passe")
+    parser.add_argument('--lambda', dest='lambda_seuil', type=float, default=0.6,
+                        help="Seuil de majorité (défaut: 0.6)")
+    parser.add_argument('--taille-bloc', type=int, default=100_000,
+                        help="Nombre de lignes par bloc (défaut: 100000)")
+    parser.add_argument('--separateur', help="Séparateur (détecté automatiquement)")
+    parser.add_argument('--processus', type=int, default=1,
+                        help="Processus par bloc (défaut: 1)")
+    args = parser.parse_args(arguments)
+    
+    if args.profils:
+        profils = pd.read_csv(args.profils, index_col=0).astype(float)
+    else:
+        print("📋 Première passe : construction des profils limites...", file=sys.stderr)
+        profils = profils_premiere_passe(args.entree, args.taille_bloc, args.separateur)
+    
+    evaluation = {colonne: AccumulateurConfusion()
+                  for colonne in ('Label_Nutriscore_Calcule', 'Classe_ELECTRE_Pessimiste',
+                                  'Classe_ELECTRE_Optimiste')}
+    
+    print("🔬 Classification en flux...", file=sys.stderr)
+    n = classifier_flux(args.entree, args.sortie, profils, args.lambda_seuil,
+                        args.taille_bloc, args.separateur, args.processus,
+                        evaluation=evaluation)
+    print(f"✓ {n:,} produits classés dans: {args.sortie}", file=sys.stderr)
+    
+    # Concordance avec les labels Nutri-Score de l'entrée (si disponibles)
+    for colonne, accumulateur in evaluation.items():
+        if accumulateur.comptes.sum() > 0:
+            metriques = accumulateur.metriques()
+            print(f"  {colonne}: accuracy {metriques['accuracy']:.2%}, "
+                  f"kappa pondéré {metriques['kappa_pondere']:.3f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
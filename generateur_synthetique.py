@@ -0,0 +1,233 @@
+"""
+Générateur de produits synthétiques pour les tests de charge
+Loi jointe des critères ajustée par catégorie (copule gaussienne avec masse en
+zéro), écriture en flux CSV/Parquet en mémoire bornée
+
+Pour chaque catégorie, chaque critère est décrit par sa proportion de zéros et
+la loi empirique de ses valeurs non nulles ; les dépendances (sucres / énergie,
+protéines / matières grasses...) sont portées par la matrice de corrélation des
+scores normaux des rangs. Un produit est tiré en générant un vecteur gaussien
+corrélé, puis chaque composante est ramenée à la loi du critère : sous la
+proportion de zéros elle donne 0, au-delà une valeur non nulle. Les valeurs
+générées restent dans l'étendue observée pour la catégorie.
+
+Exemple :
+    python generateur_synthetique.py produits_synthetiques.parquet 10000000 --graine 42
+"""
+
+import argparse
+import math
+import sys
+from typing import Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+from supernutriscore import NutriScore, CRITERES
+
+
+# Critères à valeurs entières (arrondis après tirage)
+CRITERES_ENTIERS = ('Fruits_Legumes_Pct', 'Nombre_Additifs')
+
+# Table de la fonction de répartition de la loi normale (interpolée, sans scipy)
+_GRILLE_Z = np.linspace(-8.5, 8.5, 100_001)
+_GRILLE_PHI = np.array([0.5 * (1 + math.erf(z / math.sqrt(2))) for z in _GRILLE_Z])
+
+
+def repartition_normale(z: np.ndarray) -> np.ndarray:
+    """Fonction de répartition de la loi normale centrée réduite"""
+    return np.interp(z, _GRILLE_Z, _GRILLE_PHI)
+
+
+def quantile_normal(u: np.ndarray) -> np.ndarray:
+    """Réciproque de repartition_normale (u dans ]0, 1[)"""
+    return np.interp(u, _GRILLE_PHI, _GRILLE_Z)
+
+
+def correlation_valide(correlation: np.ndarray, minimum: float = 1e-6) -> np.ndarray:
+    """
+    Ramène une matrice de corrélation estimée à une matrice définie positive
+    
+    Les critères constants (corrélation indéfinie) sont rendus indépendants,
+    puis les valeurs propres sont bornées inférieurement et la diagonale
+    remise à 1.
+    """
+    correlation = np.nan_to_num(correlation, nan=0.0)
+    np.fill_diagonal(correlation, 1.0)
+    valeurs, vecteurs = np.linalg.eigh(correlation)
+    correlation = (vecteurs * np.maximum(valeurs, minimum)) @ vecteurs.T
+    ecarts = np.sqrt(np.diag(correlation))
+    return correlation / np.outer(ecarts, ecarts)
+
+
+class ModeleSynthetique:
+    """Loi jointe des critères par catégorie, ajustée sur une base réelle"""
+    
+    def __init__(self, criteres=None, colonne_categorie: str = 'Categorie'):
+        self.criteres = list(criteres or CRITERES)
+        self.colonne_categorie = colonne_categorie
+        self.categories: list = []
+        self.proportions = np.empty(0)
+        self.lois: Dict[str, Dict] = {}
+    
+    @classmethod
+    def ajuster(cls, df: pd.DataFrame, criteres=None,
+                colonne_categorie: str = 'Categorie') -> 'ModeleSynthetique':
+        """
+        Ajuste le modèle sur une base de produits
+        
+        Sans colonne de catégorie, toute la base forme une seule catégorie.
+        
+        Args:
+            df: Base réelle (ex. base_donnees_boissons.csv)
+            criteres: Critères modélisés (par défaut les 8 critères d'ELECTRE TRI)
+            colonne_categorie: Colonne définissant les groupes de produits
+        """
+        modele = cls(criteres, colonne_categorie)
+        donnees = df.dropna(subset=modele.criteres)
+        
+        if colonne_categorie in donnees.columns:
+            groupes = donnees.groupby(colonne_categorie, observed=True, sort=True)
+        else:
+            groupes = [('Tous', donnees)]
+        
+        effectifs = []
+        for categorie, groupe in groupes:
+            modele.categories.append(categorie)
+            modele.lois[categorie] = modele.ajuster_categorie(groupe)
+            effectifs.append(len(groupe))
+        
+        modele.proportions = np.array(effectifs, dtype=float) / sum(effectifs)
+        return modele
+    
+    def ajuster_categorie(self, groupe: pd.DataFrame) -> Dict:
+        """
+        Lois marginales (zéros + valeurs non nulles triées) et facteur de
+        Cholesky de la corrélation des scores normaux d'une catégorie
+        """
+        X = groupe[self.criteres].to_numpy(dtype=float)
+        n = len(X)
+        
+        zeros = (X == 0).mean(axis=0)
+        valeurs = [np.sort(X[X[:, j] != 0, j]) for j in range(X.shape[1])]
+        
+        # Scores normaux des rangs (rangs moyens en cas d'égalité, dont les zéros)
+        rangs = groupe[self.criteres].rank(method='average').to_numpy()
+        scores = quantile_normal((rangs - 0.5) / n)
+        if n > 1:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                correlation = np.corrcoef(scores, rowvar=False)
+        else:
+            correlation = np.eye(len(self.criteres))
+        
+        return {
+            'zeros': zeros,
+            'valeurs': valeurs,
+            'cholesky': np.linalg.cholesky(correlation_valide(correlation))
+        }
+    
+    def generer_categorie(self, categorie, n: int, rng: np.random.Generator) -> np.ndarray:
+        """Tire n produits d'une catégorie (matrice n x critères)"""
+        loi = self.lois[categorie]
+        Z = rng.standard_normal((n, len(self.criteres))) @ loi['cholesky'].T
+        U = repartition_normale(Z)
+        
+        X = np.zeros((n, len(self.criteres)))
+        for j, critere in enumerate(self.criteres):
+            valeurs = loi['valeurs'][j]
+            if len(valeurs) == 0:
+                continue
+            p0 = loi['zeros'][j]
+            non_nuls = U[:, j] >= p0
+            # Position dans la loi des valeurs non nulles, interpolée entre les
+            # valeurs observées
+            q = (U[non_nuls, j] - p0) / (1 - p0)
+            X[non_nuls, j] = np.interp(q * (len(valeurs) - 1),
+                                       np.arange(len(valeurs)), valeurs)
+            if critere in CRITERES_ENTIERS:
+                X[:, j] = np.round(X[:, j])
+        return X
+    
+    def generer(self, n: int, rng: np.random.Generator, debut_id: int = 1) -> pd.DataFrame:
+        """
+        Tire n produits (catégories selon leurs proportions dans la base réelle)
+        
+        Returns:
+            DataFrame ID, catégorie, critères, Score_Nutriscore et
+            Label_Nutriscore (calculés sur les valeurs générées)
+        """
+        effectifs = rng.multinomial(n, self.proportions)
+        codes = np.repeat(np.arange(len(self.categories)), effectifs)
+        X = np.vstack([self.generer_categorie(categorie, effectif, rng)
+                       for categorie, effectif in zip(self.categories, effectifs)]
+                      or [np.empty((0, len(self.criteres)))])
+        
+        ordre = rng.permutation(n)
+        codes, X = codes[ordre], X[ordre]
+        
+        df = pd.DataFrame(X, columns=self.criteres)
+        df.insert(0, 'ID', np.arange(debut_id, debut_id + n))
+        df.insert(1, self.colonne_categorie,
+                  pd.Categorical.from_codes(codes, categories=self.categories))
+        if all(colonne in df.columns for colonne in NutriScore.COLONNES_LOT.values()):
+            scores = NutriScore.scorer_lot(df)
+            df['Score_Nutriscore'] = scores['score'].to_numpy()
+            df['Label_Nutriscore'] = scores['label'].to_numpy()
+        
+        return df
+    
+    def generer_flux(self, n: int, taille_bloc: int = 100_000,
+                     graine: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        Tire n produits par blocs (mémoire bornée par taille_bloc)
+        
+        Le résultat est reproductible pour une graine et une taille de bloc
+        données.
+        """
+        rng = np.random.default_rng(graine)
+        for debut in range(0, n, taille_bloc):
+            yield self.generer(min(taille_bloc, n - debut), rng, debut_id=debut + 1)
+
+
+def ecrire_synthetique(modele: ModeleSynthetique, chemin: str, n: int,
+                       taille_bloc: int = 100_000, graine: int = 0) -> int:
+    """
+    Écrit n produits synthétiques en CSV ou Parquet (selon l'extension)
+    
+    Returns:
+        Nombre de produits écrits
+    """
+    from flux_openfoodfacts import EcrivainResultats
+    
+    ecrivain = EcrivainResultats(chemin)
+    ecrits = 0
+    try:
+        for bloc in modele.generer_flux(n, taille_bloc, graine):
+            ecrivain.ecrire(bloc)
+            ecrits += len(bloc)
+    finally:
+        ecrivain.fermer()
+    return ecrits
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Génération de produits synthétiques fidèles à la base réelle")
+    parser.add_argument('sortie', help="Fichier de sortie (.csv ou .parquet)")
+    parser.add_argument('n', type=float, help="Nombre de produits (ex. 1e6)")
+    parser.add_argument('--source', default='base_donnees_boissons.csv',
+                        help="Base réelle servant à ajuster le modèle")
+    parser.add_argument('--graine', type=int, default=0)
+    parser.add_argument('--taille-bloc', type=int, default=100_000,
+                        help="Nombre de produits par bloc (défaut: 100000)")
+    args = parser.parse_args(arguments)
+    
+    from ingestion import charger_dataframe
+    
+    modele = ModeleSynthetique.ajuster(charger_dataframe(args.source))
+    n = ecrire_synthetique(modele, args.sortie, int(args.n), args.taille_bloc, args.graine)
+    print(f"✓ {n:,} produits synthétiques écrits dans: {args.sortie}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Ingestion de la base de produits dans un cache colonnaire sur disque
+Les critères sont stockés en matrice float64 contiguë (chargeable par mmap),
+le reste des colonnes dans une table séparée ; le cache est indexé par le
+hachage du contenu du fichier source.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from supernutriscore import CRITERES, ElectreTri, AnalyseResultats
+from instrumentation import etape
+
+
+DOSSIER_CACHE = '.cache_base'
+
+# Incrémentée à chaque changement du format du cache ou du schéma des colonnes
+VERSION_CACHE = 4
+
+COLONNE_CODE_BARRES = 'Code_Barres'
+
+CLASSES_ELECTRE = pd.CategoricalDtype(ElectreTri.CLASSES, ordered=True)
+
+# Types compacts des colonnes de la base. Les colonnes décimales restent en
+# float64 : les critères (énergie, sucres, sodium...) sont comparés exactement
+# aux seuils du Nutri-Score et aux profils limites, et les autres (énergie en
+# kcal, sel, Green-Score) sont exportées telles quelles, ce qu'un arrondi
+# float32 fausserait (58.6 deviendrait 58.599998).
+SCHEMA_BASE: Dict[str, object] = {
+    'ID': 'int32',
+    'Marque': 'category',
+    'Categorie': 'category',
+    'Energie_kcal': 'float64',
+    'Sel_g': 'float64',
+    'Fruits_Legumes_Pct': 'int8',
+    'Score_Nutriscore': 'int8',
+    'Label_Nutriscore': pd.CategoricalDtype(AnalyseResultats.CLASSES, ordered=True),
+    'Score_Greenscore': 'float64',
+    'Label_Greenscore': 'category',
+    'Label_Bio': 'bool',
+    'Nombre_Additifs': 'int8',
+    'Date_Collecte': 'category',
+    'Classe_ELECTRE_Pessimiste_06': CLASSES_ELECTRE,
+    'Classe_ELECTRE_Optimiste_06': CLASSES_ELECTRE,
+    'Classe_ELECTRE_Pessimiste_07': CLASSES_ELECTRE,
+    'Classe_ELECTRE_Optimiste_07': CLASSES_ELECTRE,
+    'Classe_SuperNutriScore': 'category'
+}
+
+
+def hacher_fichier(chemin: str, taille_bloc: int = 1024 ** 2) -> str:
+    """Hachage SHA-256 du contenu d'un fichier (lu par blocs)"""
+    hachage = hashlib.sha256()
+    with open(chemin, 'rb') as fichier:
+        for bloc in iter(lambda: fichier.read(taille_bloc), b''):
+            hachage.update(bloc)
+    return hachage.hexdigest()
+
+
+def lire_source(chemin: str) -> pd.DataFrame:
+    """Lit la base source (CSV ou XLSX) et nettoie les noms de colonnes"""
+    if chemin.endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(chemin)
+    else:
+        df = pd.read_csv(chemin, encoding='utf-8')
+    df.columns = df.columns.str.strip()
+    return appliquer_schema(df)
+
+
+def convertir_colonne(serie: pd.Series, type_cible) -> pd.Series:
+    """
+    Convertit une colonne vers son type compact, si ses valeurs le permettent
+    
+    - bool : 'OUI' (ou True, 1) devient True, tout le reste False
+    - entiers : seulement sans valeur manquante, entière et dans les bornes du
+      type ; sinon la colonne reste en float64
+    - catégories fixées : seulement si toutes les valeurs en font partie
+      (aucune valeur n'est perdue), sinon catégories déduites des données
+    """
+    if type_cible == 'bool':
+        if serie.dtype == bool:
+            return serie
+        return serie.astype(str).str.strip().str.upper().isin(('OUI', 'TRUE', '1'))
+    
+    if isinstance(type_cible, pd.CategoricalDtype):
+        valeurs = set(serie.dropna().unique())
+        if valeurs <= set(type_cible.categories):
+            return serie.astype(type_cible)
+        return serie.astype('category')
+    
+    if type_cible == 'category':
+        return serie.astype('category')
+    
+    if np.issubdtype(np.dtype(type_cible), np.integer):
+        valeurs = pd.to_numeric(serie, errors='coerce')
+        bornes = np.iinfo(type_cible)
+        if (valeurs.notna().all() and (valeurs == np.round(valeurs)).all()
+                and (len(valeurs) == 0
+                     or (valeurs.min() >= bornes.min and valeurs.max() <= bornes.max))):
+            return valeurs.astype(type_cible)
+        return valeurs.astype(np.float64)
+    
+    return pd.to_numeric(serie, errors='coerce').astype(type_cible)
+
+
+def appliquer_schema(df: pd.DataFrame, schema: Dict[str, object] = None) -> pd.DataFrame:
+    """Applique les types compacts de SCHEMA_BASE aux colonnes présentes"""
+    schema = SCHEMA_BASE if schema is None else schema
+    for colonne, type_cible in schema.items():
+        if colonne in df.columns:
+            df[colonne] = convertir_colonne(df[colonne], type_cible)
+    return df
+
+
+def preparer_export(df: pd.DataFrame) -> pd.DataFrame:
+    """Remet Label_Bio au format OUI/NON de la base source pour les exports"""
+    if 'Label_Bio' in df.columns and df['Label_Bio'].dtype == bool:
+        return df.assign(Label_Bio=np.where(df['Label_Bio'], 'OUI', 'NON'))
+    return df
+
+
+def memoire_par_produit(df: pd.DataFrame) -> float:
+    """Mémoire occupée par produit (en octets, chaînes comprises)"""
+    return df.memory_usage(deep=True).sum() / max(len(df), 1)
+
+
+def normaliser_code_barres(code) -> Optional[int]:
+    """
+    Code-barres sous forme d'entier (les zéros de tête sont ignorés, comme
+    pour la comparaison de GTIN) ; None si le code n'est pas numérique
+    """
+    try:
+        valeur = int(str(code).strip().split('.')[0])
+    except ValueError:
+        return None
+    return valeur if valeur >= 0 else None
+
+
+def index_codes_barres(codes: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Index trié codes-barres -> positions des lignes
+    
+    Les codes non numériques ne sont pas indexés ; pour un code en double,
+    la première ligne est retenue lors de la recherche.
+    
+    Returns:
+        (codes triés int64, positions correspondantes int64)
+    """
+    if pd.api.types.is_integer_dtype(codes):
+        valeurs = codes.to_numpy(dtype=np.int64)
+        valides = valeurs >= 0
+    else:
+        nombres = pd.to_numeric(codes, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        valides = np.isfinite(nombres) & (nombres >= 0) & (nombres == np.floor(nombres))
+        valeurs = np.where(valides, nombres, -1).astype(np.int64)
+    
+    positions = np.flatnonzero(valides)
+    valeurs = valeurs[positions]
+    ordre = np.argsort(valeurs, kind='stable')
+    return valeurs[ordre], positions[ordre].astype(np.int64)
+
+
+class BaseColonnaire:
+    """
+    Base de produits chargée depuis le cache colonnaire
+    
+    Attributes:
+        criteres: Matrice n x m des critères (mmap en lecture seule, ordre CRITERES)
+        noms_criteres: Noms des colonnes de la matrice
+        autres: Table des autres colonnes (textes, identifiants, scores...)
+        empreinte: Hachage du fichier source
+        codes_barres, positions_codes: Index trié des codes-barres (mmap), ou
+                                       None si la base n'a pas de codes-barres
+    """
+    
+    def __init__(self, dossier: str, mmap: bool = True):
+        with open(os.path.join(dossier, 'meta.json'), encoding='utf-8') as fichier:
+            self.meta = json.load(fichier)
+        
+        self.empreinte = self.meta['empreinte']
+        self.noms_criteres = self.meta['criteres']
+        self.criteres = np.load(os.path.join(dossier, 'criteres.npy'),
+                                mmap_mode='r' if mmap else None)
+        self.autres = pd.read_pickle(os.path.join(dossier, 'autres.pkl'))
+        
+        self.codes_barres = self.positions_codes = None
+        if os.path.exists(os.path.join(dossier, 'codes_barres.npy')):
+            self.codes_barres = np.load(os.path.join(dossier, 'codes_barres.npy'),
+                                        mmap_mode='r' if mmap else None)
+            self.positions_codes = np.load(os.path.join(dossier, 'positions_codes.npy'),
+                                           mmap_mode='r' if mmap else None)
+    
+    def position(self, code) -> Optional[int]:
+        """Ligne du produit portant ce code-barres (recherche dichotomique), ou None"""
+        cle = normaliser_code_barres(code)
+        if cle is None or self.codes_barres is None:
+            return None
+        i = int(np.searchsorted(self.codes_barres, cle))
+        if i < len(self.codes_barres) and self.codes_barres[i] == cle:
+            return int(self.positions_codes[i])
+        return None
+    
+    def __len__(self) -> int:
+        return len(self.criteres)
+    
+    def dataframe(self) -> pd.DataFrame:
+        """Reconstruit le DataFrame complet (ordre et types des colonnes d'origine)"""
+        df = self.autres.copy()
+        for j, critere in enumerate(self.noms_criteres):
+            df[critere] = np.asarray(self.criteres[:, j]).astype(self.meta['types'][critere])
+        return df[self.meta['colonnes']]
+
+
+def construire_cache(df: pd.DataFrame, dossier: str, empreinte: str, source: str):
+    """
+    Écrit le cache colonnaire d'une base
+    
+    L'écriture se fait dans un dossier temporaire renommé à la fin : un
+    cache interrompu n'est jamais lu.
+    """
+    criteres = [c for c in CRITERES if c in df.columns]
+    parent = os.path.dirname(os.path.abspath(dossier))
+    os.makedirs(parent, exist_ok=True)
+    temporaire = tempfile.mkdtemp(dir=parent)
+    
+    try:
+        matrice = np.ascontiguousarray(df[criteres].to_numpy(dtype=np.float64))
+        np.save(os.path.join(temporaire, 'criteres.npy'), matrice)
+        df.drop(columns=criteres).to_pickle(os.path.join(temporaire, 'autres.pkl'))
+        
+        if COLONNE_CODE_BARRES in df.columns:
+            codes, positions = index_codes_barres(df[COLONNE_CODE_BARRES])
+            np.save(os.path.join(temporaire, 'codes_barres.npy'), codes)
+            np.save(os.path.join(temporaire, 'positions_codes.npy'), positions)
+        
+        meta = {
+            'empreinte': empreinte,
+            'source': os.path.basename(source),
+            'colonnes': list(df.columns),
+            'criteres': criteres,
+            'types': {c: str(df[c].dtype) for c in criteres},
+            'n_produits': len(df)
+        }
+        with open(os.path.join(temporaire, 'meta.json'), 'w', encoding='utf-8') as fichier:
+            json.dump(meta, fichier, ensure_ascii=False, indent=2)
+        
+        os.replace(temporaire, dossier)
+    except OSError:
+        # Un autre processus a pu écrire le même cache entre-temps
+        shutil.rmtree(temporaire, ignore_errors=True)
+        if not os.path.exists(os.path.join(dossier, 'meta.json')):
+            raise
+
+
+def charger_base(chemin: str, dossier_cache: str = DOSSIER_CACHE,
+                 mmap: bool = True) -> BaseColonnaire:
+    """
+    Charge la base via le cache colonnaire, en le construisant au premier appel
+    
+    Le cache est indexé par le hachage du contenu du fichier et la version du
+    schéma : toute modification de l'un ou de l'autre crée une nouvelle entrée.
+    
+    Args:
+        chemin: Fichier source (CSV ou XLSX)
+        dossier_cache: Dossier des caches
+        mmap: Charge la matrice des critères par mmap (sans copie)
+    
+    Returns:
+        BaseColonnaire
+    """
+    with etape('ingestion.charger_base', source=os.path.basename(chemin)) as mesure:
+        empreinte = hacher_fichier(chemin)
+        dossier = os.path.join(dossier_cache, f'{empreinte}.v{VERSION_CACHE}')
+        
+        construit = not os.path.exists(os.path.join(dossier, 'meta.json'))
+        if construit:
+            construire_cache(lire_source(chemin), dossier, empreinte, chemin)
+        
+        base = BaseColonnaire(dossier, mmap)
+        mesure.ajouter(lignes=len(base), cache_construit=construit)
+    
+    return base
+
+
+def charger_dataframe(chemin: str, dossier_cache: str = DOSSIER_CACHE) -> pd.DataFrame:
+    """Raccourci : DataFrame complet de la base, lu depuis le cache colonnaire"""
+    return charger_base(chemin, dossier_cache).dataframe()
@@ -0,0 +1,237 @@
+"""
+Instrumentation des étapes du pipeline (chargement, profils, classification,
+métriques, exports, graphiques)
+
+Chaque étape mesure son temps réel, son temps CPU, le nombre de lignes traitées
+et son pic de mémoire. Les mesures sont exportées au format Trace Event JSON,
+lisible par chrome://tracing, Perfetto (ui.perfetto.dev) ou speedscope.
+
+Activation par variable d'environnement, avant le lancement :
+    SUPERNUTRISCORE_TRACE=trace.json python analyser_donnees.py
+    SUPERNUTRISCORE_TRACE=1 streamlit run interface_streamlit.py   (trace_supernutriscore.json)
+
+Désactivée (par défaut), une étape se réduit à un test de booléen et au retour
+d'un objet partagé qui ne fait rien.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+
+VARIABLE_ENVIRONNEMENT = 'SUPERNUTRISCORE_TRACE'
+FICHIER_PAR_DEFAUT = 'trace_supernutriscore.json'
+
+_actif = False
+_chemin = None
+_evenements: List[Dict] = []
+_verrou = threading.Lock()
+_pile = threading.local()
+
+
+class _EtapeInactive:
+    """Étape sans effet, renvoyée lorsque l'instrumentation est désactivée"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def ajouter(self, **attributs):
+        pass
+
+
+_INACTIVE = _EtapeInactive()
+
+
+class Etape:
+    """Mesure d'une étape (à utiliser avec with)"""
+    
+    __slots__ = ('nom', 'attributs', 'debut', 'debut_cpu', 'memoire_debut', 'pic')
+    
+    def __init__(self, nom: str, attributs: Dict):
+        self.nom = nom
+        self.attributs = attributs
+    
+    def ajouter(self, **attributs):
+        """Complète les attributs de l'étape (ex. lignes connues en cours de route)"""
+        self.attributs.update(attributs)
+    
+    def __enter__(self):
+        pile = getattr(_pile, 'etapes', None)
+        if pile is None:
+            pile = _pile.etapes = []
+        
+        # Le pic mémoire est remis à zéro pour cette étape : celui atteint
+        # jusqu'ici est conservé par l'étape englobante
+        memoire, pic = tracemalloc.get_traced_memory()
+        if pile:
+            pile[-1].pic = max(pile[-1].pic, pic)
+        tracemalloc.reset_peak()
+        
+        self.memoire_debut = memoire
+        self.pic = memoire
+        pile.append(self)
+        self.debut_cpu = time.process_time_ns()
+        self.debut = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, *exc):
+        fin = time.perf_counter_ns()
+        fin_cpu = time.process_time_ns()
+        self.pic = max(self.pic, tracemalloc.get_traced_memory()[1])
+        
+        pile = _pile.etapes
+        pile.pop()
+        if pile:
+            pile[-1].pic = max(pile[-1].pic, self.pic)
+        
+        arguments = {k: (v if isinstance(v, (int, float, str, bool)) or v is None else str(v))
+                     for k, v in self.attributs.items()}
+        arguments.update(
+            cpu_ms=(fin_cpu - self.debut_cpu) / 1e6,
+            pic_memoire_octets=self.pic - self.memoire_debut
+        )
+        evenement = {
+            'name': self.nom,
+            'cat': self.nom.split('.')[0],
+            'ph': 'X',
+            'ts': self.debut / 1e3,
+            'dur': (fin - self.debut) / 1e3,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': arguments
+        }
+        with _verrou:
+            _evenements.append(evenement)
+        return False
+
+
+def etape(nom: str, **attributs):
+    """
+    Contexte mesurant une étape
+    
+    Exemple :
+        with etape('electre.classification', lignes=len(df), methode='pessimiste'):
+            ...
+    
+    Args:
+        nom: Nom de l'étape (le préfixe avant le premier point sert de catégorie)
+        attributs: Valeurs ajoutées à la trace (lignes, paramètres...)
+    """
+    if not _actif:
+        return _INACTIVE
+    return Etape(nom, attributs)
+
+
+def _lignes(arguments) -> int:
+    """Nombre de lignes du premier argument tabulaire (DataFrame, Series, ndarray)"""
+    for argument in arguments:
+        forme = getattr(argument, 'shape', None)
+        if forme:
+            return int(forme[0])
+    return None
+
+
+def trace(nom: str = None):
+    """
+    Décorateur : mesure chaque appel de la fonction comme une étape
+    
+    Le nombre de lignes est celui du premier argument tabulaire.
+    """
+    def decorateur(fonction: Callable) -> Callable:
+        nom_etape = nom or f'{fonction.__module__}.{fonction.__qualname__}'
+        
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            if not _actif:
+                return fonction(*args, **kwargs)
+            with Etape(nom_etape, {'lignes': _lignes(args)}):
+                return fonction(*args, **kwargs)
+        return enveloppe
+    return decorateur
+
+
+def activer(chemin: str = FICHIER_PAR_DEFAUT):
+    """Active l'instrumentation ; la trace est écrite dans chemin à la sortie"""
+    global _actif, _chemin
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if _chemin is None:
+        atexit.register(_exporter_a_la_sortie)
+    _chemin = chemin
+    _actif = True
+
+
+def desactiver():
+    """Désactive l'instrumentation (les mesures déjà faites sont conservées)"""
+    global _actif
+    _actif = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def est_actif() -> bool:
+    return _actif
+
+
+def evenements() -> List[Dict]:
+    """Copie des étapes mesurées"""
+    with _verrou:
+        return list(_evenements)
+
+
+def resume():
+    """Total par étape (DataFrame) : appels, temps réel et CPU, lignes, pic mémoire maximal"""
+    import pandas as pd
+    
+    lignes = [{
+        'etape': e['name'],
+        'duree_ms': e['dur'] / 1e3,
+        'cpu_ms': e['args']['cpu_ms'],
+        'lignes': e['args'].get('lignes', 0) or 0,
+        'pic_memoire_octets': e['args']['pic_memoire_octets']
+    } for e in evenements()]
+    if not lignes:
+        return pd.DataFrame(columns=['appels', 'duree_ms', 'cpu_ms', 'lignes',
+                                     'pic_memoire_octets'])
+    
+    return pd.DataFrame(lignes).groupby('etape', sort=False).agg(
+        appels=('duree_ms', 'size'),
+        duree_ms=('duree_ms', 'sum'),
+        cpu_ms=('cpu_ms', 'sum'),
+        lignes=('lignes', 'sum'),
+        pic_memoire_octets=('pic_memoire_octets', 'max')
+    )
+
+
+def exporter(chemin: str = None) -> str:
+    """
+    Écrit la trace au format Trace Event JSON
+    
+    Returns:
+        Chemin du fichier écrit
+    """
+    chemin = chemin or _chemin or FICHIER_PAR_DEFAUT
+    with open(chemin, 'w', encoding='utf-8') as fichier:
+        json.dump({'traceEvents': evenements(), 'displayTimeUnit': 'ms'},
+                  fichier, ensure_ascii=False)
+    return chemin
+
+
+def _exporter_a_la_sortie():
+    if _evenements:
+        exporter()
+
+
+_valeur = os.environ.get(VARIABLE_ENVIRONNEMENT, '').strip()
+if _valeur and _valeur.lower() not in ('0', 'false', 'non'):
+    activer(FICHIER_PAR_DEFAUT if _valeur.lower() in ('1', 'true', 'oui') else _valeur)
@@ -10,8 +10,13 @@ import plotly.express as px
 import plotly.graph_objects as go
 from supernutriscore import (
     NutriScore, ElectreTri, AnalyseResultats,
-    creer_profils_limites, definir_poids_criteres
+    creer_profils_limites, definir_poids_criteres,
+    QUANTILES_PROFILS, FACTEUR_MIN_PROFILS, FACTEUR_MAX_PROFILS
 )
+from ingestion import charger_dataframe, preparer_export
+from instrumentation import etape
+from cache_resultats import CacheResultats, empreinte_donnees, normaliser_poids
+from stockage import StockageSQLite
 
 # Configuration de la page
 st.set_page_config(
@@ -36,16 +41,87 @@ page = st.sidebar.selectbox(
 def charger_donnees():
     """Charge la base de données des boissons"""
     try:
-        df = pd.read_csv('base_donnees_boissons.csv', encoding='utf-8')
-        # Nettoyer les colonnes
-        df.columns = df.columns.str.strip()
-        return df
+        # Lecture via le cache colonnaire (construit au premier lancement)
+        return charger_dataframe('base_donnees_boissons.csv')
     except Exception as e:
         st.error(f"Erreur lors du chargement des données : {e}")
         return None
 
 df = charger_donnees()
 
+@st.cache_data
+def empreinte_base():
+    """Empreinte du contenu de la base (clé des résultats en cache)"""
+    return empreinte_donnees(charger_donnees())
+
+# Cache des résultats partagé par toutes les sessions (LRU sous budget mémoire)
+@st.cache_resource
+def obtenir_cache():
+    """Crée le cache de résultats commun à toutes les sessions"""
+    return CacheResultats(budget_octets=512 * 1024 ** 2)
+
+cache = obtenir_cache()
+
+# Base SQLite des produits et des classifications (requêtes de sous-ensembles)
+@st.cache_resource
+def obtenir_stockage():
+    """Ouvre la base SQLite commune à toutes les sessions, à jour de la base"""
+    stockage = StockageSQLite('supernutriscore.db')
+    if df is not None and stockage.lire_meta('empreinte_produits') != empreinte_base():
+        stockage.importer_produits(df, empreinte_base())
+    return stockage
+
+stockage = obtenir_stockage()
+
+def enregistrer_classification(poids, lambda_seuil, methode, classes, profils):
+    """Enregistre une classification dans la base SQLite (une seule fois par configuration)"""
+    execution = stockage.trouver_execution(poids, lambda_seuil, methode, profils)
+    if execution is None:
+        with etape('streamlit.enregistrement', lignes=len(classes)):
+            execution = stockage.enregistrer_execution(poids, lambda_seuil, methode,
+                                                       classes, profils, ids=df['ID'])
+    return execution
+
+# Paramètres de construction des profils limites (font partie des clés du cache)
+PARAMETRES_PROFILS = (QUANTILES_PROFILS, FACTEUR_MIN_PROFILS, FACTEUR_MAX_PROFILS)
+
+def calculer_masques():
+    """Profils et masques de comparaison de la base (indépendants des poids)"""
+    def calcul():
+        profils = creer_profils_limites(df)
+        electre = ElectreTri(definir_poids_criteres(), profils, moteur='masques')
+        return profils, electre.masques_comparaison(df)
+    
+    return cache.obtenir(('masques', empreinte_base(), PARAMETRES_PROFILS), calcul)
+
+def calculer_ruptures_lambda(poids):
+    """Profils et classes ELECTRE TRI de la base pour tout λ (un jeu de poids)"""
+    def calcul():
+        profils, (masques_ab, masques_ba) = calculer_masques()
+        electre = ElectreTri(poids, profils, moteur='masques')
+        # Changer les poids ne reconstruit que la table des 2^8 sous-ensembles
+        concordances = electre.concordances_depuis_masques(masques_ab, masques_ba)
+        return profils, electre.points_rupture_lambda(df, concordances)
+    
+    cle = ('ruptures', empreinte_base(), normaliser_poids(poids), PARAMETRES_PROFILS)
+    return cache.obtenir(cle, calcul)
+
+def classifier_base(poids, lambda_seuil, methode):
+    """Classes ELECTRE TRI de la base pour une configuration complète"""
+    def calcul():
+        _, ruptures = calculer_ruptures_lambda(poids)
+        return ruptures.classes_pour(lambda_seuil, methode)
+    
+    cle = ('classes', empreinte_base(), normaliser_poids(poids), lambda_seuil,
+           methode, PARAMETRES_PROFILS)
+    with etape('streamlit.classification', methode=methode, lambda_seuil=lambda_seuil):
+        return cache.obtenir(cle, calcul)
+
+def afficher_graphique(fig):
+    """Affiche une figure Plotly (sérialisation mesurée par l'instrumentation)"""
+    with etape('graphique'):
+        st.plotly_chart(fig, use_container_width=True)
+
 # ============================================================================
 # PAGE ACCUEIL
 # ============================================================================
@@ -90,7 +166,7 @@ if page == "🏠 Accueil":
             st.metric("Nombre de marques", n_marques)
         
         with col4:
-            pct_bio = (df['Label_Bio'] == 'OUI').sum() / len(df) * 100
+            pct_bio = df['Label_Bio'].mean() * 100
             st.metric("% Bio", f"{pct_bio:.1f}%")
         
         # Distribution des labels
@@ -112,7 +188,7 @@ if page == "🏠 Accueil":
             }
         )
         fig.update_layout(showlegend=False, height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        afficher_graphique(fig)
         
         # Aperçu des données
         st.markdown("#### Aperçu de la base de données")
@@ -278,7 +354,7 @@ elif page == "🧮 Calculateur Nutri-Score":
             height=400
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        afficher_graphique(fig)
 
 # ============================================================================
 # PAGE ELECTRE TRI
@@ -343,26 +419,27 @@ elif page == "📊 ELECTRE TRI":
         # Bouton pour lancer la classification
         if st.button("🚀 Lancer la classification ELECTRE TRI", type="primary"):
             with st.spinner("Classification en cours..."):
-                # Créer les profils
-                profils = creer_profils_limites(df)
+                # Profils et classes pour tout λ (recalculés seulement si les poids changent)
+                profils, _ = calculer_ruptures_lambda(poids)
                 
                 # Afficher les profils
                 st.markdown("### 📋 Profils limites")
                 st.dataframe(profils.T, use_container_width=True)
                 
-                # Classifier
-                electre = ElectreTri(poids, profils, lambda_seuil)
-                
+                # Classifier : simple lecture des classes pour le λ choisi
                 methode_str = methode.lower()
-                df_resultat = electre.classifier_base_donnees(df, methode_str)
-                
                 colonne_classe = f'Classe_ELECTRE_{methode}'
                 
+                # Seule la colonne des classes est créée (pas de copie de la base)
+                classes = classifier_base(poids, lambda_seuil, methode_str)
+                execution = enregistrer_classification(poids, lambda_seuil, methode_str,
+                                                       classes, profils)
+                
                 # Afficher les résultats
                 st.markdown(f"### 🎯 Résultats - Procédure {methode}")
                 
                 # Distribution des classes
-                classes_count = df_resultat[colonne_classe].value_counts().sort_index()
+                classes_count = classes.value_counts().sort_index()
                 
                 col1, col2 = st.columns([2, 1])
                 
@@ -373,7 +450,7 @@ elif page == "📊 ELECTRE TRI":
                         labels={'x': 'Classe ELECTRE TRI', 'y': 'Nombre de produits'},
                         title=f"Distribution des classes - {methode}"
                     )
-                    st.plotly_chart(fig, use_container_width=True)
+                    afficher_graphique(fig)
                 
                 with col2:
                     st.markdown("#### Statistiques")
@@ -384,14 +461,10 @@ elif page == "📊 ELECTRE TRI":
                 # Comparaison avec Nutri-Score
                 st.markdown("### 📊 Comparaison avec Nutri-Score")
                 
-                # Préparer les données pour la comparaison
-                df_comp = df_resultat.copy()
-                df_comp['Classe_ELECTRE_Clean'] = df_comp[colonne_classe].str.replace("'", "")
-                
                 # Matrice de confusion
                 matrice = AnalyseResultats.matrice_confusion(
-                    df_comp['Label_Nutriscore'],
-                    df_comp['Classe_ELECTRE_Clean']
+                    df['Label_Nutriscore'],
+                    classes.str.replace("'", "")
                 )
                 
                 col1, col2 = st.columns([2, 1])
@@ -410,7 +483,7 @@ elif page == "📊 ELECTRE TRI":
                         text_auto=True
                     )
                     fig.update_layout(height=400)
-                    st.plotly_chart(fig, use_container_width=True)
+                    afficher_graphique(fig)
                 
                 with col2:
                     # Métriques
@@ -418,6 +491,7 @@ elif page == "📊 ELECTRE TRI":
                     
                     st.markdown("#### Métriques globales")
                     st.metric("Accuracy", f"{metriques['accuracy']:.2%}")
+                    st.metric("Kappa pondéré", f"{metriques['kappa_pondere']:.3f}")
                     
                     st.markdown("#### Par classe")
                     for classe, metrics in metriques['par_classe'].items():
@@ -433,12 +507,24 @@ elif page == "📊 ELECTRE TRI":
                     colonne_classe, 'Score_Nutriscore', 'Nombre_Additifs'
                 ]
                 st.dataframe(
-                    df_resultat[colonnes_affichage].head(20),
+                    df.head(20).assign(**{colonne_classe: classes})[colonnes_affichage],
                     use_container_width=True
                 )
                 
+                # Produits de chaque classe, lus dans la base SQLite (requête sur index)
+                st.markdown("### 🔎 Produits par classe")
+                for onglet, classe in zip(st.tabs(list(ElectreTri.CLASSES)), ElectreTri.CLASSES):
+                    with onglet:
+                        st.dataframe(
+                            stockage.produits(
+                                colonnes=['Nom_Produit', 'Marque', 'Categorie', 'Label_Nutriscore'],
+                                execution=execution, classe=classe, limite=50),
+                            use_container_width=True
+                        )
+                
                 # Téléchargement
-                csv = df_resultat.to_csv(index=False, encoding='utf-8')
+                csv = preparer_export(df).assign(**{colonne_classe: classes}).to_csv(
+                    index=False, encoding='utf-8')
                 st.download_button(
                     label="📥 Télécharger les résultats (CSV)",
                     data=csv,
@@ -465,35 +551,42 @@ elif page == "📈 Analyse Comparative":
         
         col1, col2 = st.columns(2)
         
-        resultats_comparaison = []
-        
-        for lambda_val in [0.6, 0.7]:
-            for methode in ['pessimiste', 'optimiste']:
-                # Créer les profils
-                profils = creer_profils_limites(df)
-                poids = definir_poids_criteres()
-                
-                # Classifier
-                electre = ElectreTri(poids, profils, lambda_val)
-                df_temp = electre.classifier_base_donnees(df, methode)
-                
-                colonne = f'Classe_ELECTRE_{methode.capitalize()}'
-                df_temp['Classe_Clean'] = df_temp[colonne].str.replace("'", "")
-                
-                # Calculer accuracy
-                matrice = AnalyseResultats.matrice_confusion(
-                    df_temp['Label_Nutriscore'],
-                    df_temp['Classe_Clean']
-                )
-                metriques = AnalyseResultats.calculer_metriques(matrice)
-                
-                resultats_comparaison.append({
-                    'Lambda': lambda_val,
-                    'Méthode': methode.capitalize(),
-                    'Accuracy': metriques['accuracy']
-                })
+        def calculer_comparaison():
+            resultats_comparaison = []
+            
+            # Les profils et les concordances sont calculés une seule fois
+            profils = creer_profils_limites(df)
+            poids = definir_poids_criteres()
+            electre = ElectreTri(poids, profils)
+            balayage = electre.balayer_lambdas(df, [0.6, 0.7])
+            classes_balayage = balayage.set_index(['Lambda', 'Methode', 'Produit'])['Classe'].sort_index()
+            
+            for lambda_val in [0.6, 0.7]:
+                for methode in ['pessimiste', 'optimiste']:
+                    classes = classes_balayage.loc[(lambda_val, methode)].astype(str)
+                    classes_clean = classes.str.replace("'", "")
+                    
+                    # Calculer accuracy
+                    matrice = AnalyseResultats.matrice_confusion(
+                        df['Label_Nutriscore'],
+                        classes_clean.reindex(df.index)
+                    )
+                    metriques = AnalyseResultats.calculer_metriques(matrice)
+                    
+                    resultats_comparaison.append({
+                        'Lambda': lambda_val,
+                        'Méthode': methode.capitalize(),
+                        'Accuracy': metriques['accuracy']
+                    })
+            
+            return pd.DataFrame(resultats_comparaison)
         
-        df_comp = pd.DataFrame(resultats_comparaison)
+        # Résultat partagé entre sessions : recalculé seulement si la base change
+        df_comp = cache.obtenir(
+            ('comparaison', empreinte_base(), normaliser_poids(definir_poids_criteres()),
+             (0.6, 0.7), PARAMETRES_PROFILS),
+            calculer_comparaison
+        ).copy()
         
         # Graphique de comparaison
         fig = px.bar(
@@ -505,7 +598,7 @@ elif page == "📈 Analyse Comparative":
             title="Accuracy selon le seuil λ et la méthode",
             labels={'Accuracy': 'Taux de concordance', 'Lambda': 'Seuil λ'}
         )
-        st.plotly_chart(fig, use_container_width=True)
+        afficher_graphique(fig)
         
         # Tableau des résultats
         st.dataframe(df_comp, use_container_width=True)
@@ -518,7 +611,11 @@ elif page == "📈 Analyse Comparative":
             
             for categorie in categories.index:
                 with st.expander(f"📂 {categorie} ({categories[categorie]} produits)"):
-                    df_cat = df[df['Categorie'] == categorie]
+                    # Lecture des seuls produits de la catégorie (index SQLite)
+                    df_cat = stockage.produits(
+                        colonnes=['Energie_kcal', 'Sucres_g', 'Proteines_g',
+                                  'Nombre_Additifs', 'Label_Nutriscore'],
+                        categorie=categorie)
                     
                     # Statistiques
                     stats = df_cat[['Energie_kcal', 'Sucres_g', 'Proteines_g', 
@@ -532,7 +629,7 @@ elif page == "📈 Analyse Comparative":
                         names=labels_dist.index,
                         title=f"Distribution Nutri-Score - {categorie}"
                     )
-                    st.plotly_chart(fig, use_container_width=True)
+                    afficher_graphique(fig)
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,191 @@
+"""
+Cœur du calcul du Nutri-Score, en Python pur
+Aucune dépendance lourde au chargement (ni numpy ni pandas) : adapté aux
+services qui démarrent souvent et calculent des produits un par un
+
+Exemple :
+    from nutriscore_coeur import scorer
+    resultat = scorer(1200, 2.5, 18, 300, 4, 1.5, 10)
+    resultat.score, resultat.label
+    scorer(..., details=True).details.points_sucres
+
+La classe NutriScore complète (calcul en lot, pandas) reste accessible par
+nutriscore_coeur.NutriScore ; supernutriscore n'est alors importé qu'au premier
+accès.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+
+# Tables de points pour les composantes négatives : (seuil exclu, points)
+ENERGIE_POINTS = [
+    (335, 0), (670, 1), (1005, 2), (1340, 3), (1675, 4),
+    (2010, 5), (2345, 6), (2680, 7), (3015, 8), (3350, 9), (float('inf'), 10)
+]
+
+ACIDES_GRAS_SATURES_POINTS = [
+    (1, 0), (2, 1), (3, 2), (4, 3), (5, 4),
+    (6, 5), (7, 6), (8, 7), (9, 8), (10, 9), (float('inf'), 10)
+]
+
+SUCRES_POINTS = [
+    (3.4, 0), (6.8, 1), (10, 2), (14, 3), (17, 4), (20, 5),
+    (24, 6), (27, 7), (31, 8), (34, 9), (37, 10), (41, 11),
+    (44, 12), (48, 13), (51, 14), (float('inf'), 15)
+]
+
+SODIUM_POINTS = [
+    (90, 0), (180, 1), (270, 2), (360, 3), (450, 4), (540, 5),
+    (630, 6), (720, 7), (810, 8), (900, 9), (990, 10), (1080, 11),
+    (1170, 12), (1260, 13), (1350, 14), (1440, 15), (1530, 16),
+    (1620, 17), (1710, 18), (1800, 19), (float('inf'), 20)
+]
+
+# Tables de points pour les composantes positives
+PROTEINES_POINTS = [
+    (2.4, 0), (4.8, 1), (7.2, 2), (9.6, 3), (12, 4),
+    (14, 5), (17, 6), (float('inf'), 7)
+]
+
+FIBRES_POINTS = [
+    (3.0, 0), (4.1, 1), (5.2, 2), (6.3, 3), (7.4, 4), (float('inf'), 5)
+]
+
+FRUITS_LEGUMES_POINTS = [
+    (40, 0), (60, 1), (80, 2), (float('inf'), 5)
+]
+
+# Seuils pour les classes : (score min, score max, label, couleur)
+CLASSES = [
+    (-float('inf'), 0, 'A', 'Vert foncé'),
+    (0, 2, 'B', 'Vert clair'),
+    (3, 10, 'C', 'Jaune'),
+    (11, 18, 'D', 'Orange clair'),
+    (19, float('inf'), 'E', 'Orange foncé')
+]
+
+
+ResultatNutriScore = namedtuple('ResultatNutriScore', ['score', 'label', 'details'],
+                                defaults=(None,))
+ResultatNutriScore.__doc__ = "Score, label et (sur demande) détails du calcul"
+
+DetailsNutriScore = namedtuple('DetailsNutriScore', [
+    'score_negatif', 'score_positif',
+    'points_energie', 'points_acides_gras_satures', 'points_sucres', 'points_sodium',
+    'points_proteines', 'points_fibres', 'points_fruits_legumes',
+    'proteines_comptees'
+])
+DetailsNutriScore.__doc__ = "Points de chaque composante (mêmes clés que l'ancien dict 'details')"
+
+# Constructeurs sans passer par __new__ (écrit en Python) des namedtuple
+_resultat = ResultatNutriScore._make
+_details = DetailsNutriScore._make
+
+
+def preparer_table(table) -> tuple:
+    """
+    Seuils et points d'une table, prêts pour bisect_right
+    
+    Les points sont complétés par une copie de la dernière ligne : l'indice
+    renvoyé par bisect_right pour une valeur hors table (inf, NaN) donne
+    directement ses points, sans test supplémentaire.
+    """
+    seuils = tuple(seuil for seuil, _ in table)
+    points = tuple(points for _, points in table) + (table[-1][1],)
+    return seuils, points
+
+
+_S_ENERGIE, _P_ENERGIE = preparer_table(ENERGIE_POINTS)
+_S_AG_SAT, _P_AG_SAT = preparer_table(ACIDES_GRAS_SATURES_POINTS)
+_S_SUCRES, _P_SUCRES = preparer_table(SUCRES_POINTS)
+_S_SODIUM, _P_SODIUM = preparer_table(SODIUM_POINTS)
+_S_PROTEINES, _P_PROTEINES = preparer_table(PROTEINES_POINTS)
+_S_FIBRES, _P_FIBRES = preparer_table(FIBRES_POINTS)
+_S_FRUITS_LEGUMES, _P_FRUITS_LEGUMES = preparer_table(FRUITS_LEGUMES_POINTS)
+
+# Bornes supérieures des classes A à D (scores entiers)
+_BORNES_LABELS = tuple(maximum for _, maximum, _, _ in CLASSES[:-1])
+_LABELS = tuple(label for _, _, label, _ in CLASSES)
+
+
+def label_score(score: int) -> str:
+    """Label (A à E) d'un score Nutri-Score"""
+    return _LABELS[bisect_left(_BORNES_LABELS, score)]
+
+
+def scorer(energie_kj: float, acides_gras_satures: float, sucres: float,
+           sodium: float, proteines: float, fibres: float, fruits_legumes: float,
+           details: bool = False) -> ResultatNutriScore:
+    """
+    Calcule le Nutri-Score d'un produit
+    
+    Mêmes règles et mêmes résultats que NutriScore.calculer_score_nutritionnel,
+    sans dictionnaire intermédiaire.
+    
+    Args:
+        details: Joint les points de chaque composante (DetailsNutriScore) ;
+                 'dict' : résultat au format dict de
+                 NutriScore.calculer_score_nutritionnel, construit directement
+    
+    Returns:
+        ResultatNutriScore (score, label, details ou None), ou dict
+    """
+    # Points du premier seuil strictement supérieur à la valeur
+    points_energie = _P_ENERGIE[bisect_right(_S_ENERGIE, energie_kj)]
+    points_ag_sat = _P_AG_SAT[bisect_right(_S_AG_SAT, acides_gras_satures)]
+    points_sucres = _P_SUCRES[bisect_right(_S_SUCRES, sucres)]
+    points_sodium = _P_SODIUM[bisect_right(_S_SODIUM, sodium)]
+    score_negatif = points_energie + points_ag_sat + points_sucres + points_sodium
+    
+    points_fibres = _P_FIBRES[bisect_right(_S_FIBRES, fibres)]
+    points_fruits_legumes = _P_FRUITS_LEGUMES[bisect_right(_S_FRUITS_LEGUMES, fruits_legumes)]
+    
+    # Règle spéciale : si score négatif >= 11 et fruits/légumes < 80%,
+    # les protéines ne comptent pas
+    if score_negatif >= 11 and fruits_legumes < 80:
+        proteines_comptees = False
+        points_proteines = 0
+    else:
+        proteines_comptees = True
+        points_proteines = _P_PROTEINES[bisect_right(_S_PROTEINES, proteines)]
+    score_positif = points_proteines + points_fibres + points_fruits_legumes
+    
+    score = score_negatif - score_positif
+    label = _LABELS[bisect_left(_BORNES_LABELS, score)]
+    
+    if not details:
+        return _resultat((score, label, None))
+    
+    if details == 'dict':
+        return {
+            'score': score,
+            'label': label,
+            'details': {
+                'score_negatif': score_negatif,
+                'score_positif': score_positif,
+                'points_energie': points_energie,
+                'points_acides_gras_satures': points_ag_sat,
+                'points_sucres': points_sucres,
+                'points_sodium': points_sodium,
+                'points_proteines': points_proteines,
+                'points_fibres': points_fibres,
+                'points_fruits_legumes': points_fruits_legumes,
+                'proteines_comptees': proteines_comptees
+            }
+        }
+    
+    return _resultat((score, label, _details((
+        score_negatif, score_positif,
+        points_energie, points_ag_sat, points_sucres, points_sodium,
+        points_proteines, points_fibres, points_fruits_legumes,
+        proteines_comptees
+    ))))
+
+
+def __getattr__(nom: str):
+    # Import paresseux de la classe complète (numpy, pandas)
+    if nom == 'NutriScore':
+        from supernutriscore import NutriScore
+        return NutriScore
+    raise AttributeError(f"module {__name__!r} has no attribute {nom!r}")
@@ -0,0 +1,130 @@
+"""
+Recherche de produits par code-barres
+Index trié construit à l'ingestion (voir ingestion.py) ; Nutri-Score et classes
+ELECTRE TRI calculés au premier accès puis mémorisés
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import nutriscore_coeur as coeur
+from supernutriscore import NutriScore, ElectreTri
+from ingestion import BaseColonnaire, normaliser_code_barres
+
+
+def valeur_native(valeur):
+    """Scalaire numpy / pandas converti en type Python (None pour une valeur manquante)"""
+    if valeur is None or (np.ndim(valeur) == 0 and pd.isna(valeur)):
+        return None
+    return valeur.item() if isinstance(valeur, np.generic) else valeur
+
+
+class RechercheProduits:
+    """
+    Accès direct à un produit et à ses résultats par son code-barres
+    
+    La recherche est dichotomique sur l'index trié (mmap), sans parcours de
+    la base. Les résultats d'un produit (score, label, classes) ne sont
+    calculés qu'à sa première demande, puis conservés (LRU borné).
+    """
+    
+    def __init__(self, base: BaseColonnaire, electre: ElectreTri,
+                 capacite: int = 100_000):
+        """
+        Args:
+            base: Base chargée par ingestion.charger_base
+            electre: Modèle ELECTRE TRI (poids, profils, lambda)
+            capacite: Nombre maximal de produits dont les résultats sont gardés
+        """
+        self.base = base
+        self.electre = electre
+        self.capacite = capacite
+        self.memoire: 'OrderedDict[int, Dict]' = OrderedDict()
+        self.verrou = threading.Lock()
+        self.succes = 0
+        self.echecs = 0
+        
+        # Colonnes de la matrice des critères utilisées par chaque calcul
+        self.colonnes_electre = [base.noms_criteres.index(c) for c in electre.poids]
+        self.colonnes_nutriscore = [base.noms_criteres.index(c)
+                                    for c in NutriScore.COLONNES_LOT.values()]
+        self.profils = electre.matrice_profils()
+        
+        # Autres colonnes en tableaux numpy (codes et modalités pour les
+        # catégorielles) : lire une ligne ne passe plus par l'indexation pandas
+        self.colonnes_autres = []
+        for colonne, serie in base.autres.items():
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                self.colonnes_autres.append((colonne, serie.cat.codes.to_numpy(),
+                                             serie.cat.categories.to_numpy()))
+            else:
+                self.colonnes_autres.append((colonne, serie.to_numpy(), None))
+    
+    def resultats(self, position: int) -> Dict:
+        """Nutri-Score et classes ELECTRE TRI de la ligne position"""
+        valeurs = np.asarray(self.base.criteres[position], dtype=float)
+        
+        nutriscore = coeur.scorer(*valeurs[self.colonnes_nutriscore].tolist())
+        C_ab, C_ba = self.electre.credibilites_lot(valeurs[self.colonnes_electre][None, :],
+                                                   self.profils)
+        pessimiste = self.electre.indices_classes_lot(C_ab, C_ba, 'pessimiste')[0]
+        optimiste = self.electre.indices_classes_lot(C_ab, C_ba, 'optimiste')[0]
+        
+        return {
+            'score': nutriscore.score,
+            'label': nutriscore.label,
+            'classe_pessimiste': self.electre.CLASSES[pessimiste],
+            'classe_optimiste': self.electre.CLASSES[optimiste]
+        }
+    
+    def rechercher(self, code) -> Optional[Dict]:
+        """
+        Produit portant ce code-barres, avec ses résultats
+        
+        Returns:
+            Dict {position, produit (colonnes de la base), score, label,
+            classe_pessimiste, classe_optimiste}, ou None si le code est inconnu
+        """
+        cle = normaliser_code_barres(code)
+        if cle is None:
+            return None
+        
+        with self.verrou:
+            if cle in self.memoire:
+                self.memoire.move_to_end(cle)
+                self.succes += 1
+                return self.memoire[cle]
+        
+        position = self.base.position(cle)
+        if position is None:
+            return None
+        
+        produit = {}
+        for colonne, valeurs, modalites in self.colonnes_autres:
+            valeur = valeurs[position]
+            if modalites is not None:
+                valeur = modalites[valeur] if valeur >= 0 else None
+            produit[colonne] = valeur_native(valeur)
+        types = self.base.meta['types']
+        produit.update((critere, np.dtype(types[critere]).type(valeur).item())
+                       for critere, valeur in zip(self.base.noms_criteres,
+                                                  self.base.criteres[position].tolist()))
+        resultat = {'position': position, 'produit': produit, **self.resultats(position)}
+        
+        with self.verrou:
+            self.echecs += 1
+            self.memoire[cle] = resultat
+            if len(self.memoire) > self.capacite:
+                self.memoire.popitem(last=False)
+        return resultat
+    
+    def statistiques(self) -> Dict:
+        total = self.succes + self.echecs
+        return {
+            'produits_memorises': len(self.memoire),
+            'taux_succes': self.succes / total if total else 0
+        }
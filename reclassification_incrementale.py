@@ -0,0 +1,496 @@
+"""
+Reclassification incrémentale de la base (deltas quotidiens : nouveaux
+codes-barres, valeurs nutritionnelles corrigées)
+
+Pour chaque produit, l'état conserve l'empreinte de ses valeurs, son
+Nutri-Score, ses masques de comparaison aux profils (moteur à masques
+d'ELECTRE TRI) et ses classes pour chaque couple (λ, procédure). Une mise à
+jour ne recalcule que ce qui peut avoir changé :
+
+- Nutri-Score : produits nouveaux ou dont l'une des 7 valeurs a changé
+- masques : produits nouveaux ou modifiés, et produits dont une valeur est
+  comprise entre l'ancienne et la nouvelle valeur d'un profil qui a bougé
+  (seules comparaisons qui peuvent changer de sens)
+- classes : produits dont un masque a changé, et produits dont un masque
+  change de côté du seuil quand les poids ou λ changent
+
+Exemple :
+    python reclassification_incrementale.py delta_du_jour.csv --etat etat.pkl
+    python reclassification_incrementale.py base_donnees_boissons.csv --complet \\
+        --changements changements.csv
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from supernutriscore import (
+    NutriScore, ElectreTri, creer_profils_limites, definir_poids_criteres
+)
+from ingestion import COLONNE_CODE_BARRES
+from instrumentation import etape
+
+
+CONFIGURATIONS_PAR_DEFAUT = ((0.6, 'pessimiste'), (0.6, 'optimiste'),
+                             (0.7, 'pessimiste'), (0.7, 'optimiste'))
+
+VERSION_ETAT = 1
+
+
+def empreintes_lignes(df: pd.DataFrame, colonnes: List[str]) -> np.ndarray:
+    """Empreinte (uint64) des valeurs de chaque ligne pour les colonnes données"""
+    return pd.util.hash_pandas_object(df[colonnes].astype(float), index=False).to_numpy()
+
+
+def nom_configuration(lambda_seuil: float, methode: str) -> str:
+    """Nom de la colonne des classes d'un couple (λ, procédure)"""
+    return f'Classe_ELECTRE_{methode.capitalize()}_{lambda_seuil:g}'
+
+
+class ReclassificationIncrementale:
+    """
+    Résultats de la base tenus à jour par deltas
+    
+    Attributes:
+        etat: DataFrame indexé par la clé produit (valeurs, empreintes, score,
+              label, masques, indices des classes de chaque configuration)
+        profils: Profils limites des classes actuelles
+    """
+    
+    def __init__(self, poids: Dict[str, float] = None,
+                 configurations=CONFIGURATIONS_PAR_DEFAUT,
+                 colonne_cle: str = COLONNE_CODE_BARRES,
+                 profils: pd.DataFrame = None):
+        """
+        Args:
+            poids: Poids des critères (par défaut definir_poids_criteres())
+            configurations: Couples (λ, procédure) tenus à jour
+            colonne_cle: Colonne identifiant un produit d'un delta à l'autre
+            profils: Profils limites fixés ; par défaut, recalculés sur la
+                     base après chaque mise à jour
+        """
+        self.poids = dict(poids or definir_poids_criteres())
+        self.configurations = [(float(l), m.lower()) for l, m in configurations]
+        self.colonne_cle = colonne_cle
+        self.profils_fixes = profils
+        self.profils = None
+        self.etat = None
+        
+        # Paramètres ayant produit l'état (comparés aux actuels à la mise à jour)
+        self.poids_etat = None
+        self.configurations_etat = None
+    
+    @property
+    def criteres(self) -> List[str]:
+        """Critères d'ELECTRE TRI, dans l'ordre des bits des masques"""
+        return list(self.poids)
+    
+    @property
+    def colonnes_nutriscore(self) -> List[str]:
+        return list(NutriScore.COLONNES_LOT.values())
+    
+    @property
+    def colonnes_entrees(self) -> List[str]:
+        return list(dict.fromkeys(self.criteres + self.colonnes_nutriscore))
+    
+    def electre(self, profils: pd.DataFrame = None) -> ElectreTri:
+        return ElectreTri(self.poids, self.profils if profils is None else profils,
+                          moteur='masques')
+    
+    def classes(self, profils: pd.DataFrame = None) -> List[str]:
+        """Classes délimitées par les profils (actuels par défaut)"""
+        profils = self.profils if profils is None else profils
+        if profils is None:
+            return list(ElectreTri.CLASSES)
+        return self.electre(profils).CLASSES
+    
+    def etat_vide(self, cles: pd.Index, n_profils: int) -> pd.DataFrame:
+        """Lignes d'état aux types définitifs, à remplir"""
+        n = len(cles)
+        colonnes = {colonne: np.full(n, np.nan) for colonne in self.colonnes_entrees}
+        colonnes.update(hash_nutriscore=np.zeros(n, dtype=np.uint64),
+                        hash_electre=np.zeros(n, dtype=np.uint64),
+                        score=np.zeros(n, dtype=np.int16),
+                        label=np.full(n, '', dtype=object))
+        type_masque = self.electre(pd.DataFrame()).type_masque()
+        for k in range(n_profils):
+            colonnes[f'M_ab_{k}'] = np.zeros(n, dtype=type_masque)
+            colonnes[f'M_ba_{k}'] = np.zeros(n, dtype=type_masque)
+        for i in range(len(self.configurations)):
+            colonnes[f'classe_{i}'] = np.full(n, -1, dtype=np.int8)
+        return pd.DataFrame(colonnes, index=cles)
+    
+    @staticmethod
+    def nombre_profils(etat: pd.DataFrame) -> int:
+        """Nombre de profils des masques de l'état"""
+        return sum(colonne.startswith('M_ab_') for colonne in etat.columns)
+    
+    @staticmethod
+    def colonnes_masques(n_profils: int) -> Tuple[List[str], List[str]]:
+        return ([f'M_ab_{k}' for k in range(n_profils)],
+                [f'M_ba_{k}' for k in range(n_profils)])
+    
+    def cles(self, df: pd.DataFrame) -> pd.Index:
+        """Clés produit d'un delta (uniques)"""
+        cles = pd.Index(df[self.colonne_cle], name=self.colonne_cle)
+        if cles.hasnans:
+            raise ValueError(f"Produits sans {self.colonne_cle} dans le delta")
+        if cles.has_duplicates:
+            raise ValueError(f"{self.colonne_cle} en double dans le delta : "
+                             f"{list(cles[cles.duplicated()][:5])}")
+        return cles
+    
+    def lignes_touchees_par_profils(self, valeurs: pd.DataFrame,
+                                    anciens: pd.DataFrame,
+                                    nouveaux: pd.DataFrame) -> np.ndarray:
+        """
+        Produits dont une comparaison à un profil peut changer de sens
+        
+        Une comparaison x_j >= b_kj (ou b_kj >= x_j) ne change que si x_j est
+        compris entre l'ancienne et la nouvelle valeur de b_kj (bornes incluses).
+        """
+        if anciens is None or anciens.shape != nouveaux.shape \
+                or list(anciens.columns) != list(nouveaux.columns):
+            return np.ones(len(valeurs), dtype=bool)
+        
+        touchees = np.zeros(len(valeurs), dtype=bool)
+        A, N = anciens.to_numpy(), nouveaux.to_numpy()
+        for k, j in zip(*np.nonzero(A != N)):
+            x = valeurs[nouveaux.columns[j]].to_numpy()
+            bas, haut = min(A[k, j], N[k, j]), max(A[k, j], N[k, j])
+            touchees |= (x >= bas) & (x <= haut)
+        return touchees
+    
+    def mettre_a_jour(self, df: pd.DataFrame = None,
+                      supprimer_absents: bool = False) -> Dict:
+        """
+        Applique un delta et les changements de paramètres (poids,
+        configurations, profils fixés)
+        
+        Args:
+            df: Produits nouveaux ou modifiés (ou toute la base) ; None pour
+                n'appliquer que les changements de paramètres
+            supprimer_absents: df est la base complète : les produits absents
+                               sont supprimés
+        
+        Returns:
+            Dict {nouveaux, modifies, supprimes, nutriscore_recalcules,
+            masques_recalcules, profils_modifies, reclasses (par configuration),
+            changements (DataFrame cle, resultat, ancien, nouveau)}
+        """
+        premiere = self.etat is None
+        etat = self.etat_vide(pd.Index([], name=self.colonne_cle), len(ElectreTri.PROFILS)) \
+            if premiere else self.etat
+        if df is None:
+            df = pd.DataFrame(columns=[self.colonne_cle] + self.colonnes_entrees)
+        
+        with etape('incremental.mise_a_jour', lignes=len(df)) as mesure:
+            cles = self.cles(df)
+            entrees = df[self.colonnes_entrees].astype(float).set_axis(cles)
+            h_ns = empreintes_lignes(entrees, self.colonnes_nutriscore)
+            h_el = empreintes_lignes(entrees, self.criteres)
+            
+            # Nouveaux, modifiés, supprimés
+            connues = cles.isin(etat.index)
+            existantes = etat.loc[cles[connues]]
+            cles_nouvelles = cles[~connues]
+            ns_modifies = cles[connues][existantes['hash_nutriscore'].to_numpy() != h_ns[connues]]
+            el_modifies = cles[connues][existantes['hash_electre'].to_numpy() != h_el[connues]]
+            supprimes = etat.index.difference(cles) if supprimer_absents else etat.index[:0]
+            
+            ancien = etat.drop(index=supprimes)
+            etat = pd.concat([ancien, self.etat_vide(cles_nouvelles, self.nombre_profils(ancien))])
+            
+            entrees['hash_nutriscore'] = h_ns
+            entrees['hash_electre'] = h_el
+            a_ecrire = cles_nouvelles.append(ns_modifies.union(el_modifies))
+            for colonne in entrees.columns:
+                etat.loc[a_ecrire, colonne] = entrees.loc[a_ecrire, colonne].to_numpy()
+            
+            # Nutri-Score des seuls produits dont les valeurs ont changé
+            a_scorer = cles_nouvelles.append(ns_modifies)
+            scores = NutriScore.scorer_lot(etat.loc[a_scorer, self.colonnes_nutriscore])
+            etat.loc[a_scorer, 'score'] = scores['score'].to_numpy().astype(np.int16)
+            etat.loc[a_scorer, 'label'] = scores['label'].to_numpy()
+            
+            # Profils : recalculés sur la base, sauf s'ils sont fixés (rangés
+            # comme dans ElectreTri pour être comparés ligne à ligne)
+            profils = self.profils_fixes
+            if profils is None:
+                profils = creer_profils_limites(etat, criteres=self.criteres)
+            profils = ElectreTri.ranger_profils(profils)
+            profils_modifies = self.profils is None or not profils.equals(self.profils)
+            
+            # Masques : produits nouveaux ou modifiés, et ceux touchés par les profils
+            positions = pd.Series(np.arange(len(etat)), index=etat.index)
+            a_masquer = np.zeros(len(etat), dtype=bool)
+            a_masquer[positions[cles_nouvelles.append(el_modifies)].to_numpy()] = True
+            electre = self.electre(profils)
+            n_profils = len(electre.PROFILS)
+            colonnes_ab, colonnes_ba = self.colonnes_masques(n_profils)
+            autre_nombre = n_profils != self.nombre_profils(etat)
+            if autre_nombre:
+                # Autre nombre de profils : colonnes de masques refaites
+                etat = etat.drop(columns=[c for c in etat.columns if c.startswith('M_')])
+                masques = self.etat_vide(etat.index, n_profils)[colonnes_ab + colonnes_ba]
+                etat = pd.concat([etat, masques], axis=1)
+                a_masquer[:] = True
+            elif self.poids_etat is None or list(self.poids_etat) != self.criteres:
+                a_masquer[:] = True
+            elif profils_modifies:
+                a_masquer |= self.lignes_touchees_par_profils(etat[self.criteres],
+                                                              self.profils, profils)
+            
+            anciens_masques = etat[colonnes_ab + colonnes_ba].to_numpy()[a_masquer]
+            M_ab, M_ba = electre.masques_comparaison(
+                etat[self.criteres].to_numpy()[a_masquer])
+            masques_modifies = np.zeros(len(etat), dtype=bool)
+            masques_modifies[a_masquer] = (np.hstack([M_ab, M_ba]) != anciens_masques).any(axis=1)
+            masques_modifies[positions[cles_nouvelles].to_numpy()] = True
+            if autre_nombre:
+                masques_modifies[:] = True
+            for k, (ab, ba) in enumerate(zip(colonnes_ab, colonnes_ba)):
+                etat.iloc[np.flatnonzero(a_masquer), etat.columns.get_loc(ab)] = M_ab[:, k]
+                etat.iloc[np.flatnonzero(a_masquer), etat.columns.get_loc(ba)] = M_ba[:, k]
+            
+            reclasses = self.reclasser(etat, electre, masques_modifies)
+            
+            changements = self.changements(ancien, etat, premiere, electre.CLASSES)
+            self.etat, self.profils = etat, profils
+            self.poids_etat = dict(self.poids)
+            self.configurations_etat = list(self.configurations)
+            
+            mesure.ajouter(reclasses=sum(reclasses.values()))
+        
+        return {
+            'nouveaux': len(cles_nouvelles),
+            'modifies': len(ns_modifies.union(el_modifies)),
+            'supprimes': len(supprimes),
+            'nutriscore_recalcules': len(a_scorer),
+            'masques_recalcules': int(a_masquer.sum()),
+            'profils_modifies': profils_modifies,
+            'reclasses': reclasses,
+            'changements': changements
+        }
+    
+    def reclasser(self, etat: pd.DataFrame, electre: ElectreTri,
+                  masques_modifies: np.ndarray) -> Dict[str, int]:
+        """
+        Recalcule les classes des produits dont le résultat peut avoir changé
+        
+        Les classes ne dépendent que des comparaisons C >= λ. Pour des masques
+        inchangés, seuls les sous-ensembles de critères dont l'indice de
+        concordance passe d'un côté à l'autre du seuil (nouveaux poids ou
+        nouveau λ) imposent un recalcul.
+        
+        Returns:
+            Nombre de produits recalculés par configuration
+        """
+        colonnes_ab, colonnes_ba = self.colonnes_masques(len(electre.PROFILS))
+        M_ab = etat[colonnes_ab].to_numpy()
+        M_ba = etat[colonnes_ba].to_numpy()
+        table = electre.table_poids_sous_ensembles()
+        
+        anciennes = self.configurations_etat or []
+        table_ancienne = None
+        if self.poids_etat is not None and list(self.poids_etat) == self.criteres:
+            table_ancienne = ElectreTri(self.poids_etat, self.profils,
+                                        moteur='masques').table_poids_sous_ensembles()
+        
+        reclasses = {}
+        for i, (lambda_seuil, methode) in enumerate(self.configurations):
+            a_classer = masques_modifies.copy()
+            if (table_ancienne is None or i >= len(anciennes)
+                    or anciennes[i][1] != methode):
+                a_classer[:] = True
+            else:
+                ancien_lambda = anciennes[i][0]
+                basculent = (table_ancienne >= ancien_lambda) != (table >= lambda_seuil)
+                if basculent.any():
+                    a_classer |= (basculent[M_ab] | basculent[M_ba]).any(axis=1)
+            
+            lignes = np.flatnonzero(a_classer)
+            C_ab, C_ba = electre.concordances_depuis_masques(M_ab[lignes], M_ba[lignes], table)
+            indices = electre.indices_classes_lot(C_ab, C_ba, methode, lambda_seuil)
+            etat.iloc[lignes, etat.columns.get_loc(f'classe_{i}')] = indices.astype(np.int8)
+            reclasses[nom_configuration(lambda_seuil, methode)] = len(lignes)
+        
+        return reclasses
+    
+    def changements(self, ancien: pd.DataFrame, etat: pd.DataFrame,
+                    premiere: bool, classes: List[str]) -> pd.DataFrame:
+        """
+        Labels et classes qui ont changé entre l'état précédent et le nouveau
+        
+        Les lignes de ancien sont les premières de etat, dans le même ordre
+        (les nouveaux produits sont ajoutés à la fin) : la comparaison se fait
+        tableau contre tableau, sans réalignement des index. Si le nombre de
+        profils a changé, les classes sont comparées par nom (celles des
+        anciens profils avant, classes après).
+        """
+        colonnes = [self.colonne_cle, 'resultat', 'ancien', 'nouveau']
+        if premiere:
+            return pd.DataFrame(columns=colonnes)
+        
+        n = len(ancien)
+        parties = []
+        
+        def comparer(resultat: str, avant: np.ndarray, apres: np.ndarray, valeurs=None):
+            lignes = np.concatenate([np.flatnonzero(avant != apres[:n]),
+                                     np.arange(n, len(apres))])
+            if len(lignes) == 0:
+                return
+            anciens = np.full(len(lignes), None, dtype=object)
+            existants = lignes < n
+            anciens[existants] = avant[lignes[existants]] if valeurs is None \
+                else valeurs[avant[lignes[existants]]]
+            nouveaux = apres[lignes] if valeurs is None else valeurs[apres[lignes]]
+            parties.append(pd.DataFrame({
+                self.colonne_cle: etat.index[lignes],
+                'resultat': resultat,
+                'ancien': anciens,
+                'nouveau': nouveaux
+            }))
+        
+        comparer('Label_Nutriscore', ancien['label'].to_numpy(), etat['label'].to_numpy())
+        
+        # Indices de classes (-1 : pas encore classé, nom None)
+        noms_avant = np.array(self.classes() + [None], dtype=object)
+        noms_apres = np.array(list(classes) + [None], dtype=object)
+        anciennes = self.configurations_etat or []
+        for i, (lambda_seuil, methode) in enumerate(self.configurations):
+            colonne = f'classe_{i}'
+            if i < len(anciennes) and colonne in ancien.columns:
+                avant = ancien[colonne].to_numpy()
+            else:
+                avant = np.full(n, -1, dtype=np.int8)
+            apres = etat[colonne].to_numpy()
+            if list(noms_avant) == list(noms_apres):
+                comparer(nom_configuration(lambda_seuil, methode), avant, apres,
+                         valeurs=noms_apres)
+            else:
+                comparer(nom_configuration(lambda_seuil, methode),
+                         noms_avant[avant], noms_apres[apres])
+        
+        if not parties:
+            return pd.DataFrame(columns=colonnes)
+        return pd.concat(parties, ignore_index=True)
+    
+    def supprimer(self, cles) -> Dict:
+        """Retire des produits de l'état (les profils sont recalculés)"""
+        restants = self.etat.index.difference(pd.Index(cles))
+        return self.mettre_a_jour(
+            self.etat.loc[restants, self.colonnes_entrees].reset_index(),
+            supprimer_absents=True)
+    
+    def changer_parametres(self, poids: Dict[str, float] = None, configurations=None,
+                           profils: pd.DataFrame = None) -> Dict:
+        """Change poids, configurations (λ, procédure) ou profils fixés et reclasse"""
+        if poids is not None:
+            self.poids = dict(poids)
+        if configurations is not None:
+            self.configurations = [(float(l), m.lower()) for l, m in configurations]
+        if profils is not None:
+            self.profils_fixes = profils
+        
+        if self.etat is not None:
+            # Nouvelles configurations : colonnes de classes à créer
+            for i in range(len(self.configurations)):
+                if f'classe_{i}' not in self.etat.columns:
+                    self.etat[f'classe_{i}'] = np.int8(-1)
+            en_trop = [c for c in self.etat.columns if c.startswith('classe_')
+                       and int(c.split('_')[1]) >= len(self.configurations)]
+            self.etat = self.etat.drop(columns=en_trop)
+        return self.mettre_a_jour()
+    
+    def resultats(self) -> pd.DataFrame:
+        """Score, label et classes de chaque produit (index : clé produit)"""
+        classes = pd.CategoricalDtype(self.classes(), ordered=True)
+        resultats = pd.DataFrame({
+            'Score_Nutriscore': self.etat['score'].to_numpy(),
+            'Label_Nutriscore': self.etat['label'].to_numpy()
+        }, index=self.etat.index)
+        for i, (lambda_seuil, methode) in enumerate(self.configurations):
+            resultats[nom_configuration(lambda_seuil, methode)] = pd.Categorical.from_codes(
+                self.etat[f'classe_{i}'].to_numpy(), dtype=classes)
+        return resultats
+    
+    def sauvegarder(self, chemin: str):
+        """Écrit l'état (remplacement atomique du fichier)"""
+        contenu = {
+            'version': VERSION_ETAT,
+            'poids': self.poids,
+            'configurations': self.configurations,
+            'colonne_cle': self.colonne_cle,
+            'profils_fixes': self.profils_fixes,
+            'profils': self.profils,
+            'etat': self.etat,
+            'poids_etat': self.poids_etat,
+            'configurations_etat': self.configurations_etat
+        }
+        dossier = os.path.dirname(os.path.abspath(chemin))
+        descripteur, temporaire = tempfile.mkstemp(dir=dossier, suffix='.tmp')
+        os.close(descripteur)
+        try:
+            pd.to_pickle(contenu, temporaire)
+            os.replace(temporaire, chemin)
+        except BaseException:
+            os.remove(temporaire)
+            raise
+    
+    @classmethod
+    def charger(cls, chemin: str) -> 'ReclassificationIncrementale':
+        contenu = pd.read_pickle(chemin)
+        if contenu.get('version') != VERSION_ETAT:
+            raise ValueError(f"Version d'état incompatible : {contenu.get('version')}")
+        modele = cls(contenu['poids'], contenu['configurations'], contenu['colonne_cle'],
+                     contenu['profils_fixes'])
+        modele.profils = contenu['profils']
+        modele.etat = contenu['etat']
+        modele.poids_etat = contenu['poids_etat']
+        modele.configurations_etat = contenu['configurations_etat']
+        return modele
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Reclassification incrémentale (Nutri-Score et ELECTRE TRI) d'un delta")
+    parser.add_argument('source', help="Delta ou base complète (CSV ou XLSX)")
+    parser.add_argument('--etat', default='etat_incremental.pkl',
+                        help="Fichier d'état (créé au premier passage)")
+    parser.add_argument('--complet', action='store_true',
+                        help="La source est la base complète : les produits absents sont supprimés")
+    parser.add_argument('--changements', help="Fichier CSV des labels et classes modifiés")
+    args = parser.parse_args(arguments)
+    
+    from ingestion import lire_source
+    
+    if os.path.exists(args.etat):
+        modele = ReclassificationIncrementale.charger(args.etat)
+    else:
+        modele = ReclassificationIncrementale()
+    
+    rapport = modele.mettre_a_jour(lire_source(args.source), supprimer_absents=args.complet)
+    modele.sauvegarder(args.etat)
+    
+    print(f"✓ {rapport['nouveaux']} nouveaux, {rapport['modifies']} modifiés, "
+          f"{rapport['supprimes']} supprimés ({len(modele.etat)} produits)", file=sys.stderr)
+    print(f"  Nutri-Score recalculés: {rapport['nutriscore_recalcules']}, "
+          f"masques recalculés: {rapport['masques_recalcules']}"
+          f"{' (profils modifiés)' if rapport['profils_modifies'] else ''}", file=sys.stderr)
+    for configuration, n in rapport['reclasses'].items():
+        print(f"  {configuration}: {n} produits reclassés", file=sys.stderr)
+    print(f"  {len(rapport['changements'])} changements de label ou de classe", file=sys.stderr)
+    
+    if args.changements:
+        rapport['changements'].to_csv(args.changements, index=False)
+        print(f"✓ Changements écrits dans: {args.changements}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
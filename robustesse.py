@@ -0,0 +1,208 @@
+"""
+Analyse de robustesse des poids ELECTRE TRI (type SMAA-TRI)
+Indices d'acceptabilité des classes par tirage Monte Carlo des poids et de lambda
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from supernutriscore import ElectreTri, creer_profils_limites, definir_poids_criteres
+
+
+def tirer_poids(criteres: list, n_tirages: int, rng: np.random.Generator,
+                poids_min: Dict[str, float] = None,
+                poids_max: Dict[str, float] = None) -> np.ndarray:
+    """
+    Tire des vecteurs de poids uniformément sur le simplexe
+    
+    Si des bornes sont données, les tirages hors bornes sont rejetés
+    (loi uniforme sur la partie du simplexe qui respecte les bornes).
+    
+    Args:
+        criteres: Noms des critères (ordre des colonnes)
+        n_tirages: Nombre de vecteurs de poids
+        rng: Générateur aléatoire numpy
+        poids_min, poids_max: Bornes optionnelles par critère (poids normalisés)
+    
+    Returns:
+        Matrice n_tirages x m de poids normalisés (somme = 1)
+    """
+    bornes_min = np.array([(poids_min or {}).get(c, 0.0) for c in criteres])
+    bornes_max = np.array([(poids_max or {}).get(c, 1.0) for c in criteres])
+    
+    if bornes_min.sum() > 1 or bornes_max.sum() < 1:
+        raise ValueError("Les bornes des poids ne contiennent aucun vecteur de somme 1")
+    
+    tirages = []
+    n_acceptes = 0
+    while n_acceptes < n_tirages:
+        # Loi de Dirichlet(1, ..., 1) = uniforme sur le simplexe
+        lot = rng.dirichlet(np.ones(len(criteres)), size=max(n_tirages, 1000))
+        lot = lot[((lot >= bornes_min) & (lot <= bornes_max)).all(axis=1)]
+        tirages.append(lot)
+        n_acceptes += len(lot)
+    
+    return np.concatenate(tirages)[:n_tirages]
+
+
+def _accumuler_bloc(args: Tuple) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Classe un bloc de produits pour tous les tirages (exécuté dans un processus)
+    
+    Returns:
+        Pour chaque procédure : (comptes n x classes, sommes des poids n x classes x m)
+    """
+    electre, masques_ab, masques_ba, poids, lambdas, taille_lot = args
+    
+    n_produits, n_profils = masques_ab.shape
+    n_classes = len(electre.CLASSES)
+    n_criteres = poids.shape[1]
+    
+    # Concordance de chacun des 2^m sous-ensembles de critères
+    bits = ((np.arange(2 ** n_criteres)[:, None] >> np.arange(n_criteres)) & 1)
+    bits = bits.astype(float)
+    
+    resultats = {
+        methode: (np.zeros((n_produits, n_classes), dtype=np.int64),
+                  np.zeros((n_produits, n_classes, n_criteres)))
+        for methode in ('pessimiste', 'optimiste')
+    }
+    
+    for debut in range(0, len(poids), taille_lot):
+        poids_lot = poids[debut:debut + taille_lot]
+        lambdas_lot = lambdas[debut:debut + taille_lot]
+        n_lot = len(poids_lot)
+        
+        # Tous les vecteurs de poids du lot en un seul produit matriciel
+        table = bits @ poids_lot.T  # 2^m x n_lot
+        
+        # n x n_lot x k, puis une ligne par couple (produit, tirage)
+        C_ab = table[masques_ab].transpose(0, 2, 1).reshape(-1, n_profils)
+        C_ba = table[masques_ba].transpose(0, 2, 1).reshape(-1, n_profils)
+        seuils = np.tile(lambdas_lot, n_produits)[:, None]
+        
+        for methode, (comptes, sommes_poids) in resultats.items():
+            indices = electre.indices_classes_lot(C_ab, C_ba, methode, seuils)
+            indices = indices.reshape(n_produits, n_lot)
+            for classe in range(n_classes):
+                affecte = (indices == classe).astype(float)
+                comptes[:, classe] += affecte.sum(axis=1).astype(np.int64)
+                sommes_poids[:, classe] += affecte @ poids_lot
+    
+    return resultats
+
+
+def analyse_acceptabilite(df: pd.DataFrame, profils: pd.DataFrame = None,
+                          criteres: list = None,
+                          n_tirages: int = 10_000,
+                          lambda_min: float = 0.5, lambda_max: float = 1.0,
+                          poids_min: Dict[str, float] = None,
+                          poids_max: Dict[str, float] = None,
+                          graine: int = 0,
+                          n_processus: int = None,
+                          taille_bloc: int = 10_000,
+                          taille_lot: int = 64) -> Dict:
+    """
+    Analyse d'acceptabilité stochastique des classes ELECTRE TRI
+    
+    Les comparaisons produits/profils ne dépendent ni des poids ni de lambda :
+    elles sont codées une seule fois en masques de bits, puis chaque tirage
+    ne coûte qu'une lecture dans la table des sous-ensembles de critères.
+    Les produits sont répartis en blocs sur un pool de processus ; le résultat
+    ne dépend pas du nombre de processus.
+    
+    Args:
+        df: DataFrame contenant les produits
+        profils: Profils limites (par défaut creer_profils_limites(df))
+        criteres: Critères dont on fait varier les poids (par défaut ceux de
+                  definir_poids_criteres)
+        n_tirages: Nombre de couples (poids, lambda) tirés
+        lambda_min, lambda_max: Intervalle de tirage uniforme de lambda
+        poids_min, poids_max: Bornes optionnelles des poids normalisés
+        graine: Graine du générateur aléatoire
+        n_processus: Nombre de processus (par défaut le nombre de cœurs)
+        taille_bloc: Nombre de produits par tâche
+        taille_lot: Nombre de tirages traités ensemble dans une tâche
+    
+    Returns:
+        Dict contenant pour chaque procédure ('pessimiste', 'optimiste') :
+            - 'acceptabilite': DataFrame produits x classes (fréquence de chaque classe)
+            - 'poids_centraux': DataFrame (produit, classe) x critères, poids moyen
+              des tirages menant à cette classe
+            - 'classe_modale': Series de la classe la plus fréquente
+        ainsi que les tirages utilisés ('poids', 'lambdas')
+    """
+    if profils is None:
+        profils = creer_profils_limites(df)
+    if criteres is None:
+        criteres = list(definir_poids_criteres())
+    if n_processus is None:
+        n_processus = os.cpu_count() or 1
+    
+    rng = np.random.default_rng(graine)
+    poids = tirer_poids(criteres, n_tirages, rng, poids_min, poids_max)
+    lambdas = rng.uniform(lambda_min, lambda_max, size=n_tirages)
+    
+    electre = ElectreTri({c: 1.0 for c in criteres}, profils, moteur='masques')
+    masques_ab, masques_ba = electre.masques_comparaison(df)
+    
+    taches = [
+        (electre, masques_ab[debut:debut + taille_bloc],
+         masques_ba[debut:debut + taille_bloc], poids, lambdas, taille_lot)
+        for debut in range(0, len(df), taille_bloc)
+    ]
+    
+    if n_processus > 1 and len(taches) > 1:
+        with ProcessPoolExecutor(max_workers=n_processus) as executeur:
+            blocs = list(executeur.map(_accumuler_bloc, taches))
+    else:
+        blocs = [_accumuler_bloc(tache) for tache in taches]
+    
+    classes = electre.CLASSES
+    resultats = {'poids': pd.DataFrame(poids, columns=criteres), 'lambdas': lambdas}
+    
+    for methode in ('pessimiste', 'optimiste'):
+        comptes = np.concatenate([bloc[methode][0] for bloc in blocs])
+        sommes_poids = np.concatenate([bloc[methode][1] for bloc in blocs])
+        
+        acceptabilite = pd.DataFrame(comptes / n_tirages, index=df.index, columns=classes)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            centraux = sommes_poids / comptes[:, :, None]
+        poids_centraux = pd.DataFrame(
+            centraux.reshape(-1, len(criteres)),
+            index=pd.MultiIndex.from_product([df.index, classes],
+                                             names=['Produit', 'Classe']),
+            columns=criteres
+        )
+        
+        resultats[methode] = {
+            'acceptabilite': acceptabilite,
+            'poids_centraux': poids_centraux,
+            'classe_modale': acceptabilite.idxmax(axis=1)
+        }
+    
+    return resultats
+
+
+if __name__ == "__main__":
+    print("SuperNutriScore - Robustesse des classes ELECTRE TRI aux poids")
+    print("=" * 70)
+    
+    df = pd.read_csv('base_donnees_boissons.csv', encoding='utf-8')
+    df.columns = df.columns.str.strip()
+    
+    resultats = analyse_acceptabilite(df)
+    
+    for methode in ('pessimiste', 'optimiste'):
+        acceptabilite = resultats[methode]['acceptabilite']
+        stabilite = acceptabilite.max(axis=1)
+        print(f"\nProcédure {methode}:")
+        print(f"  Acceptabilité moyenne de la classe modale: {stabilite.mean():.1%}")
+        print(f"  Produits stables (classe modale >= 90%): {(stabilite >= 0.9).mean():.1%}")
+        print("  Répartition des classes modales:")
+        print(resultats[methode]['classe_modale'].value_counts().sort_index().to_string())
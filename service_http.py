@@ -0,0 +1,445 @@
+"""
+Service HTTP local de classification (Nutri-Score + ELECTRE TRI)
+asyncio pur (bibliothèque standard), regroupement des requêtes simultanées en
+micro-lots pour le calcul vectorisé
+
+Exemple :
+    python service_http.py --port 8765 --taille-lot 512 --attente-ms 2
+    
+    curl -X POST localhost:8765/classifier -d '{"Energie_kJ": 180, "Acides_Gras_Satures_g": 0,
+        "Sucres_g": 10.6, "Sodium_mg": 10, "Proteines_g": 0, "Fibres_g": 0,
+        "Fruits_Legumes_Pct": 0, "Nombre_Additifs": 2}'
+
+Routes :
+    POST /classifier  un produit (objet JSON) ou une liste de produits
+    GET  /metriques   histogrammes de latence, tailles de lots, débits
+    GET  /sante       état du service et paramètres du modèle
+    GET  /produit/<code-barres>  produit de la base et ses résultats (mémorisés)
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from supernutriscore import (
+    NutriScore, ElectreTri, creer_profils_limites, definir_poids_criteres
+)
+
+
+# Bornes supérieures (ms) des classes des histogrammes de latence
+BORNES_LATENCE_MS = (0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Bornes supérieures des classes de l'histogramme des tailles de lots
+BORNES_TAILLE_LOT = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+TAILLE_MAX_CORPS = 16 * 1024 ** 2
+
+# Noms d'arguments acceptés en plus des noms de colonnes (energie_kj...)
+ALIAS_CRITERES = dict(NutriScore.COLONNES_LOT, nombre_additifs='Nombre_Additifs')
+
+
+class ErreurRequete(ValueError):
+    """Requête invalide (réponse 400)"""
+
+
+class Histogramme:
+    """Histogramme à classes fixes, avec estimation des quantiles"""
+    
+    def __init__(self, bornes: Tuple[float, ...]):
+        self.bornes = tuple(bornes)
+        self.comptes = [0] * (len(self.bornes) + 1)
+        self.total = 0
+        self.somme = 0.0
+    
+    def observer(self, valeur: float):
+        self.comptes[bisect_left(self.bornes, valeur)] += 1
+        self.total += 1
+        self.somme += valeur
+    
+    def quantile(self, q: float) -> float:
+        """
+        Borne supérieure de la classe contenant le quantile q (None au-delà
+        de la dernière borne)
+        """
+        if self.total == 0:
+            return 0.0
+        rang = q * self.total
+        cumul = 0
+        for i, compte in enumerate(self.comptes):
+            cumul += compte
+            if cumul >= rang:
+                return self.bornes[i] if i < len(self.bornes) else None
+        return None
+    
+    def en_dict(self) -> Dict:
+        etiquettes = [f'<={b}' for b in self.bornes] + [f'>{self.bornes[-1]}']
+        return {
+            'total': self.total,
+            'moyenne': self.somme / self.total if self.total else 0.0,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'classes': dict(zip(etiquettes, self.comptes))
+        }
+
+
+class MetriquesService:
+    """Compteurs de débit et histogrammes du service"""
+    
+    def __init__(self):
+        self.debut = time.monotonic()
+        self.requetes = 0
+        self.erreurs = 0
+        self.produits = 0
+        self.lots = 0
+        self.latence_requete_ms = Histogramme(BORNES_LATENCE_MS)
+        self.latence_calcul_ms = Histogramme(BORNES_LATENCE_MS)
+        self.attente_lot_ms = Histogramme(BORNES_LATENCE_MS)
+        self.taille_lot = Histogramme(BORNES_TAILLE_LOT)
+    
+    def en_dict(self) -> Dict:
+        duree = time.monotonic() - self.debut
+        return {
+            'duree_s': duree,
+            'requetes': self.requetes,
+            'erreurs': self.erreurs,
+            'produits': self.produits,
+            'lots': self.lots,
+            'requetes_par_s': self.requetes / duree if duree else 0.0,
+            'produits_par_s': self.produits / duree if duree else 0.0,
+            'latence_requete_ms': self.latence_requete_ms.en_dict(),
+            'latence_calcul_ms': self.latence_calcul_ms.en_dict(),
+            'attente_lot_ms': self.attente_lot_ms.en_dict(),
+            'taille_lot': self.taille_lot.en_dict()
+        }
+
+
+class ModeleClassification:
+    """Modèle chargé une fois : poids, profils, lambda"""
+    
+    def __init__(self, profils: pd.DataFrame, poids: Dict[str, float] = None,
+                 lambda_seuil: float = 0.6):
+        self.electre = ElectreTri(poids or definir_poids_criteres(), profils, lambda_seuil)
+        self.criteres = list(self.electre.poids)
+        self.colonnes = list(dict.fromkeys(self.criteres + list(NutriScore.COLONNES_LOT.values())))
+    
+    def ligne(self, produit: Dict) -> List[float]:
+        """Valeurs d'un produit JSON dans l'ordre des colonnes (null -> NaN)"""
+        if not isinstance(produit, dict):
+            raise ErreurRequete("chaque produit doit être un objet JSON")
+        valeurs = {ALIAS_CRITERES.get(cle, cle): valeur for cle, valeur in produit.items()}
+        manquants = [colonne for colonne in self.colonnes if colonne not in valeurs]
+        if manquants:
+            raise ErreurRequete(f"critères manquants : {', '.join(manquants)}")
+        try:
+            return [np.nan if valeurs[c] is None else float(valeurs[c]) for c in self.colonnes]
+        except (TypeError, ValueError):
+            raise ErreurRequete("les critères doivent être numériques")
+    
+    def classifier(self, lignes: List[List[float]]) -> List[Dict]:
+        """Nutri-Score et classes ELECTRE TRI d'un lot de produits (vectorisé)"""
+        df = pd.DataFrame(lignes, columns=self.colonnes)
+        scores = NutriScore.scorer_lot(df)
+        C_ab, C_ba = self.electre.concordances_lot(df)
+        classes = np.array(self.electre.CLASSES, dtype=object)
+        pessimistes = classes[self.electre.indices_classes_lot(C_ab, C_ba, 'pessimiste')]
+        optimistes = classes[self.electre.indices_classes_lot(C_ab, C_ba, 'optimiste')]
+        
+        return [
+            {'score': score, 'label': label,
+             'classe_pessimiste': pessimiste, 'classe_optimiste': optimiste}
+            for score, label, pessimiste, optimiste in zip(
+                scores['score'].tolist(), scores['label'].tolist(),
+                pessimistes.tolist(), optimistes.tolist())
+        ]
+
+
+class LotisseurRequetes:
+    """
+    Regroupe les produits des requêtes simultanées en micro-lots
+    
+    Un lot part dès qu'il atteint taille_max produits, ou attente_max
+    secondes après l'arrivée de sa première requête. Les lots sont calculés
+    l'un après l'autre dans un thread : les requêtes arrivées pendant un calcul
+    forment le lot suivant.
+    """
+    
+    def __init__(self, modele: ModeleClassification, metriques: MetriquesService,
+                 taille_max: int = 256, attente_max: float = 0.002):
+        self.modele = modele
+        self.metriques = metriques
+        self.taille_max = taille_max
+        self.attente_max = attente_max
+        self.file: asyncio.Queue = asyncio.Queue()
+        self.tache = None
+    
+    def demarrer(self):
+        self.tache = asyncio.get_running_loop().create_task(self.boucle())
+    
+    async def arreter(self):
+        if self.tache is not None:
+            self.tache.cancel()
+            try:
+                await self.tache
+            except asyncio.CancelledError:
+                pass
+    
+    async def soumettre(self, lignes: List[List[float]]) -> List[Dict]:
+        """Ajoute les produits d'une requête au prochain lot et attend leurs résultats"""
+        futur = asyncio.get_running_loop().create_future()
+        await self.file.put((lignes, futur, time.perf_counter()))
+        return await futur
+    
+    async def boucle(self):
+        boucle = asyncio.get_running_loop()
+        while True:
+            lot = [await self.file.get()]
+            n = len(lot[0][0])
+            echeance = boucle.time() + self.attente_max
+            
+            while n < self.taille_max:
+                restant = echeance - boucle.time()
+                if restant <= 0:
+                    break
+                try:
+                    entree = await asyncio.wait_for(self.file.get(), restant)
+                except asyncio.TimeoutError:
+                    break
+                lot.append(entree)
+                n += len(entree[0])
+            
+            await self.traiter(lot, n)
+    
+    async def traiter(self, lot: list, n: int):
+        """Calcule un lot et répartit les résultats entre les requêtes"""
+        lignes = [ligne for entree in lot for ligne in entree[0]]
+        debut = time.perf_counter()
+        for _, _, arrivee in lot:
+            self.metriques.attente_lot_ms.observer((debut - arrivee) * 1e3)
+        
+        try:
+            resultats = await asyncio.get_running_loop().run_in_executor(
+                None, self.modele.classifier, lignes)
+        except Exception as erreur:
+            for _, futur, _ in lot:
+                if not futur.done():
+                    futur.set_exception(erreur)
+            return
+        
+        self.metriques.latence_calcul_ms.observer((time.perf_counter() - debut) * 1e3)
+        self.metriques.taille_lot.observer(n)
+        self.metriques.lots += 1
+        self.metriques.produits += n
+        
+        position = 0
+        for entree, futur, _ in lot:
+            taille = len(entree)
+            if not futur.done():
+                futur.set_result(resultats[position:position + taille])
+            position += taille
+
+
+class ServiceClassification:
+    """Serveur HTTP/1.1 minimal (connexions persistantes) au-dessus d'asyncio"""
+    
+    def __init__(self, modele: ModeleClassification, taille_lot: int = 256,
+                 attente_ms: float = 2.0, recherche=None):
+        """
+        Args:
+            recherche: RechercheProduits servant la route /produit (facultatif)
+        """
+        self.modele = modele
+        self.recherche = recherche
+        self.metriques = MetriquesService()
+        self.taille_lot = taille_lot
+        self.attente_ms = attente_ms
+        self.lotisseur = None
+        self.serveur = None
+    
+    async def demarrer(self, hote: str = '127.0.0.1', port: int = 8765) -> int:
+        """
+        Démarre l'écoute
+        
+        Returns:
+            Port effectif (utile avec port=0, choisi par le système)
+        """
+        self.lotisseur = LotisseurRequetes(self.modele, self.metriques,
+                                           self.taille_lot, self.attente_ms / 1e3)
+        self.lotisseur.demarrer()
+        self.serveur = await asyncio.start_server(self.connexion, hote, port)
+        return self.serveur.sockets[0].getsockname()[1]
+    
+    async def arreter(self):
+        if self.serveur is not None:
+            self.serveur.close()
+            await self.serveur.wait_closed()
+        if self.lotisseur is not None:
+            await self.lotisseur.arreter()
+    
+    async def connexion(self, lecteur: asyncio.StreamReader, ecrivain: asyncio.StreamWriter):
+        """Traite les requêtes d'une connexion jusqu'à sa fermeture"""
+        try:
+            while True:
+                requete = await self.lire_requete(lecteur)
+                if requete is None:
+                    break
+                methode, chemin, entetes, corps = requete
+                
+                debut = time.perf_counter()
+                statut, reponse = await self.router(methode, chemin, corps)
+                if chemin == '/classifier':
+                    self.metriques.requetes += 1
+                    self.metriques.latence_requete_ms.observer(
+                        (time.perf_counter() - debut) * 1e3)
+                if statut >= 400:
+                    self.metriques.erreurs += 1
+                
+                garder = entetes.get('connection', '').lower() != 'close'
+                self.ecrire_reponse(ecrivain, statut, reponse, garder)
+                await ecrivain.drain()
+                if not garder:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            ecrivain.close()
+    
+    async def lire_requete(self, lecteur: asyncio.StreamReader):
+        """Lit une requête HTTP ; None si la connexion est fermée"""
+        ligne = await lecteur.readline()
+        if not ligne:
+            return None
+        try:
+            methode, chemin, _ = ligne.decode('latin-1').split(' ', 2)
+        except ValueError:
+            return None
+        
+        entetes = {}
+        while True:
+            ligne = await lecteur.readline()
+            if ligne in (b'\r\n', b'\n', b''):
+                break
+            nom, _, valeur = ligne.decode('latin-1').partition(':')
+            entetes[nom.strip().lower()] = valeur.strip()
+        
+        longueur = int(entetes.get('content-length', 0) or 0)
+        if longueur > TAILLE_MAX_CORPS:
+            return None
+        corps = await lecteur.readexactly(longueur) if longueur else b''
+        return methode.upper(), chemin.split('?', 1)[0], entetes, corps
+    
+    async def router(self, methode: str, chemin: str, corps: bytes) -> Tuple[int, object]:
+        if chemin == '/classifier':
+            if methode != 'POST':
+                return 405, {'erreur': "utiliser POST"}
+            return await self.classifier(corps)
+        if chemin.startswith('/produit/') and methode == 'GET' and self.recherche is not None:
+            produit = self.recherche.rechercher(chemin[len('/produit/'):])
+            if produit is None:
+                return 404, {'erreur': "code-barres inconnu"}
+            return 200, produit
+        if chemin == '/metriques' and methode == 'GET':
+            metriques = self.metriques.en_dict()
+            if self.recherche is not None:
+                metriques['recherche'] = self.recherche.statistiques()
+            return 200, metriques
+        if chemin == '/sante' and methode == 'GET':
+            electre = self.modele.electre
+            return 200, {
+                'statut': 'ok',
+                'lambda': electre.lambda_seuil,
+                'poids': electre.poids,
+                'profils': electre.profils.to_dict(orient='index'),
+                'taille_lot': self.taille_lot,
+                'attente_ms': self.attente_ms
+            }
+        return 404, {'erreur': f"route inconnue : {methode} {chemin}"}
+    
+    async def classifier(self, corps: bytes) -> Tuple[int, object]:
+        try:
+            donnees = json.loads(corps or b'null')
+        except json.JSONDecodeError:
+            return 400, {'erreur': "corps JSON invalide"}
+        
+        unique = isinstance(donnees, dict)
+        produits = [donnees] if unique else donnees
+        if not isinstance(produits, list) or not produits:
+            return 400, {'erreur': "attendu : un produit ou une liste non vide de produits"}
+        
+        try:
+            lignes = [self.modele.ligne(produit) for produit in produits]
+        except ErreurRequete as erreur:
+            return 400, {'erreur': str(erreur)}
+        
+        try:
+            resultats = await self.lotisseur.soumettre(lignes)
+        except Exception as erreur:
+            return 500, {'erreur': str(erreur)}
+        return 200, resultats[0] if unique else resultats
+    
+    @staticmethod
+    def ecrire_reponse(ecrivain: asyncio.StreamWriter, statut: int, contenu, garder: bool):
+        textes = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                  405: 'Method Not Allowed', 500: 'Internal Server Error'}
+        corps = json.dumps(contenu, ensure_ascii=False).encode('utf-8')
+        entete = (f"HTTP/1.1 {statut} {textes.get(statut, '')}\r\n"
+                  "Content-Type: application/json; charset=utf-8\r\n"
+                  f"Content-Length: {len(corps)}\r\n"
+                  f"Connection: {'keep-alive' if garder else 'close'}\r\n\r\n")
+        ecrivain.write(entete.encode('latin-1') + corps)
+
+
+async def servir(modele: ModeleClassification, hote: str, port: int,
+                 taille_lot: int, attente_ms: float, recherche=None):
+    service = ServiceClassification(modele, taille_lot, attente_ms, recherche)
+    port = await service.demarrer(hote, port)
+    print(f"✓ Service à l'écoute sur http://{hote}:{port}", file=sys.stderr)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.arreter()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Service HTTP local de classification")
+    parser.add_argument('--hote', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--profils', help="Profils limites (profils_limites.csv) ; "
+                                          "sinon calculés sur la base")
+    parser.add_argument('--base', default='base_donnees_boissons.csv',
+                        help="Base servant à calculer les profils et à la route /produit")
+    parser.add_argument('--lambda', dest='lambda_seuil', type=float, default=0.6,
+                        help="Seuil de majorité (défaut: 0.6)")
+    parser.add_argument('--taille-lot', type=int, default=256,
+                        help="Produits maximum par micro-lot (défaut: 256)")
+    parser.add_argument('--attente-ms', type=float, default=2.0,
+                        help="Attente maximale pour compléter un lot (défaut: 2 ms)")
+    args = parser.parse_args(arguments)
+    
+    from ingestion import charger_base
+    from recherche_produits import RechercheProduits
+    
+    base = charger_base(args.base)
+    if args.profils:
+        profils = pd.read_csv(args.profils, index_col=0).astype(float)
+    else:
+        profils = creer_profils_limites(base.dataframe())
+    
+    modele = ModeleClassification(profils, lambda_seuil=args.lambda_seuil)
+    recherche = RechercheProduits(base, modele.electre)
+    try:
+        asyncio.run(servir(modele, args.hote, args.port, args.taille_lot, args.attente_ms,
+                           recherche))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+"""
+Stockage SQLite (bibliothèque standard) des produits, des Nutri-Scores calculés
+et des classifications ELECTRE TRI
+
+Les sous-ensembles (catégorie, label, code-barres, classe d'une exécution) sont
+lus par requête sur index, sans relire ni filtrer toute la base. Les écritures
+passent par des transactions groupées (executemany par lots).
+
+Exemple :
+    with StockageSQLite('supernutriscore.db') as stockage:
+        stockage.importer_produits(df)
+        execution = stockage.enregistrer_execution(poids, 0.6, 'pessimiste', classes)
+        sodas_e = stockage.produits(categorie='Soda', execution=execution, classe="E'")
+"""
+
+import datetime
+import hashlib
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from cache_resultats import normaliser_poids
+from ingestion import appliquer_schema, COLONNE_CODE_BARRES, SCHEMA_BASE
+
+
+FICHIER_PAR_DEFAUT = 'supernutriscore.db'
+
+# Colonnes de la table produits indexées (lorsqu'elles existent)
+COLONNES_INDEXEES = ('Categorie', 'Label_Nutriscore', COLONNE_CODE_BARRES,
+                     'Classe_ELECTRE_Pessimiste_06', 'Classe_ELECTRE_Optimiste_06',
+                     'Classe_ELECTRE_Pessimiste_07', 'Classe_ELECTRE_Optimiste_07',
+                     'Classe_SuperNutriScore')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    cle TEXT PRIMARY KEY,
+    valeur TEXT
+);
+CREATE TABLE IF NOT EXISTS scores (
+    produit_id INTEGER PRIMARY KEY,
+    score INTEGER NOT NULL,
+    label TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scores_label ON scores (label);
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cle TEXT NOT NULL UNIQUE,
+    methode TEXT NOT NULL,
+    lambda_seuil REAL NOT NULL,
+    poids TEXT NOT NULL,
+    profils TEXT,
+    date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS classes (
+    execution_id INTEGER NOT NULL REFERENCES executions (id) ON DELETE CASCADE,
+    produit_id INTEGER NOT NULL,
+    classe TEXT NOT NULL,
+    PRIMARY KEY (execution_id, produit_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_classes_classe ON classes (execution_id, classe);
+"""
+
+
+def type_sql(serie: pd.Series) -> str:
+    """Type SQLite d'une colonne pandas"""
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(serie):
+        return 'REAL'
+    return 'TEXT'
+
+
+def valeurs_sql(serie: pd.Series) -> List:
+    """Valeurs Python d'une colonne (None pour les valeurs manquantes)"""
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
+
+def lignes_sql(df: pd.DataFrame) -> Iterable[tuple]:
+    """Lignes d'un DataFrame sous forme de tuples de valeurs Python"""
+    return zip(*(valeurs_sql(df[colonne]) for colonne in df.columns))
+
+
+def cle_execution(poids: Dict[str, float], lambda_seuil: float, methode: str,
+                  profils: pd.DataFrame = None) -> str:
+    """
+    Clé d'une classification : poids normalisés, seuil λ, procédure et profils
+    (des poids proportionnels donnent la même clé)
+    """
+    contenu = {
+        'poids': normaliser_poids(poids),
+        'lambda': round(float(lambda_seuil), 12),
+        'methode': methode.lower(),
+        'profils': None if profils is None else profils.round(12).to_dict(orient='split')
+    }
+    return hashlib.sha1(json.dumps(contenu, sort_keys=True, default=str)
+                        .encode('utf-8')).hexdigest()
+
+
+class StockageSQLite:
+    """
+    Base SQLite des produits et des résultats
+    
+    Tables :
+        produits    colonnes de la base (clé : ID), index sur COLONNES_INDEXEES
+        scores      Nutri-Score calculé par produit
+        executions  une ligne par classification (poids, λ, procédure, profils)
+        classes     classe de chaque produit pour chaque exécution
+    
+    Une même connexion peut servir plusieurs fils (sessions Streamlit) : les
+    accès sont sérialisés par un verrou.
+    """
+    
+    TAILLE_LOT = 10_000
+    
+    def __init__(self, chemin: str = FICHIER_PAR_DEFAUT):
+        self.chemin = chemin
+        self.connexion = sqlite3.connect(chemin, check_same_thread=False)
+        self.verrou = threading.RLock()
+        with self.verrou:
+            self.connexion.execute('PRAGMA journal_mode = WAL')
+            self.connexion.execute('PRAGMA synchronous = NORMAL')
+            self.connexion.execute('PRAGMA foreign_keys = ON')
+            self.connexion.executescript(SCHEMA)
+    
+    def __enter__(self) -> 'StockageSQLite':
+        return self
+    
+    def __exit__(self, *exc):
+        self.fermer()
+        return False
+    
+    def fermer(self):
+        with self.verrou:
+            self.connexion.close()
+    
+    @contextmanager
+    def transaction(self):
+        """Transaction unique (validée en sortie, annulée en cas d'erreur)"""
+        with self.verrou:
+            with self.connexion:
+                yield self.connexion
+    
+    def executer_par_lots(self, connexion: sqlite3.Connection, requete: str,
+                          lignes: Iterable[Sequence]) -> int:
+        """executemany par lots de TAILLE_LOT lignes (mémoire bornée)"""
+        total = 0
+        lot = []
+        for ligne in lignes:
+            lot.append(ligne)
+            if len(lot) == self.TAILLE_LOT:
+                connexion.executemany(requete, lot)
+                total += len(lot)
+                lot = []
+        if lot:
+            connexion.executemany(requete, lot)
+            total += len(lot)
+        return total
+    
+    # ------------------------------------------------------------------
+    # Métadonnées
+    # ------------------------------------------------------------------
+    
+    def lire_meta(self, cle: str) -> Optional[str]:
+        with self.verrou:
+            ligne = self.connexion.execute(
+                'SELECT valeur FROM meta WHERE cle = ?', (cle,)).fetchone()
+        return None if ligne is None else ligne[0]
+    
+    def ecrire_meta(self, cle: str, valeur: str):
+        with self.transaction() as connexion:
+            connexion.execute('INSERT OR REPLACE INTO meta (cle, valeur) VALUES (?, ?)',
+                              (cle, valeur))
+    
+    # ------------------------------------------------------------------
+    # Produits
+    # ------------------------------------------------------------------
+    
+    def colonnes_produits(self) -> List[str]:
+        with self.verrou:
+            return [ligne[1] for ligne in
+                    self.connexion.execute('PRAGMA table_info(produits)')]
+    
+    def creer_table_produits(self, connexion: sqlite3.Connection, df: pd.DataFrame):
+        """Crée la table produits (colonnes de df) si elle n'existe pas"""
+        definitions = ', '.join(
+            '"ID" INTEGER PRIMARY KEY' if colonne == 'ID'
+            else f'"{colonne}" {type_sql(df[colonne])}'
+            for colonne in df.columns)
+        connexion.execute(f'CREATE TABLE IF NOT EXISTS produits ({definitions})')
+    
+    def creer_index_produits(self, connexion: sqlite3.Connection):
+        """Crée les index des colonnes de COLONNES_INDEXEES présentes"""
+        colonnes = {ligne[1] for ligne in connexion.execute('PRAGMA table_info(produits)')}
+        for colonne in COLONNES_INDEXEES:
+            if colonne in colonnes:
+                connexion.execute(f'CREATE INDEX IF NOT EXISTS "idx_produits_{colonne}" '
+                                  f'ON produits ("{colonne}")')
+    
+    def importer_produits(self, df: pd.DataFrame, empreinte: str = None) -> int:
+        """
+        Insère ou met à jour des produits (clé : ID), en une transaction
+        
+        Les produits déjà présents sont mis à jour colonne par colonne
+        (UPSERT) ; les autres produits de la table sont conservés. Lors d'un
+        premier import, les index sont créés après l'insertion (une seule
+        construction au lieu d'une mise à jour par ligne).
+        
+        Args:
+            df: Produits (colonne ID obligatoire)
+            empreinte: Empreinte de la base importée, conservée dans meta
+        
+        Returns:
+            Nombre de produits écrits
+        """
+        if 'ID' not in df.columns:
+            raise ValueError("La colonne 'ID' est nécessaire pour stocker les produits")
+        
+        with self.transaction() as connexion:
+            self.creer_table_produits(connexion, df)
+            existantes = {ligne[1] for ligne in connexion.execute('PRAGMA table_info(produits)')}
+            for colonne in df.columns:
+                if colonne not in existantes:
+                    connexion.execute(f'ALTER TABLE produits ADD COLUMN "{colonne}" '
+                                      f'{type_sql(df[colonne])}')
+            
+            colonnes = ', '.join(f'"{colonne}"' for colonne in df.columns)
+            marques = ', '.join('?' for _ in df.columns)
+            mises_a_jour = ', '.join(f'"{colonne}" = excluded."{colonne}"'
+                                     for colonne in df.columns if colonne != 'ID')
+            requete = (f'INSERT INTO produits ({colonnes}) VALUES ({marques}) '
+                       f'ON CONFLICT ("ID") DO ' +
+                       (f'UPDATE SET {mises_a_jour}' if mises_a_jour else 'NOTHING'))
+            n = self.executer_par_lots(connexion, requete, lignes_sql(df))
+            self.creer_index_produits(connexion)
+            
+            # Types pandas des colonnes hors SCHEMA_BASE (ex. colonne de texte
+            # vide, lue en float64), rétablis à la lecture
+            ligne = connexion.execute("SELECT valeur FROM meta WHERE cle = 'types_produits'"
+                                      ).fetchone()
+            types = json.loads(ligne[0]) if ligne else {}
+            types.update({colonne: str(df[colonne].dtype) for colonne in df.columns
+                          if colonne not in SCHEMA_BASE and df[colonne].dtype != object})
+            meta = [('types_produits', json.dumps(types))]
+            if empreinte is not None:
+                meta.append(('empreinte_produits', empreinte))
+            connexion.executemany('INSERT OR REPLACE INTO meta (cle, valeur) VALUES (?, ?)',
+                                  meta)
+        return n
+    
+    def supprimer_produits(self, ids: Iterable[int]) -> int:
+        """Supprime des produits et leurs résultats"""
+        lignes = [(int(i),) for i in ids]
+        with self.transaction() as connexion:
+            connexion.executemany('DELETE FROM produits WHERE "ID" = ?', lignes)
+            connexion.executemany('DELETE FROM scores WHERE produit_id = ?', lignes)
+            connexion.executemany('DELETE FROM classes WHERE produit_id = ?', lignes)
+        return len(lignes)
+    
+    def produits(self, colonnes: List[str] = None, categorie: str = None,
+                 label: str = None, code_barres=None, execution: int = None,
+                 classe: str = None, limite: int = None) -> pd.DataFrame:
+        """
+        Sous-ensemble de produits, filtré par requête sur index
+        
+        Args:
+            colonnes: Colonnes de la table produits à lire (défaut : toutes)
+            categorie, label, code_barres: Filtres sur Categorie,
+                                           Label_Nutriscore et Code_Barres
+            execution: Identifiant d'exécution ; ajoute sa colonne 'Classe'
+            classe: Ne garde que les produits de cette classe (avec execution)
+            limite: Nombre maximal de produits
+        
+        Returns:
+            DataFrame (types de SCHEMA_BASE), trié par ID
+        """
+        if classe is not None and execution is None:
+            raise ValueError("Le filtre par classe nécessite une exécution")
+        
+        selection = ', '.join(f'p."{colonne}"' for colonne in colonnes) if colonnes else 'p.*'
+        requete = f'SELECT {selection}'
+        parametres = []
+        if execution is not None:
+            requete += ', c.classe AS Classe FROM produits p JOIN classes c ' \
+                       'ON c.produit_id = p."ID" AND c.execution_id = ?'
+            parametres.append(int(execution))
+        else:
+            requete += ' FROM produits p'
+        
+        conditions = []
+        for colonne, valeur in (('Categorie', categorie), ('Label_Nutriscore', label),
+                                (COLONNE_CODE_BARRES, code_barres)):
+            if valeur is not None:
+                conditions.append(f'p."{colonne}" = ?')
+                parametres.append(valeur.item() if isinstance(valeur, np.generic) else valeur)
+        if classe is not None:
+            conditions.append('c.classe = ?')
+            parametres.append(classe)
+        if conditions:
+            requete += ' WHERE ' + ' AND '.join(conditions)
+        requete += ' ORDER BY p."ID"'
+        if limite is not None:
+            requete += ' LIMIT ?'
+            parametres.append(int(limite))
+        
+        with self.verrou:
+            df = pd.read_sql_query(requete, self.connexion, params=parametres)
+        
+        types = json.loads(self.lire_meta('types_produits') or '{}')
+        for colonne in df.columns:
+            if colonne in types and df[colonne].dtype != types[colonne]:
+                df[colonne] = df[colonne].astype(types[colonne])
+        return appliquer_schema(df)
+    
+    def compter(self, colonne: str, execution: int = None, **filtres) -> pd.Series:
+        """
+        Nombre de produits par valeur d'une colonne de produits ('Classe' pour
+        les classes d'une exécution), après les filtres de produits()
+        """
+        if colonne == 'Classe' and execution is None:
+            raise ValueError("Le décompte par classe nécessite une exécution")
+        groupe = 'c.classe' if colonne == 'Classe' else f'p."{colonne}"'
+        
+        requete = f'SELECT {groupe} AS valeur, COUNT(*) AS n FROM produits p'
+        parametres = []
+        if execution is not None:
+            requete += ' JOIN classes c ON c.produit_id = p."ID" AND c.execution_id = ?'
+            parametres.append(int(execution))
+        
+        noms = {'categorie': 'Categorie', 'label': 'Label_Nutriscore',
+                'code_barres': COLONNE_CODE_BARRES}
+        conditions = []
+        for filtre, valeur in filtres.items():
+            if filtre == 'classe':
+                conditions.append('c.classe = ?')
+            else:
+                conditions.append(f'p."{noms[filtre]}" = ?')
+            parametres.append(valeur)
+        if conditions:
+            requete += ' WHERE ' + ' AND '.join(conditions)
+        requete += f' GROUP BY {groupe} ORDER BY {groupe}'
+        
+        with self.verrou:
+            lignes = self.connexion.execute(requete, parametres).fetchall()
+        return pd.Series(dict(lignes), name=colonne, dtype='int64')
+    
+    # ------------------------------------------------------------------
+    # Scores Nutri-Score calculés
+    # ------------------------------------------------------------------
+    
+    def enregistrer_scores(self, ids, scores, labels) -> int:
+        """Écrit (ou remplace) les Nutri-Scores calculés des produits ids"""
+        lignes = zip(np.asarray(ids).tolist(), np.asarray(scores).tolist(),
+                     [str(label) for label in labels])
+        with self.transaction() as connexion:
+            return self.executer_par_lots(
+                connexion,
+                'INSERT OR REPLACE INTO scores (produit_id, score, label) VALUES (?, ?, ?)',
+                lignes)
+    
+    def scores(self, label: str = None) -> pd.DataFrame:
+        """Nutri-Scores calculés (index : ID du produit)"""
+        requete = 'SELECT produit_id AS ID, score, label FROM scores'
+        parametres = []
+        if label is not None:
+            requete += ' WHERE label = ?'
+            parametres.append(label)
+        with self.verrou:
+            return pd.read_sql_query(requete + ' ORDER BY produit_id', self.connexion,
+                                     params=parametres, index_col='ID')
+    
+    # ------------------------------------------------------------------
+    # Classifications ELECTRE TRI
+    # ------------------------------------------------------------------
+    
+    def trouver_execution(self, poids: Dict[str, float], lambda_seuil: float,
+                          methode: str, profils: pd.DataFrame = None) -> Optional[int]:
+        """Identifiant de l'exécution de cette configuration, ou None"""
+        cle = cle_execution(poids, lambda_seuil, methode, profils)
+        with self.verrou:
+            ligne = self.connexion.execute(
+                'SELECT id FROM executions WHERE cle = ?', (cle,)).fetchone()
+        return None if ligne is None else ligne[0]
+    
+    def enregistrer_execution(self, poids: Dict[str, float], lambda_seuil: float,
+                              methode: str, classes: pd.Series,
+                              profils: pd.DataFrame = None,
+                              ids: Sequence[int] = None) -> int:
+        """
+        Enregistre les classes d'une classification (une transaction)
+        
+        Une configuration déjà enregistrée (mêmes poids normalisés, λ,
+        procédure et profils) garde son identifiant : seules les classes
+        fournies sont remplacées.
+        
+        Args:
+            classes: Classe de chaque produit
+            ids: ID des produits, dans l'ordre de classes (par défaut l'index
+                 de classes)
+        
+        Returns:
+            Identifiant de l'exécution
+        """
+        cle = cle_execution(poids, lambda_seuil, methode, profils)
+        ids = classes.index if ids is None else ids
+        
+        with self.transaction() as connexion:
+            connexion.execute(
+                'INSERT INTO executions (cle, methode, lambda_seuil, poids, profils, date) '
+                'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (cle) DO UPDATE SET date = excluded.date',
+                (cle, methode.lower(), float(lambda_seuil), json.dumps(poids),
+                 None if profils is None else profils.to_json(orient='index'),
+                 datetime.datetime.now().isoformat(timespec='seconds')))
+            execution = connexion.execute(
+                'SELECT id FROM executions WHERE cle = ?', (cle,)).fetchone()[0]
+            
+            lignes = ((execution, produit, classe) for produit, classe in
+                      zip(np.asarray(ids).tolist(), valeurs_sql(pd.Series(classes)))
+                      if classe is not None)
+            self.executer_par_lots(
+                connexion,
+                'INSERT OR REPLACE INTO classes (execution_id, produit_id, classe) '
+                'VALUES (?, ?, ?)', lignes)
+        return execution
+    
+    def executions(self) -> pd.DataFrame:
+        """Classifications enregistrées (index : identifiant)"""
+        with self.verrou:
+            return pd.read_sql_query(
+                'SELECT id, methode, lambda_seuil, poids, date, '
+                '(SELECT COUNT(*) FROM classes c WHERE c.execution_id = e.id) AS produits '
+                'FROM executions e ORDER BY id', self.connexion, index_col='id')
+    
+    def classes(self, execution: int) -> pd.Series:
+        """Classes d'une exécution (index : ID du produit)"""
+        with self.verrou:
+            lignes = self.connexion.execute(
+                'SELECT produit_id, classe FROM classes WHERE execution_id = ? '
+                'ORDER BY produit_id', (int(execution),)).fetchall()
+        ids, valeurs = zip(*lignes) if lignes else ((), ())
+        return pd.Series(valeurs, index=pd.Index(ids, name='ID'), name='Classe', dtype=object)
+    
+    def supprimer_execution(self, execution: int):
+        with self.transaction() as connexion:
+            connexion.execute('DELETE FROM classes WHERE execution_id = ?', (int(execution),))
+            connexion.execute('DELETE FROM executions WHERE id = ?', (int(execution),))
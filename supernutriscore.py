@@ -7,56 +7,33 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Tuple, List
 
+import nutriscore_coeur as coeur
+from instrumentation import trace
+
 
 class NutriScore:
     """Classe pour calculer le Nutri-Score selon la méthodologie officielle"""
     
-    # Tables de points pour les composantes négatives
-    ENERGIE_POINTS = [
-        (335, 0), (670, 1), (1005, 2), (1340, 3), (1675, 4),
-        (2010, 5), (2345, 6), (2680, 7), (3015, 8), (3350, 9), (float('inf'), 10)
-    ]
-    
-    ACIDES_GRAS_SATURES_POINTS = [
-        (1, 0), (2, 1), (3, 2), (4, 3), (5, 4),
-        (6, 5), (7, 6), (8, 7), (9, 8), (10, 9), (float('inf'), 10)
-    ]
-    
-    SUCRES_POINTS = [
-        (3.4, 0), (6.8, 1), (10, 2), (14, 3), (17, 4), (20, 5),
-        (24, 6), (27, 7), (31, 8), (34, 9), (37, 10), (41, 11),
-        (44, 12), (48, 13), (51, 14), (float('inf'), 15)
-    ]
-    
-    SODIUM_POINTS = [
-        (90, 0), (180, 1), (270, 2), (360, 3), (450, 4), (540, 5),
-        (630, 6), (720, 7), (810, 8), (900, 9), (990, 10), (1080, 11),
-        (1170, 12), (1260, 13), (1350, 14), (1440, 15), (1530, 16),
-        (1620, 17), (1710, 18), (1800, 19), (float('inf'), 20)
-    ]
-    
-    # Tables de points pour les composantes positives
-    PROTEINES_POINTS = [
-        (2.4, 0), (4.8, 1), (7.2, 2), (9.6, 3), (12, 4),
-        (14, 5), (17, 6), (float('inf'), 7)
-    ]
-    
-    FIBRES_POINTS = [
-        (3.0, 0), (4.1, 1), (5.2, 2), (6.3, 3), (7.4, 4), (float('inf'), 5)
-    ]
-    
-    FRUITS_LEGUMES_POINTS = [
-        (40, 0), (60, 1), (80, 2), (float('inf'), 5)
-    ]
-    
-    # Seuils pour les classes
-    CLASSES = [
-        (-float('inf'), 0, 'A', 'Vert foncé'),
-        (0, 2, 'B', 'Vert clair'),
-        (3, 10, 'C', 'Jaune'),
-        (11, 18, 'D', 'Orange clair'),
-        (19, float('inf'), 'E', 'Orange foncé')
-    ]
+    # Tables de points et seuils des classes (définis dans nutriscore_coeur)
+    ENERGIE_POINTS = coeur.ENERGIE_POINTS
+    ACIDES_GRAS_SATURES_POINTS = coeur.ACIDES_GRAS_SATURES_POINTS
+    SUCRES_POINTS = coeur.SUCRES_POINTS
+    SODIUM_POINTS = coeur.SODIUM_POINTS
+    PROTEINES_POINTS = coeur.PROTEINES_POINTS
+    FIBRES_POINTS = coeur.FIBRES_POINTS
+    FRUITS_LEGUMES_POINTS = coeur.FRUITS_LEGUMES_POINTS
+    CLASSES = coeur.CLASSES
+    
+    # Colonnes de la base utilisées par le calcul en lot
+    COLONNES_LOT = {
+        'energie_kj': 'Energie_kJ',
+        'acides_gras_satures': 'Acides_Gras_Satures_g',
+        'sucres': 'Sucres_g',
+        'sodium': 'Sodium_mg',
+        'proteines': 'Proteines_g',
+        'fibres': 'Fibres_g',
+        'fruits_legumes': 'Fruits_Legumes_Pct'
+    }
     
     @staticmethod
     def get_points(valeur: float, table: List[Tuple]) -> int:
@@ -78,57 +55,101 @@ class NutriScore:
         """
         Calcule le score nutritionnel selon la méthodologie Nutri-Score
         
+        Pour des appels unitaires en grand nombre, nutriscore_coeur.scorer
+        évite le dictionnaire de résultat.
+        
         Returns:
             Dict contenant le score, le label et les détails de calcul
         """
-        # Calcul des points négatifs
-        points_energie = cls.get_points(energie_kj, cls.ENERGIE_POINTS)
-        points_ag_sat = cls.get_points(acides_gras_satures, cls.ACIDES_GRAS_SATURES_POINTS)
-        points_sucres = cls.get_points(sucres, cls.SUCRES_POINTS)
-        points_sodium = cls.get_points(sodium, cls.SODIUM_POINTS)
+        return coeur.scorer(energie_kj, acides_gras_satures, sucres, sodium,
+                            proteines, fibres, fruits_legumes, details='dict')
+    
+    @staticmethod
+    def get_points_lot(valeurs: np.ndarray, table: List[Tuple]) -> np.ndarray:
+        """
+        Version vectorisée de get_points : résout toute une colonne en un seul
+        np.searchsorted sur les seuils de la table
+        """
+        seuils = np.array([seuil for seuil, _ in table], dtype=float)
+        points = np.array([pts for _, pts in table], dtype=np.int64)
+        # Premier seuil strictement supérieur à la valeur (même règle que get_points) ;
+        # les valeurs hors table (inf, NaN) reçoivent les points de la dernière ligne
+        indices = np.searchsorted(seuils, valeurs, side='right')
+        return points[np.minimum(indices, len(table) - 1)]
+    
+    @classmethod
+    @trace('nutriscore.scorer_lot')
+    def scorer_lot(cls, df: pd.DataFrame,
+                   colonnes: Dict[str, str] = None) -> pd.DataFrame:
+        """
+        Calcule le Nutri-Score de tous les produits d'un DataFrame en une passe
+        
+        Donne exactement les mêmes résultats que calculer_score_nutritionnel
+        appliqué ligne par ligne.
+        
+        Args:
+            df: DataFrame contenant les sept colonnes nutritionnelles
+            colonnes: Correspondance optionnelle argument -> nom de colonne
+                      (par défaut COLONNES_LOT)
+        
+        Returns:
+            DataFrame (même index que df) avec le score, le label et les points
+            de chaque composante
+        """
+        noms = dict(cls.COLONNES_LOT)
+        if colonnes:
+            noms.update(colonnes)
+        
+        def colonne(nom: str) -> np.ndarray:
+            return df[noms[nom]].to_numpy(dtype=float)
+        
+        fruits_legumes = colonne('fruits_legumes')
+        
+        # Points négatifs
+        points_energie = cls.get_points_lot(colonne('energie_kj'), cls.ENERGIE_POINTS)
+        points_ag_sat = cls.get_points_lot(colonne('acides_gras_satures'),
+                                           cls.ACIDES_GRAS_SATURES_POINTS)
+        points_sucres = cls.get_points_lot(colonne('sucres'), cls.SUCRES_POINTS)
+        points_sodium = cls.get_points_lot(colonne('sodium'), cls.SODIUM_POINTS)
         
         score_negatif = points_energie + points_ag_sat + points_sucres + points_sodium
         
-        # Calcul des points positifs
-        points_proteines = cls.get_points(proteines, cls.PROTEINES_POINTS)
-        points_fibres = cls.get_points(fibres, cls.FIBRES_POINTS)
-        points_fruits_legumes = cls.get_points(fruits_legumes, cls.FRUITS_LEGUMES_POINTS)
+        # Points positifs
+        points_proteines = cls.get_points_lot(colonne('proteines'), cls.PROTEINES_POINTS)
+        points_fibres = cls.get_points_lot(colonne('fibres'), cls.FIBRES_POINTS)
+        points_fruits_legumes = cls.get_points_lot(fruits_legumes,
+                                                   cls.FRUITS_LEGUMES_POINTS)
         
-        # Règle spéciale : si score négatif >= 11 et fruits/légumes < 80%,
-        # les protéines ne comptent pas
-        if score_negatif >= 11 and fruits_legumes < 80:
-            score_positif = points_fibres + points_fruits_legumes
-            proteines_comptees = False
-        else:
-            score_positif = points_proteines + points_fibres + points_fruits_legumes
-            proteines_comptees = True
+        # Règle spéciale des protéines appliquée par masque
+        proteines_comptees = ~((score_negatif >= 11) & (fruits_legumes < 80))
+        points_proteines = np.where(proteines_comptees, points_proteines, 0)
         
-        # Score final
+        score_positif = points_proteines + points_fibres + points_fruits_legumes
         score_final = score_negatif - score_positif
         
-        # Détermination de la classe
-        label = 'E'  # Par défaut
-        for min_val, max_val, classe, couleur in cls.CLASSES:
-            if min_val <= score_final <= max_val:
-                label = classe
-                break
+        labels = cls.get_labels_lot(score_final)
         
-        return {
+        return pd.DataFrame({
             'score': score_final,
-            'label': label,
-            'details': {
-                'score_negatif': score_negatif,
-                'score_positif': score_positif,
-                'points_energie': points_energie,
-                'points_acides_gras_satures': points_ag_sat,
-                'points_sucres': points_sucres,
-                'points_sodium': points_sodium,
-                'points_proteines': points_proteines if proteines_comptees else 0,
-                'points_fibres': points_fibres,
-                'points_fruits_legumes': points_fruits_legumes,
-                'proteines_comptees': proteines_comptees
-            }
-        }
+            'label': labels,
+            'score_negatif': score_negatif,
+            'score_positif': score_positif,
+            'points_energie': points_energie,
+            'points_acides_gras_satures': points_ag_sat,
+            'points_sucres': points_sucres,
+            'points_sodium': points_sodium,
+            'points_proteines': points_proteines,
+            'points_fibres': points_fibres,
+            'points_fruits_legumes': points_fruits_legumes,
+            'proteines_comptees': proteines_comptees
+        }, index=df.index)
+    
+    @classmethod
+    def get_labels_lot(cls, scores: np.ndarray) -> np.ndarray:
+        """Version vectorisée de get_label_from_score (scores entiers)"""
+        bornes_sup = np.array([max_val for _, max_val, _, _ in cls.CLASSES[:-1]])
+        labels = np.array([classe for _, _, classe, _ in cls.CLASSES], dtype=object)
+        return labels[np.searchsorted(bornes_sup, scores, side='left')]
     
     @classmethod
     def get_label_from_score(cls, score: int) -> str:
@@ -142,59 +163,223 @@ class NutriScore:
 class ElectreTri:
     """Classe pour implémenter la méthode ELECTRE TRI"""
     
+    # Profils limites par défaut, du pire (b1) au meilleur (b6)
+    PROFILS = ['b1', 'b2', 'b3', 'b4', 'b5', 'b6']
+    
+    # Classes affectées par défaut, de la meilleure à la moins bonne
+    CLASSES = ["A'", "B'", "C'", "D'", "E'"]
+    
+    # Nombre de produits traités par bloc par le moteur vectorisé
+    TAILLE_BLOC = 100_000
+    
     def __init__(self, poids: Dict[str, float], profils: pd.DataFrame, 
-                 lambda_seuil: float = 0.6):
+                 lambda_seuil: float = 0.6, moteur: str = 'tenseur',
+                 seuils: pd.DataFrame = None):
         """
         Initialise ELECTRE TRI
         
+        Les profils (k >= 2, du pire au meilleur) délimitent k - 1 classes :
+        A' à E' pour les 6 profils par défaut, A', B', ... au-delà (voir
+        noms_classes). Des profils nommés b1, b2, ... sont rangés par numéro,
+        quel que soit l'ordre des lignes ; sinon l'ordre de l'index fait foi.
+        
         Args:
             poids: Dictionnaire des poids pour chaque critère
-            profils: DataFrame contenant les 6 profils (b1 à b6)
+            profils: DataFrame des profils limites (b1 à b6 par défaut)
             lambda_seuil: Seuil de majorité (entre 0 et 1)
+            moteur: 'tenseur' (somme pondérée du tenseur de concordance) ou
+                    'masques' (masques de bits et table des sous-ensembles)
+            seuils: Seuils d'indifférence (ligne 'q'), de préférence ('p') et
+                    de veto ('v') par critère (colonnes), dans l'unité du
+                    critère. Critère ou valeur absent : 0 ; veto nul ou NaN :
+                    pas de veto ; une autre ligne ou un critère absent des
+                    poids lève ValueError. Sans seuils (None, ou tous nuls),
+                    les concordances sont nettes et les résultats inchangés.
         """
         self.poids = poids
-        self.profils = profils
+        self.profils = self.ranger_profils(profils)
+        self.seuils = seuils
+        if len(self.profils.index) >= 2:
+            self.PROFILS = list(self.profils.index)
+            self.CLASSES = self.noms_classes(len(self.PROFILS) - 1)
         self.lambda_seuil = lambda_seuil
-        self.criteres_a_minimiser = ['Energie_kJ', 'Acides_Gras_Satures_g', 
-                                     'Sucres_g', 'Sodium_mg', 'Nombre_Additifs']
-        self.criteres_a_maximiser = ['Proteines_g', 'Fibres_g', 'Fruits_Legumes_Pct']
+        self.moteur = moteur
+        self.criteres_a_minimiser = list(CRITERES_MINIMISER)
+        self.criteres_a_maximiser = list(CRITERES_MAXIMISER)
+        if seuils is not None:
+            lignes = [str(l) for l in seuils.index if l not in ('q', 'p', 'v')]
+            colonnes = [str(c) for c in seuils.columns if c not in poids]
+            if lignes or colonnes:
+                raise ValueError(
+                    "Seuils : lignes attendues 'q', 'p', 'v' et une colonne par critère"
+                    + (f" ; lignes inconnues : {', '.join(lignes)}" if lignes else "")
+                    + (f" ; critères inconnus : {', '.join(colonnes)}" if colonnes else ""))
+            q, p, v = self.vecteurs_seuils()
+            if (q < 0).any() or (p < q).any() or (v < p).any():
+                raise ValueError("Les seuils doivent vérifier 0 <= q <= p <= v")
+    
+    @staticmethod
+    def ranger_profils(profils: pd.DataFrame) -> pd.DataFrame:
+        """Range les profils nommés b1, b2, ... par numéro (du pire au meilleur)"""
+        noms = pd.Series(profils.index.astype(str), index=profils.index)
+        numeros = noms.str.fullmatch(r'b\d+')
+        if not numeros.all() or noms.duplicated().any():
+            return profils
+        ordre = noms.str[1:].astype(int).sort_values(kind='stable').index
+        if ordre.equals(profils.index):
+            return profils
+        return profils.loc[ordre]
+    
+    @classmethod
+    def noms_classes(cls, n_classes: int) -> List[str]:
+        """Noms de n classes, de la meilleure à la moins bonne (A', B', ...)"""
+        if n_classes == len(cls.CLASSES):
+            return list(cls.CLASSES)
+        if n_classes <= 26:
+            return [f"{chr(ord('A') + i)}'" for i in range(n_classes)]
+        return [f"C{i + 1}'" for i in range(n_classes)]
+    
+    def profils_ordonnes(self) -> bool:
+        """
+        Vérifie que chaque profil domine le précédent (au moins aussi bon sur
+        tous les critères)
+        
+        Le surclassement est alors monotone le long des profils : si l'aliment
+        surclasse b(i+1), il surclasse bi, et si bi le surclasse, b(i+1) aussi.
+        C'est la condition de la recherche dichotomique.
+        """
+        P = self.matrice_profils()
+        ecarts = np.diff(P, axis=0)
+        a_maximiser = np.array([critere in self.criteres_a_maximiser
+                                for critere in self.poids])
+        return bool(np.all(np.where(a_maximiser, ecarts >= 0, ecarts <= 0)))
+    
+    def vecteurs_seuils(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Seuils q, p et v de chaque critère, dans l'ordre des poids
+        
+        Returns:
+            Tuple (q, p, v) de tableaux de m flottants ; v = inf sans veto
+        """
+        criteres = list(self.poids)
+        if self.seuils is None:
+            zeros = np.zeros(len(criteres))
+            return zeros, zeros.copy(), np.full(len(criteres), np.inf)
+        
+        seuils = self.seuils.reindex(index=['q', 'p', 'v'], columns=criteres)
+        seuils = seuils.astype(float)
+        q = seuils.loc['q'].fillna(0).to_numpy()
+        p = seuils.loc['p'].fillna(0).to_numpy()
+        v = seuils.loc['v'].to_numpy()
+        v = np.where(np.isnan(v) | (v <= 0), np.inf, v)
+        return q, p, v
+    
+    def a_seuils(self) -> bool:
+        """Indique si au moins un seuil (indifférence, préférence, veto) est actif"""
+        if self.seuils is None:
+            return False
+        q, p, v = self.vecteurs_seuils()
+        return bool((q > 0).any() or (p > 0).any() or np.isfinite(v).any())
     
     def concordance_partielle(self, aliment: pd.Series, profil: pd.Series, 
-                             critere: str) -> Tuple[float, float]:
+                             critere: str,
+                             seuils: Tuple[np.ndarray, np.ndarray, np.ndarray] = None
+                             ) -> Tuple[float, float]:
         """
         Calcule les indices de concordance partiels c(a,b) et c(b,a)
         
+        Avec un seuil de préférence p > q, l'indice croît linéairement de 0
+        (l'autre est meilleur de p ou plus) à 1 (il l'est de q au plus).
+        
+        Args:
+            seuils: Résultat de vecteurs_seuils() déjà calculé (recalculé sinon)
+        
         Returns:
             Tuple (c(aliment, profil), c(profil, aliment))
         """
         val_aliment = aliment[critere]
         val_profil = profil[critere]
+        j = list(self.poids).index(critere)
+        q, p, _ = (seuil[j] for seuil in (seuils or self.vecteurs_seuils()))
         
-        if critere in self.criteres_a_maximiser:
+        if p > q:
+            # Avantage de l'aliment sur le profil, dans le sens du critère
+            if critere in self.criteres_a_maximiser:
+                ecart = val_aliment - val_profil
+            else:
+                ecart = val_profil - val_aliment
+            if np.isnan(ecart):
+                # Valeur manquante : pas de concordance, comme en comparaison nette
+                return 0.0, 0.0
+            c_ab = min(max((ecart + p) / (p - q), 0.0), 1.0)
+            c_ba = min(max((-ecart + p) / (p - q), 0.0), 1.0)
+        elif critere in self.criteres_a_maximiser:
             # Critère à maximiser
-            c_ab = 1.0 if val_aliment >= val_profil else 0.0
-            c_ba = 1.0 if val_profil >= val_aliment else 0.0
+            c_ab = 1.0 if val_aliment + q >= val_profil else 0.0
+            c_ba = 1.0 if val_profil + q >= val_aliment else 0.0
         else:
             # Critère à minimiser
-            c_ab = 1.0 if val_profil >= val_aliment else 0.0
-            c_ba = 1.0 if val_aliment >= val_profil else 0.0
+            c_ab = 1.0 if val_profil + q >= val_aliment else 0.0
+            c_ba = 1.0 if val_aliment + q >= val_profil else 0.0
         
         return c_ab, c_ba
     
-    def concordance_globale(self, aliment: pd.Series, profil: pd.Series) -> Tuple[float, float]:
+    def discordance_partielle(self, aliment: pd.Series, profil: pd.Series,
+                              critere: str,
+                              seuils: Tuple[np.ndarray, np.ndarray, np.ndarray] = None
+                              ) -> Tuple[float, float]:
+        """
+        Calcule les indices de discordance partiels d(a,b) et d(b,a)
+        
+        Nul tant que l'écart en défaveur ne dépasse pas p, il atteint 1 au
+        seuil de veto v (toujours nul sans veto).
+        
+        Args:
+            seuils: Résultat de vecteurs_seuils() déjà calculé (recalculé sinon)
+        
+        Returns:
+            Tuple (d(aliment, profil), d(profil, aliment))
+        """
+        j = list(self.poids).index(critere)
+        _, p, v = (seuil[j] for seuil in (seuils or self.vecteurs_seuils()))
+        if not np.isfinite(v):
+            return 0.0, 0.0
+        
+        if critere in self.criteres_a_maximiser:
+            ecart = aliment[critere] - profil[critere]
+        else:
+            ecart = profil[critere] - aliment[critere]
+        
+        if v > p:
+            d_ab = min(max((-ecart - p) / (v - p), 0.0), 1.0)
+            d_ba = min(max((ecart - p) / (v - p), 0.0), 1.0)
+        else:
+            d_ab = 1.0 if -ecart >= v else 0.0
+            d_ba = 1.0 if ecart >= v else 0.0
+        
+        return d_ab, d_ba
+    
+    def concordance_globale(self, aliment: pd.Series, profil: pd.Series,
+                            seuils: Tuple[np.ndarray, np.ndarray, np.ndarray] = None
+                            ) -> Tuple[float, float]:
         """
         Calcule les indices de concordance globaux C(a,b) et C(b,a)
         
+        Args:
+            seuils: Résultat de vecteurs_seuils() déjà calculé (recalculé sinon)
+        
         Returns:
             Tuple (C(aliment, profil), C(profil, aliment))
         """
         somme_poids = sum(self.poids.values())
+        if seuils is None:
+            seuils = self.vecteurs_seuils()
         
         C_ab = 0.0
         C_ba = 0.0
         
         for critere, poids in self.poids.items():
-            c_ab, c_ba = self.concordance_partielle(aliment, profil, critere)
+            c_ab, c_ba = self.concordance_partielle(aliment, profil, critere, seuils)
             C_ab += poids * c_ab
             C_ba += poids * c_ba
         
@@ -203,6 +388,31 @@ class ElectreTri:
         
         return C_ab, C_ba
     
+    def credibilite(self, aliment: pd.Series, profil: pd.Series) -> Tuple[float, float]:
+        """
+        Calcule les indices de crédibilité sigma(a,b) et sigma(b,a)
+        
+        sigma = C x produit, sur les critères où d > C, de (1 - d) / (1 - C) ;
+        égal à C sans veto.
+        
+        Returns:
+            Tuple (sigma(aliment, profil), sigma(profil, aliment))
+        """
+        # Seuils lus une fois par comparaison, pas une fois par critère
+        seuils = self.vecteurs_seuils()
+        C_ab, C_ba = self.concordance_globale(aliment, profil, seuils)
+        
+        facteur_ab = 1.0
+        facteur_ba = 1.0
+        for critere in self.poids:
+            d_ab, d_ba = self.discordance_partielle(aliment, profil, critere, seuils)
+            if d_ab > C_ab:
+                facteur_ab *= (1.0 - d_ab) / (1.0 - C_ab)
+            if d_ba > C_ba:
+                facteur_ba *= (1.0 - d_ba) / (1.0 - C_ba)
+        
+        return C_ab * facteur_ab, C_ba * facteur_ba
+    
     def surclassement(self, aliment: pd.Series, profil: pd.Series) -> Tuple[bool, bool]:
         """
         Détermine les relations de surclassement
@@ -210,132 +420,736 @@ class ElectreTri:
         Returns:
             Tuple (a_S_b, b_S_a) où S signifie "surclasse"
         """
-        C_ab, C_ba = self.concordance_globale(aliment, profil)
+        C_ab, C_ba = self.credibilite(aliment, profil)
         
         a_S_b = C_ab >= self.lambda_seuil
         b_S_a = C_ba >= self.lambda_seuil
         
         return a_S_b, b_S_a
     
+    def indice_pessimiste(self, aliment: pd.Series) -> int:
+        """
+        Indice (dans CLASSES) de l'affectation pessimiste
+        
+        L'aliment est affecté d'après le plus haut profil bi qu'il surclasse
+        (b6 -> A', b5 -> B', ..., b2 et b1 -> E' pour les profils par défaut ;
+        aucun -> la classe la plus basse). Avec des profils ordonnés, ce profil
+        est trouvé par dichotomie (log2(k) comparaisons), sinon en parcourant
+        les profils de bk à b1.
+        """
+        k = len(self.PROFILS)
+        
+        def surclasse(i):
+            return self.surclassement(aliment, self.profils.loc[self.PROFILS[i]])[0]
+        
+        if self.profils_ordonnes():
+            # Premier profil non surclassé (les surclassés forment un préfixe)
+            bas, haut = 0, k
+            while bas < haut:
+                milieu = (bas + haut) // 2
+                if surclasse(milieu):
+                    bas = milieu + 1
+                else:
+                    haut = milieu
+            plus_haut = bas - 1
+        else:
+            plus_haut = next((i for i in range(k - 1, -1, -1) if surclasse(i)), -1)
+        
+        return min(k - 1 - plus_haut, len(self.CLASSES) - 1)
+    
+    def indice_optimiste(self, aliment: pd.Series) -> int:
+        """
+        Indice (dans CLASSES) de l'affectation optimiste
+        
+        L'aliment est affecté d'après le plus bas profil bi qui le surclasse
+        strictement (b1 -> E', b2 -> D', ..., b5 et b6 -> A' pour les profils
+        par défaut ; aucun -> la classe la plus haute). Dichotomie avec des
+        profils ordonnés, sinon parcours de b1 à bk.
+        """
+        k = len(self.PROFILS)
+        
+        def surclasse_strictement(i):
+            a_S_b, b_S_a = self.surclassement(aliment, self.profils.loc[self.PROFILS[i]])
+            return b_S_a and not a_S_b
+        
+        if self.profils_ordonnes():
+            # Premier profil surclassant strictement (ceux-ci forment un suffixe)
+            bas, haut = 0, k
+            while bas < haut:
+                milieu = (bas + haut) // 2
+                if surclasse_strictement(milieu):
+                    haut = milieu
+                else:
+                    bas = milieu + 1
+            plus_bas = bas
+        else:
+            plus_bas = next((i for i in range(k) if surclasse_strictement(i)), k)
+        
+        return max(k - 2 - plus_bas, 0)
+    
     def affectation_pessimiste(self, aliment: pd.Series) -> str:
         """
         Procédure d'affectation pessimiste
         
         Returns:
-            Classe affectée (A', B', C', D', E')
+            Classe affectée (A', B', C', D', E' pour les profils par défaut)
         """
-        # Les profils sont ordonnés de b6 à b1
-        # Classes: A' (meilleure) à E' (moins bonne)
-        classes = ["A'", "B'", "C'", "D'", "E'"]
+        return self.CLASSES[self.indice_pessimiste(aliment)]
+    
+    def affectation_optimiste(self, aliment: pd.Series) -> str:
+        """
+        Procédure d'affectation optimiste
         
-        # Comparer successivement à b6, b5, b4, b3, b2, b1
-        # b6 sépare A' de B', b5 sépare B' de C', etc.
-        for i in range(6, 0, -1):  # De b6 à b1
-            profil_name = f'b{i}'
-            profil = self.profils.loc[profil_name]
-            
-            a_S_b, b_S_a = self.surclassement(aliment, profil)
-            
-            # Si l'aliment surclasse le profil bi, il est affecté à la classe Ci
-            if a_S_b:
-                # b6 -> A', b5 -> B', b4 -> C', b3 -> D', b2 -> E', b1 -> E'
-                if i == 6:
-                    return "A'"
-                elif i == 5:
-                    return "B'"
-                elif i == 4:
-                    return "C'"
-                elif i == 3:
-                    return "D'"
+        Returns:
+            Classe affectée (A', B', C', D', E' pour les profils par défaut)
+        """
+        return self.CLASSES[self.indice_optimiste(aliment)]
+    
+    def matrice_criteres(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Extrait la matrice des critères (n produits x m critères), dans l'ordre
+        des poids
+        
+        Une matrice numpy (par exemple chargée depuis le cache colonnaire) est
+        supposée déjà dans cet ordre et utilisée sans copie.
+        """
+        if isinstance(df, np.ndarray):
+            return df
+        return df[list(self.poids)].to_numpy(dtype=float)
+    
+    def matrice_profils(self) -> np.ndarray:
+        """Retourne la matrice des profils (k profils x m critères), du pire au meilleur"""
+        return self.profils.loc[self.PROFILS, list(self.poids)].to_numpy(dtype=float)
+    
+    def comparaisons_lot(self, X: np.ndarray,
+                         P: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Construit en une diffusion les tenseurs de concordance partielle
+        c_j(a,b) et c_j(b,a) de forme (n produits x k profils x m critères)
+        
+        Args:
+            X: Matrice des critères (voir matrice_criteres)
+            P: Matrice des profils déjà extraite (par défaut matrice_profils())
+        
+        Returns:
+            Tuple (c(aliments, profils), c(profils, aliments)) de booléens
+        """
+        if P is None:
+            P = self.matrice_profils()
+        a_sup_b = X[:, None, :] >= P[None, :, :]
+        b_sup_a = P[None, :, :] >= X[:, None, :]
+        
+        a_maximiser = np.array([critere in self.criteres_a_maximiser
+                                for critere in self.poids])
+        c_ab = np.where(a_maximiser, a_sup_b, b_sup_a)
+        c_ba = np.where(a_maximiser, b_sup_a, a_sup_b)
+        
+        return c_ab, c_ba
+    
+    def somme_ponderee(self, c: np.ndarray) -> np.ndarray:
+        """
+        Réduit un tenseur de concordances partielles (..., m) en indices globaux
+        
+        Les critères sont accumulés un par un, dans l'ordre des poids : les
+        arrondis flottants sont ainsi identiques à ceux de concordance_globale,
+        ce qui garantit les mêmes comparaisons au seuil lambda.
+        """
+        somme_poids = sum(self.poids.values())
+        
+        C = np.zeros(c.shape[:-1])
+        for j, poids in enumerate(self.poids.values()):
+            C += poids * c[..., j]
+        
+        return C / somme_poids
+    
+    def credibilites_colonnes(self, colonnes, profils,
+                              avec_ba: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Indices de crédibilité sigma(a,b) et sigma(b,a), seuils q, p, v compris
+        
+        Concordances partielles linéaires entre q et p, discordances entre p
+        et v, puis affaiblissement de C par les critères discordants. Les
+        critères sont traités un par un, en accumulant directement les indices
+        globaux : mêmes opérations, dans le même ordre, que credibilite.
+        
+        Args:
+            colonnes, profils: Valeurs des aliments et des profils (ou d'autres
+                               produits), une entrée par critère (ordre des
+                               poids), de formes diffusables (n x 1 et 1 x k,
+                               ou n et n)
+            avec_ba: Calcule aussi sigma(b,a) (sinon None)
+        
+        Returns:
+            Tuple (sigma(aliments, profils), sigma(profils, aliments))
+        """
+        q, p, v = self.vecteurs_seuils()
+        a_maximiser = [critere in self.criteres_a_maximiser for critere in self.poids]
+        somme_poids = sum(self.poids.values())
+        sens = ((True, False) if avec_ba else (True,))
+        
+        def avantage(j):
+            """Avantage des aliments sur les profils dans le sens du critère j"""
+            ecart = colonnes[j] - profils[j]
+            return ecart if a_maximiser[j] else -ecart
+        
+        forme = np.broadcast_shapes(np.shape(colonnes[0]), np.shape(profils[0]))
+        C = [np.zeros(forme) for _ in sens]
+        for j, poids in enumerate(self.poids.values()):
+            if p[j] > q[j]:
+                ecart = avantage(j)
+                for C_s, ab in zip(C, sens):
+                    c = ecart + p[j] if ab else p[j] - ecart
+                    c /= p[j] - q[j]
+                    # fmax : valeur manquante -> 0, comme une comparaison nette
+                    np.fmax(c, 0.0, out=c)
+                    np.minimum(c, 1.0, out=c)
+                    c *= poids
+                    C_s += c
+            else:
+                # Critère net : mêmes comparaisons que concordance_partielle
+                for C_s, ab in zip(C, sens):
+                    if ab == a_maximiser[j]:
+                        C_s += poids * (colonnes[j] + q[j] >= profils[j])
+                    else:
+                        C_s += poids * (profils[j] + q[j] >= colonnes[j])
+        for C_s in C:
+            C_s /= somme_poids
+        
+        if not np.isfinite(v).any():
+            return C[0], (C[1] if avec_ba else None)
+        
+        # Discordances : seules les paires en défaveur de plus de p (de v au
+        # moins si v = p) sont concernées, les autres gardent un facteur 1
+        facteurs = [np.ones(forme) for _ in sens]
+        for j in np.flatnonzero(np.isfinite(v)):
+            ecart = avantage(j)
+            for C_s, facteur, ab in zip(C, facteurs, sens):
+                defaveur = -ecart if ab else ecart
+                if v[j] > p[j]:
+                    ou = np.nonzero(defaveur > p[j])
+                    d = np.minimum((defaveur[ou] - p[j]) / (v[j] - p[j]), 1.0)
                 else:
-                    return "E'"
+                    ou = np.nonzero(defaveur >= v[j])
+                    d = np.ones(len(ou[0]))
+                # Seules les paires où d > C affaiblissent la crédibilité
+                affaiblis = d > C_s[ou]
+                ou = tuple(indices[affaiblis] for indices in ou)
+                ratio = (1.0 - d[affaiblis]) / (1.0 - C_s[ou])
+                facteur[ou] *= ratio
         
-        # Si aucun surclassement, affecter à la classe la plus basse
-        return "E'"
+        sigmas = [C_s * facteur for C_s, facteur in zip(C, facteurs)]
+        return sigmas[0], (sigmas[1] if avec_ba else None)
     
-    def affectation_optimiste(self, aliment: pd.Series) -> str:
+    def credibilites_lot(self, X: np.ndarray,
+                         P: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Procédure d'affectation optimiste
+        Indices de crédibilité d'un bloc de produits face à tous les profils
+        
+        Sans seuils, revient exactement à comparaisons_lot suivi de
+        somme_ponderee (concordances nettes).
+        
+        Args:
+            X: Matrice des critères (voir matrice_criteres)
+            P: Matrice des profils déjà extraite (par défaut matrice_profils())
         
         Returns:
-            Classe affectée (A', B', C', D', E')
+            Tuple (sigma(aliments, profils), sigma(profils, aliments)), n x k
         """
-        # Comparer successivement à b1, b2, b3, b4, b5, b6
-        for i in range(1, 7):  # De b1 à b6
-            profil_name = f'b{i}'
-            profil = self.profils.loc[profil_name]
-            
-            a_S_b, b_S_a = self.surclassement(aliment, profil)
+        if P is None:
+            P = self.matrice_profils()
+        if not self.a_seuils():
+            c_ab, c_ba = self.comparaisons_lot(X, P)
+            return self.somme_ponderee(c_ab), self.somme_ponderee(c_ba)
+        
+        # Un critère par ligne : chaque étape travaille sur des matrices n x k
+        colonnes = np.ascontiguousarray(X.T)[:, :, None]
+        return self.credibilites_colonnes(colonnes, P.T[:, None, :])
+    
+    @trace('electre.concordances')
+    def concordances_lot(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcule les indices de concordance globaux de tous les produits face à
+        tous les profils (indices de crédibilité si des seuils sont définis)
+        
+        Returns:
+            Tuple (C(aliments, profils), C(profils, aliments)), matrices n x k
+        """
+        if self.moteur == 'masques':
+            M_ab, M_ba = self.masques_comparaison(df)
+            return self.concordances_depuis_masques(M_ab, M_ba)
+        
+        X = self.matrice_criteres(df)
+        
+        C_ab = np.empty((len(X), len(self.PROFILS)))
+        C_ba = np.empty((len(X), len(self.PROFILS)))
+        
+        # Traitement par blocs pour borner la taille du tenseur n x k x m
+        for debut in range(0, len(X), self.TAILLE_BLOC):
+            bloc = slice(debut, debut + self.TAILLE_BLOC)
+            C_ab[bloc], C_ba[bloc] = self.credibilites_lot(X[bloc])
+        
+        return C_ab, C_ba
+    
+    def type_masque(self) -> type:
+        """Plus petit entier non signé pouvant coder un sous-ensemble de critères"""
+        n_criteres = len(self.poids)
+        if n_criteres <= 8:
+            return np.uint8
+        if n_criteres <= 16:
+            return np.uint16
+        raise ValueError(f"Trop de critères pour le moteur à masques : {n_criteres} (16 max)")
+    
+    def masques_comparaison(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Code chaque comparaison produit/profil en masque de bits
+        
+        Le bit j vaut 1 si le critère j (dans l'ordre des poids) est en
+        concordance. Les masques ne dépendent pas des poids : seule la table
+        des sous-ensembles est à refaire lorsqu'ils changent.
+        
+        Returns:
+            Tuple (masques(aliments, profils), masques(profils, aliments)),
+            matrices n x k d'entiers uint8 (ou uint16 au-delà de 8 critères)
+        """
+        if self.a_seuils():
+            raise ValueError("Le moteur à masques ne gère pas les seuils q, p, v")
+        X = self.matrice_criteres(df)
+        P = self.matrice_profils()
+        
+        M_ab = np.zeros((len(X), len(P)), dtype=self.type_masque())
+        M_ba = np.zeros((len(X), len(P)), dtype=self.type_masque())
+        
+        for debut in range(0, len(X), self.TAILLE_BLOC):
+            bloc = slice(debut, debut + self.TAILLE_BLOC)
+            M_ab[bloc], M_ba[bloc] = self.masques_lot(X[bloc], P)
+        
+        return M_ab, M_ba
+    
+    def masques_lot(self, X: np.ndarray, P: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Masques de comparaison d'un bloc de produits face aux lignes de P
+        (profils, ou d'autres produits), critère par critère
+        
+        Seul l'ordre des valeurs compte : X et P peuvent être remplacés par
+        des rangs entiers communs (comparaisons plus rapides).
+        
+        Returns:
+            Tuple (masques(X, P), masques(P, X)), matrices len(X) x len(P)
+        """
+        type_masque = self.type_masque()
+        forme = (len(X), len(P))
+        M_ab = np.zeros(forme, dtype=type_masque)
+        M_ba = np.zeros(forme, dtype=type_masque)
+        
+        # Tampons réutilisés d'un critère à l'autre (aucune allocation n x k)
+        a_sup_b = np.empty(forme, dtype=bool)
+        b_sup_a = np.empty(forme, dtype=bool)
+        bit = np.empty(forme, dtype=type_masque)
+        colonnes = np.ascontiguousarray(X.T)[:, :, None]
+        lignes_profils = np.ascontiguousarray(P.T)[:, None, :]
+        for j, critere in enumerate(self.poids):
+            np.greater_equal(colonnes[j], lignes_profils[j], out=a_sup_b)
+            np.greater_equal(lignes_profils[j], colonnes[j], out=b_sup_a)
+            if critere in self.criteres_a_maximiser:
+                c_ab, c_ba = a_sup_b, b_sup_a
+            else:
+                c_ab, c_ba = b_sup_a, a_sup_b
+            for c, M in ((c_ab, M_ab), (c_ba, M_ba)):
+                np.multiply(c.view(np.uint8), type_masque(1 << j), out=bit, dtype=type_masque)
+                M |= bit
+        
+        return M_ab, M_ba
+    
+    def table_poids_sous_ensembles(self) -> np.ndarray:
+        """
+        Précalcule l'indice de concordance de chacun des 2^m sous-ensembles de
+        critères (256 entrées pour 8 critères)
+        
+        Returns:
+            Tableau T tel que T[masque] = C pour ce sous-ensemble de critères
+        """
+        masques = np.arange(2 ** len(self.poids))
+        bits = (masques[:, None] >> np.arange(len(self.poids))) & 1
+        return self.somme_ponderee(bits.astype(bool))
+    
+    def concordances_depuis_masques(self, M_ab: np.ndarray, M_ba: np.ndarray,
+                                    table: np.ndarray = None
+                                    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Résout C(a,b) et C(b,a) par simple lecture dans la table des sous-ensembles
+        
+        Args:
+            M_ab, M_ba: Masques retournés par masques_comparaison
+            table: Table des sous-ensembles (recalculée si absente)
+        
+        Returns:
+            Tuple (C(aliments, profils), C(profils, aliments)), matrices n x k
+        """
+        if table is None:
+            table = self.table_poids_sous_ensembles()
+        
+        return table[M_ab], table[M_ba]
+    
+    def indices_classes_lot(self, C_ab: np.ndarray, C_ba: np.ndarray,
+                            methode: str = 'pessimiste',
+                            lambda_seuil=None) -> np.ndarray:
+        """
+        Calcule les indices (dans CLASSES) des classes affectées
+        
+        Args:
+            C_ab, C_ba: Matrices n x k retournées par concordances_lot
+            methode: 'pessimiste' ou 'optimiste'
+            lambda_seuil: Seuil de majorité, scalaire ou colonne (n x 1) d'un
+                          seuil par produit (par défaut celui de l'instance)
+        
+        Returns:
+            Tableau d'entiers (0 = A', ..., 4 = E')
+        """
+        if lambda_seuil is None:
+            lambda_seuil = self.lambda_seuil
+        
+        n_profils = C_ab.shape[1]
+        derniere_classe = len(self.CLASSES) - 1
+        a_S_b = C_ab >= lambda_seuil
+        
+        if methode == 'pessimiste':
+            # Profil le plus haut surclassé par l'aliment (b6 -> A', ..., b2/b1 -> E')
+            trouve = a_S_b.any(axis=1)
+            i_max = n_profils - 1 - np.argmax(a_S_b[:, ::-1], axis=1)
+            indices = np.minimum(n_profils - 1 - i_max, derniere_classe)
+            indices = np.where(trouve, indices, derniere_classe)
+        else:
+            # Premier profil qui surclasse strictement l'aliment (b1 -> E', ..., b5/b6 -> A')
+            b_P_a = (C_ba >= lambda_seuil) & ~a_S_b
+            trouve = b_P_a.any(axis=1)
+            i_min = np.argmax(b_P_a, axis=1)
+            indices = np.maximum(n_profils - 2 - i_min, 0)
+            indices = np.where(trouve, indices, 0)
+        
+        return indices
+    
+    def indices_classes_dichotomie(self, df: pd.DataFrame, methode: str = 'pessimiste',
+                                   lambda_seuil: float = None) -> np.ndarray:
+        """
+        Indices des classes par recherche dichotomique sur les profils
+        
+        Chaque produit n'est comparé qu'à ceil(log2(k + 1)) profils au lieu des
+        k : à chaque étape, tous les produits sont confrontés en une diffusion
+        au profil médian de leur propre intervalle. Les profils doivent être
+        ordonnés (voir profils_ordonnes) ; les indices de concordance sont
+        sommés dans le même ordre que somme_ponderee, d'où des classes
+        identiques à indices_classes_lot. Avec des seuils q, p, v (les mêmes
+        pour tous les profils), la crédibilité reste monotone le long des
+        profils ordonnés : la dichotomie s'applique aussi.
+        
+        Returns:
+            Tableau d'entiers (0 = A', ...)
+        """
+        if lambda_seuil is None:
+            lambda_seuil = self.lambda_seuil
+        
+        X = self.matrice_criteres(df)
+        P = self.matrice_profils()
+        k = len(P)
+        a_maximiser = [critere in self.criteres_a_maximiser for critere in self.poids]
+        poids = list(self.poids.values())
+        somme_poids = sum(poids)
+        seuils = self.a_seuils()
+        
+        # Pessimiste : premier profil non surclassé ; optimiste : premier
+        # profil surclassant strictement. Les deux sont cherchés dans [0, k].
+        bas = np.zeros(len(X), dtype=np.int64)
+        for debut in range(0, len(X), self.TAILLE_BLOC):
+            bloc = slice(debut, debut + self.TAILLE_BLOC)
+            # Un critère par ligne : chaque étape lit des colonnes contiguës
+            colonnes = np.ascontiguousarray(X[bloc].T)
+            b = np.zeros(colonnes.shape[1], dtype=np.int64)
+            h = np.full(colonnes.shape[1], k, dtype=np.int64)
             
-            # Si le profil surclasse l'aliment ET l'aliment ne surclasse pas le profil
-            if b_S_a and not a_S_b:
-                # b1 -> E', b2 -> D', b3 -> C', b4 -> B', b5 -> A', b6 -> A'
-                if i == 1:
-                    return "E'"
-                elif i == 2:
-                    return "D'"
-                elif i == 3:
-                    return "C'"
-                elif i == 4:
-                    return "B'"
+            while (b < h).any():
+                milieu = (b + h) // 2
+                profil = np.minimum(milieu, k - 1)
+                if seuils:
+                    C_ab, C_ba = self.credibilites_colonnes(
+                        colonnes, P[profil].T, avec_ba=methode != 'pessimiste')
                 else:
-                    return "A'"
+                    C_ab = np.zeros(len(b))
+                    C_ba = np.zeros(len(b))
+                    for j, (p, maximiser) in enumerate(zip(poids, a_maximiser)):
+                        valeurs_profil = P[profil, j]
+                        a_sup_b = colonnes[j] >= valeurs_profil
+                        b_sup_a = valeurs_profil >= colonnes[j]
+                        C_ab += p * (a_sup_b if maximiser else b_sup_a)
+                        if methode != 'pessimiste':
+                            C_ba += p * (b_sup_a if maximiser else a_sup_b)
+                    C_ab /= somme_poids
+                    C_ba /= somme_poids
+                a_S_b = C_ab >= lambda_seuil
+                
+                if methode == 'pessimiste':
+                    vers_le_haut = a_S_b
+                else:
+                    vers_le_haut = a_S_b | ~(C_ba >= lambda_seuil)
+                
+                actifs = b < h
+                b = np.where(actifs & vers_le_haut, milieu + 1, b)
+                h = np.where(actifs & ~vers_le_haut, milieu, h)
+            
+            bas[bloc] = b
+        
+        if methode == 'pessimiste':
+            return np.minimum(k - bas, len(self.CLASSES) - 1)
+        return np.maximum(k - 2 - bas, 0)
+    
+    def dichotomie_possible(self) -> bool:
+        """indices_classes_dichotomie s'applique (moteur 'tenseur', profils ordonnés)"""
+        return self.moteur == 'tenseur' and self.profils_ordonnes()
+    
+    def indices_classes(self, df: pd.DataFrame, methode: str = 'pessimiste',
+                        lambda_seuil: float = None) -> np.ndarray:
+        """
+        Indices des classes de tous les produits
+        
+        Recherche dichotomique si les profils sont ordonnés (moteur
+        'tenseur'), sinon comparaison à tous les profils (concordances_lot).
+        """
+        if self.dichotomie_possible():
+            return self.indices_classes_dichotomie(df, methode, lambda_seuil)
+        C_ab, C_ba = self.concordances_lot(df)
+        return self.indices_classes_lot(C_ab, C_ba, methode, lambda_seuil)
+    
+    def affecter_lot(self, C_ab: np.ndarray, C_ba: np.ndarray,
+                     methode: str = 'pessimiste',
+                     lambda_seuil: float = None) -> np.ndarray:
+        """
+        Affecte les classes à partir des indices de concordance globaux
+        
+        Reproduit affectation_pessimiste et affectation_optimiste sur tous les
+        produits à la fois.
+        
+        Args:
+            C_ab, C_ba: Matrices n x k retournées par concordances_lot
+            methode: 'pessimiste' ou 'optimiste'
+            lambda_seuil: Seuil de majorité (par défaut celui de l'instance)
+        
+        Returns:
+            Tableau des classes affectées (A', B', C', D', E')
+        """
+        indices = self.indices_classes_lot(C_ab, C_ba, methode, lambda_seuil)
+        return np.array(self.CLASSES, dtype=object)[indices]
+    
+    def classes_categorielles(self, indices: np.ndarray) -> pd.Categorical:
+        """
+        Classes sous forme catégorielle ordonnée : un code int8 par produit au
+        lieu d'une chaîne
+        """
+        return pd.Categorical.from_codes(indices, categories=self.CLASSES, ordered=True)
+    
+    @trace('electre.classifier_lot')
+    def classifier_lot(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Affecte en un seul appel les classes pessimiste et optimiste (par
+        dichotomie, ou à partir des mêmes indices de concordance si les
+        profils ne sont pas ordonnés)
+        
+        Returns:
+            DataFrame (même index que df) avec les colonnes
+            Classe_ELECTRE_Pessimiste et Classe_ELECTRE_Optimiste
+        """
+        if self.dichotomie_possible():
+            classes = np.array(self.CLASSES, dtype=object)
+            pessimiste = classes[self.indices_classes_dichotomie(df, 'pessimiste')]
+            optimiste = classes[self.indices_classes_dichotomie(df, 'optimiste')]
+        else:
+            C_ab, C_ba = self.concordances_lot(df)
+            pessimiste = self.affecter_lot(C_ab, C_ba, 'pessimiste')
+            optimiste = self.affecter_lot(C_ab, C_ba, 'optimiste')
+        
+        return pd.DataFrame({
+            'Classe_ELECTRE_Pessimiste': pessimiste,
+            'Classe_ELECTRE_Optimiste': optimiste
+        }, index=df.index)
+    
+    @trace('electre.balayer_lambdas')
+    def balayer_lambdas(self, df: pd.DataFrame, lambdas: List[float],
+                        methodes: Tuple[str, ...] = ('pessimiste', 'optimiste')
+                        ) -> pd.DataFrame:
+        """
+        Classifie la base pour toute une grille de seuils lambda
+        
+        Les indices de concordance ne dépendent pas de lambda : ils sont calculés
+        une seule fois, puis seule l'affectation est refaite pour chaque couple
+        (lambda, procédure).
+        
+        Args:
+            df: DataFrame contenant les produits
+            lambdas: Valeurs du seuil de majorité à tester
+            methodes: Procédures d'affectation à appliquer
+        
+        Returns:
+            Table longue avec les colonnes Produit (index de df), Lambda,
+            Methode et Classe (une ligne par produit et par couple)
+        """
+        C_ab, C_ba = self.concordances_lot(df)
+        
+        blocs = []
+        for lambda_seuil in lambdas:
+            for methode in methodes:
+                indices = self.indices_classes_lot(C_ab, C_ba, methode, lambda_seuil)
+                blocs.append(pd.DataFrame({
+                    'Produit': df.index,
+                    'Lambda': lambda_seuil,
+                    'Methode': methode,
+                    'Classe': self.classes_categorielles(indices)
+                }))
         
-        # Si aucune condition remplie, affecter à la classe la plus haute
-        return "A'"
+        resultat = pd.concat(blocs, ignore_index=True)
+        resultat['Methode'] = resultat['Methode'].astype('category')
+        
+        return resultat
+    
+    def points_rupture_lambda(self, df: pd.DataFrame,
+                              concordances: Tuple[np.ndarray, np.ndarray] = None
+                              ) -> 'RupturesLambda':
+        """
+        Précalcule, pour chaque produit, les classes pessimiste et optimiste
+        en fonction de lambda (voir RupturesLambda)
+        """
+        return RupturesLambda(self, df, concordances)
     
+    @trace('electre.classifier_base_donnees')
     def classifier_base_donnees(self, df: pd.DataFrame, 
-                               methode: str = 'pessimiste') -> pd.DataFrame:
+                               methode: str = 'pessimiste',
+                               en_place: bool = False) -> pd.Series:
         """
         Classifie tous les produits d'une base de données
         
+        La base n'est pas copiée : seule la colonne des classes est créée.
+        
         Args:
             df: DataFrame contenant les produits
             methode: 'pessimiste' ou 'optimiste'
+            en_place: Ajoute aussi la colonne Classe_ELECTRE_<Methode> à df
         
         Returns:
-            DataFrame avec une nouvelle colonne contenant la classe affectée
+            Série catégorielle des classes affectées (même index que df)
         """
-        resultats = []
+        indices = self.indices_classes(df, methode)
         
-        for idx, aliment in df.iterrows():
-            if methode == 'pessimiste':
-                classe = self.affectation_pessimiste(aliment)
-            else:
-                classe = self.affectation_optimiste(aliment)
-            
-            resultats.append(classe)
-        
-        df_resultat = df.copy()
         colonne_nom = f'Classe_ELECTRE_{methode.capitalize()}'
-        df_resultat[colonne_nom] = resultats
+        resultats = pd.Series(self.classes_categorielles(indices), index=df.index,
+                              name=colonne_nom)
+        if en_place:
+            df[colonne_nom] = resultats
         
-        return df_resultat
+        return resultats
+
+
+class RupturesLambda:
+    """
+    Classes ELECTRE TRI de chaque produit pour toutes les valeurs de lambda
+    
+    La classe d'un produit est une fonction en escalier de lambda qui ne peut
+    changer qu'aux valeurs C(a,bi) et C(bi,a). Ces points de rupture sont triés
+    par produit ; entre deux points consécutifs t(j-1) < lambda <= t(j), les
+    relations de surclassement sont celles obtenues pour lambda = t(j), ce qui
+    donne la classe de tout l'intervalle.
+    
+    La structure ne dépend que des poids, des profils et des seuils : elle
+    doit être reconstruite uniquement si ceux-ci changent (voir est_valide_pour).
+    """
+    
+    @trace('electre.ruptures_lambda')
+    def __init__(self, electre: ElectreTri, df: pd.DataFrame,
+                 concordances: Tuple[np.ndarray, np.ndarray] = None):
+        """
+        Args:
+            electre: Instance ElectreTri (poids et profils ; lambda est ignoré)
+            df: DataFrame contenant les produits
+            concordances: Indices (C_ab, C_ba) déjà calculés pour df, par
+                          exemple depuis des masques de comparaison
+        """
+        self.poids = dict(electre.poids)
+        self.profils = electre.profils.copy()
+        self.seuils = electre.vecteurs_seuils()
+        self.classes = np.array(electre.CLASSES, dtype=object)
+        self.index = df.index
+        
+        if concordances is None:
+            concordances = electre.concordances_lot(df)
+        C_ab, C_ba = concordances
+        
+        # Points de rupture triés (n x 2k), doublons conservés (intervalles vides)
+        self.ruptures = np.sort(np.concatenate([C_ab, C_ba], axis=1), axis=1)
+        
+        # Classe sur chaque intervalle (n x 2k+1) ; au-delà du dernier point,
+        # aucun surclassement : E' en pessimiste, A' en optimiste
+        n, n_ruptures = self.ruptures.shape
+        self.indices = {}
+        for methode, classe_finale in (('pessimiste', len(self.classes) - 1),
+                                       ('optimiste', 0)):
+            table = np.empty((n, n_ruptures + 1), dtype=np.int8)
+            for j in range(n_ruptures):
+                table[:, j] = electre.indices_classes_lot(
+                    C_ab, C_ba, methode, self.ruptures[:, j:j + 1])
+            table[:, n_ruptures] = classe_finale
+            self.indices[methode] = table
+    
+    def indices_classes(self, lambda_seuil: float,
+                        methode: str = 'pessimiste') -> np.ndarray:
+        """Indices des classes de tous les produits pour un lambda donné"""
+        # searchsorted (côté gauche) ligne par ligne : nombre de points < lambda
+        intervalles = (self.ruptures < lambda_seuil).sum(axis=1)
+        return self.indices[methode][np.arange(len(intervalles)), intervalles]
+    
+    def classes_pour(self, lambda_seuil: float,
+                     methode: str = 'pessimiste') -> pd.Series:
+        """
+        Retourne les classes de tous les produits pour un lambda donné, sans
+        reclassification
+        """
+        indices = self.indices_classes(lambda_seuil, methode)
+        return pd.Series(pd.Categorical.from_codes(indices, categories=self.classes,
+                                                   ordered=True), index=self.index)
+    
+    def est_valide_pour(self, electre: ElectreTri) -> bool:
+        """Indique si la structure correspond aux poids, profils et seuils d'electre"""
+        return (dict(electre.poids) == self.poids
+                and electre.profils.equals(self.profils)
+                and all(np.array_equal(a, b) for a, b in
+                        zip(electre.vecteurs_seuils(), self.seuils)))
 
 
 class AnalyseResultats:
     """Classe pour analyser et comparer les résultats"""
     
+    CLASSES = ['A', 'B', 'C', 'D', 'E']
+    
+    @staticmethod
+    def codes_classes(valeurs, classes: List[str]) -> np.ndarray:
+        """
+        Convertit des labels en codes entiers (position dans classes, -1 si inconnu)
+        
+        Les apostrophes (A', B'...) sont ignorées ; le nettoyage des chaînes n'est
+        fait qu'une fois par valeur distincte.
+        """
+        codes, uniques = pd.factorize(pd.Series(valeurs, copy=False), use_na_sentinel=False)
+        position = {classe: i for i, classe in enumerate(classes)}
+        codes_uniques = np.array([position.get(str(u).replace("'", ""), -1) for u in uniques],
+                                 dtype=np.int64)
+        return codes_uniques[codes] if len(codes) else codes.astype(np.int64)
+    
     @staticmethod
+    @trace('analyse.matrice_confusion')
     def matrice_confusion(vraies_classes: pd.Series, 
                          classes_predites: pd.Series) -> pd.DataFrame:
         """Calcule la matrice de confusion"""
-        classes = ['A', 'B', 'C', 'D', 'E']
-        
-        # Créer la matrice de confusion
-        matrice = pd.DataFrame(0, index=classes, columns=classes)
-        
-        for vrai, pred in zip(vraies_classes, classes_predites):
-            # Enlever les apostrophes si présentes
-            vrai_clean = str(vrai).replace("'", "")
-            pred_clean = str(pred).replace("'", "")
-            
-            if vrai_clean in classes and pred_clean in classes:
-                matrice.loc[vrai_clean, pred_clean] += 1
-        
-        return matrice
+        accumulateur = AccumulateurConfusion(AnalyseResultats.CLASSES)
+        accumulateur.mettre_a_jour(vraies_classes, classes_predites)
+        return accumulateur.matrice()
     
     @staticmethod
+    @trace('analyse.metriques')
     def calculer_metriques(matrice: pd.DataFrame) -> Dict:
         """Calcule les métriques de performance à partir de la matrice de confusion"""
         total = matrice.sum().sum()
@@ -362,9 +1176,40 @@ class AnalyseResultats:
         
         return {
             'accuracy': accuracy,
+            'kappa_pondere': AnalyseResultats.kappa_pondere(matrice),
             'par_classe': metriques_par_classe
         }
     
+    @staticmethod
+    def kappa_pondere(matrice: pd.DataFrame, ponderation: str = 'quadratique') -> float:
+        """
+        Calcule le kappa de Cohen pondéré (classes ordonnées de A à E)
+        
+        Args:
+            matrice: Matrice de confusion carrée
+            ponderation: 'quadratique', 'lineaire' ou 'aucune' (kappa simple)
+        """
+        observe = matrice.to_numpy(dtype=float)
+        total = observe.sum()
+        if total == 0:
+            return 0
+        
+        k = len(observe)
+        ecarts = np.abs(np.subtract.outer(np.arange(k), np.arange(k))) / max(k - 1, 1)
+        if ponderation == 'quadratique':
+            desaccords = ecarts ** 2
+        elif ponderation == 'lineaire':
+            desaccords = ecarts
+        else:
+            desaccords = (ecarts > 0).astype(float)
+        
+        attendu = np.outer(observe.sum(axis=1), observe.sum(axis=0)) / total
+        desaccord_attendu = (desaccords * attendu).sum()
+        
+        if desaccord_attendu == 0:
+            return 1.0
+        return 1 - (desaccords * observe).sum() / desaccord_attendu
+    
     @staticmethod
     def statistiques_descriptives(df: pd.DataFrame, colonne_classe: str) -> pd.DataFrame:
         """Calcule des statistiques descriptives par classe"""
@@ -378,51 +1223,131 @@ class AnalyseResultats:
         return stats
 
 
-def creer_profils_limites(df: pd.DataFrame) -> pd.DataFrame:
+class AccumulateurConfusion:
+    """
+    Matrice de confusion alimentée bloc par bloc et fusionnable
+    
+    Permet d'évaluer une classification en flux ou répartie sur plusieurs
+    processus sans conserver les colonnes de labels : chaque bloc met à jour
+    les comptes, et les accumulateurs des différents processus s'additionnent.
+    """
+    
+    def __init__(self, classes: List[str] = None):
+        """
+        Args:
+            classes: Classes ordonnées (par défaut A à E)
+        """
+        self.classes = list(classes or AnalyseResultats.CLASSES)
+        self.comptes = np.zeros((len(self.classes), len(self.classes)), dtype=np.int64)
+    
+    def mettre_a_jour(self, vraies_classes, classes_predites) -> 'AccumulateurConfusion':
+        """Ajoute un bloc de couples (vraie classe, classe prédite)"""
+        k = len(self.classes)
+        vrais = AnalyseResultats.codes_classes(vraies_classes, self.classes)
+        predits = AnalyseResultats.codes_classes(classes_predites, self.classes)
+        
+        valides = (vrais >= 0) & (predits >= 0)
+        paires = vrais[valides] * k + predits[valides]
+        self.comptes += np.bincount(paires, minlength=k * k).reshape(k, k)
+        
+        return self
+    
+    def fusionner(self, autre: 'AccumulateurConfusion') -> 'AccumulateurConfusion':
+        """Ajoute les comptes d'un autre accumulateur (même classes)"""
+        if autre.classes != self.classes:
+            raise ValueError("Les accumulateurs n'ont pas les mêmes classes")
+        self.comptes += autre.comptes
+        return self
+    
+    def __add__(self, autre: 'AccumulateurConfusion') -> 'AccumulateurConfusion':
+        return AccumulateurConfusion(self.classes).fusionner(self).fusionner(autre)
+    
+    def matrice(self) -> pd.DataFrame:
+        """Retourne la matrice de confusion (lignes: vraies classes)"""
+        return pd.DataFrame(self.comptes.copy(), index=self.classes, columns=self.classes)
+    
+    def metriques(self) -> Dict:
+        """Calcule les métriques (voir AnalyseResultats.calculer_metriques)"""
+        return AnalyseResultats.calculer_metriques(self.matrice())
+
+
+# Critères utilisés par ELECTRE TRI et sens de préférence
+CRITERES_MINIMISER = ['Energie_kJ', 'Acides_Gras_Satures_g', 'Sucres_g',
+                      'Sodium_mg', 'Nombre_Additifs']
+CRITERES_MAXIMISER = ['Proteines_g', 'Fibres_g', 'Fruits_Legumes_Pct']
+CRITERES = ['Energie_kJ', 'Acides_Gras_Satures_g', 'Sucres_g', 'Sodium_mg',
+            'Proteines_g', 'Fibres_g', 'Fruits_Legumes_Pct', 'Nombre_Additifs']
+
+# Quantiles et marges utilisés par défaut pour les profils limites
+QUANTILES_PROFILS = (0.20, 0.40, 0.60, 0.80)
+FACTEUR_MIN_PROFILS = 0.1   # 10% du min
+FACTEUR_MAX_PROFILS = 1.5   # 150% du max
+
+
+def profils_depuis_statistiques(minimums: pd.Series, maximums: pd.Series,
+                                table_quantiles: pd.DataFrame,
+                                facteur_min: float = FACTEUR_MIN_PROFILS,
+                                facteur_max: float = FACTEUR_MAX_PROFILS
+                                ) -> pd.DataFrame:
+    """
+    Assemble les profils limites à partir des statistiques de chaque critère
+    
+    Args:
+        minimums, maximums: Valeurs extrêmes par critère
+        table_quantiles: Quantiles (lignes, niveaux croissants) par critère (colonnes)
+        facteur_min: Marge appliquée au minimum
+        facteur_max: Marge appliquée au maximum
+    
+    Returns:
+        DataFrame contenant les profils b1 (pire) à bk (meilleur), k = nb quantiles + 2
+    """
+    criteres = list(table_quantiles.columns)
+    quantiles = table_quantiles.to_numpy(dtype=float)
+    borne_basse = minimums[criteres].to_numpy(dtype=float) * facteur_min
+    borne_haute = maximums[criteres].to_numpy(dtype=float) * facteur_max
+    
+    # Du pire (b1) au meilleur (bk) pour un critère à maximiser...
+    valeurs = np.vstack([borne_basse, quantiles, borne_haute])
+    
+    # ... et dans l'ordre inverse pour un critère à minimiser
+    a_minimiser = np.array([critere not in CRITERES_MAXIMISER for critere in criteres])
+    valeurs[:, a_minimiser] = valeurs[::-1, a_minimiser]
+    
+    index = [f'b{i}' for i in range(1, len(valeurs) + 1)]
+    return pd.DataFrame(valeurs, index=index, columns=criteres)
+
+
+@trace('profils.creer_profils_limites')
+def creer_profils_limites(df: pd.DataFrame,
+                          quantiles: Tuple[float, ...] = QUANTILES_PROFILS,
+                          facteur_min: float = FACTEUR_MIN_PROFILS,
+                          facteur_max: float = FACTEUR_MAX_PROFILS,
+                          criteres: List[str] = None) -> pd.DataFrame:
     """
-    Crée les 6 profils limites (b1 à b6) basés sur les quantiles de la base de données
+    Crée les profils limites (b1 à b6 par défaut) basés sur les quantiles de la base de données
+    
+    Pour les critères à minimiser, b6 (meilleur) = min x facteur_min et
+    b1 (pire) = max x facteur_max ; l'inverse pour les critères à maximiser.
+    Tous les quantiles de tous les critères sont calculés en un seul appel.
     
     Args:
         df: DataFrame contenant les produits
+        quantiles: Niveaux des quantiles des profils intermédiaires (croissants)
+        facteur_min: Marge appliquée au minimum
+        facteur_max: Marge appliquée au maximum
+        criteres: Critères à utiliser (par défaut CRITERES)
     
     Returns:
-        DataFrame contenant les 6 profils
+        DataFrame contenant les len(quantiles) + 2 profils
     """
-    criteres = ['Energie_kJ', 'Acides_Gras_Satures_g', 'Sucres_g', 'Sodium_mg',
-                'Proteines_g', 'Fibres_g', 'Fruits_Legumes_Pct', 'Nombre_Additifs']
-    
-    profils = pd.DataFrame(index=['b1', 'b2', 'b3', 'b4', 'b5', 'b6'], 
-                          columns=criteres)
-    
-    # Pour les critères à minimiser, b6 (meilleur) = valeur minimale
-    # Pour les critères à maximiser, b6 (meilleur) = valeur maximale
-    
-    criteres_minimiser = ['Energie_kJ', 'Acides_Gras_Satures_g', 'Sucres_g', 
-                         'Sodium_mg', 'Nombre_Additifs']
-    criteres_maximiser = ['Proteines_g', 'Fibres_g', 'Fruits_Legumes_Pct']
-    
-    # b1 : borne inférieure (pire)
-    # b6 : borne supérieure (meilleur)
-    
-    for critere in criteres:
-        if critere in criteres_minimiser:
-            # Pour minimiser : b6 = min, b1 = max + marge
-            profils.loc['b6', critere] = df[critere].min() * 0.1  # 10% du min
-            profils.loc['b5', critere] = df[critere].quantile(0.20)
-            profils.loc['b4', critere] = df[critere].quantile(0.40)
-            profils.loc['b3', critere] = df[critere].quantile(0.60)
-            profils.loc['b2', critere] = df[critere].quantile(0.80)
-            profils.loc['b1', critere] = df[critere].max() * 1.5  # 150% du max
-        else:
-            # Pour maximiser : b6 = max, b1 = min - marge
-            profils.loc['b6', critere] = df[critere].max() * 1.5  # 150% du max
-            profils.loc['b5', critere] = df[critere].quantile(0.80)
-            profils.loc['b4', critere] = df[critere].quantile(0.60)
-            profils.loc['b3', critere] = df[critere].quantile(0.40)
-            profils.loc['b2', critere] = df[critere].quantile(0.20)
-            profils.loc['b1', critere] = df[critere].min() * 0.1  # 10% du min
-    
-    return profils.astype(float)
+    if criteres is None:
+        criteres = CRITERES
+    
+    valeurs = df[criteres].astype(float)
+    table_quantiles = valeurs.quantile(sorted(quantiles))
+    
+    return profils_depuis_statistiques(valeurs.min(), valeurs.max(), table_quantiles,
+                                       facteur_min, facteur_max)
 
 
 def definir_poids_criteres() -> Dict[str, float]:
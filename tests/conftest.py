@@ -0,0 +1,21 @@
+"""
+Configuration commune des tests : modules du projet importables depuis la
+racine, base réelle chargée une fois par session
+"""
+
+import os
+import sys
+
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from ingestion import charger_dataframe  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def base(tmp_path_factory):
+    """Base réelle (base_donnees_boissons.csv), cache dans un dossier temporaire"""
+    return charger_dataframe(os.path.join(RACINE, 'base_donnees_boissons.csv'),
+                             dossier_cache=str(tmp_path_factory.mktemp('cache')))
@@ -0,0 +1,44 @@
+"""
+Validation croisée de la calibration : plis stratifiés et scores mesurés sur
+des produits absents de la calibration
+"""
+
+import numpy as np
+import pytest
+
+from calibration import COLONNE_LABEL, plis_stratifies, valider
+from supernutriscore import AnalyseResultats
+
+
+def test_plis_stratifies(base):
+    plis = plis_stratifies(base[COLONNE_LABEL], 5)
+    effectifs = np.bincount(plis, minlength=5)
+    assert effectifs.max() - effectifs.min() <= 1
+    for _, labels in base.groupby(COLONNE_LABEL)[COLONNE_LABEL]:
+        par_pli = np.bincount(plis[base.index.get_indexer(labels.index)], minlength=5)
+        assert par_pli.max() - par_pli.min() <= 1
+
+
+def test_score_validation_sur_plis_non_vus(base, monkeypatch):
+    import calibration
+    
+    calibres = []
+    calibrer = calibration.calibrer
+    
+    def calibrer_et_garder(df, *args, **kwargs):
+        resultat = calibrer(df, *args, **kwargs)
+        calibres.append((set(df.index), resultat['electre']))
+        return resultat
+    
+    monkeypatch.setattr(calibration, 'calibrer', calibrer_et_garder)
+    validation = valider(base, n_plis=4, n_passes=2, n_travailleurs=1)
+    
+    plis = plis_stratifies(base[COLONNE_LABEL], 4)
+    for pli, (apprentissage, electre) in enumerate(calibres):
+        validation_pli = base[plis == pli]
+        assert apprentissage.isdisjoint(validation_pli.index)
+        classes = electre.classifier_base_donnees(validation_pli, 'pessimiste')
+        matrice = AnalyseResultats.matrice_confusion(validation_pli[COLONNE_LABEL], classes)
+        attendu = AnalyseResultats.calculer_metriques(matrice)['accuracy']
+        assert validation['plis']['score_validation'].iloc[pli] == pytest.approx(attendu)
+    assert validation['score_validation'] == validation['plis']['score_validation'].mean()
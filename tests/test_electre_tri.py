@@ -0,0 +1,104 @@
+"""
+Moteurs d'ELECTRE TRI (tenseur, masques, dichotomie, crédibilité) : mêmes
+classes que l'affectation scalaire produit par produit
+(affectation_pessimiste / affectation_optimiste) sur la base réelle
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from supernutriscore import ElectreTri, creer_profils_limites, definir_poids_criteres
+
+
+LAMBDAS = (0.55, 0.6, 0.7, 0.8)
+METHODES = ('pessimiste', 'optimiste')
+
+
+@pytest.fixture(scope='module')
+def lignes(base):
+    return [ligne for _, ligne in base.iterrows()]
+
+
+def profils_de(base: pd.DataFrame, cas: str) -> pd.DataFrame:
+    profils = creer_profils_limites(base)
+    if cas == 'k12':
+        return creer_profils_limites(base, quantiles=tuple(np.linspace(0.1, 0.9, 10)))
+    if cas == 'melanges':
+        return profils.sample(frac=1, random_state=0)
+    if cas == 'non_ordonnes':
+        profils.loc['b4', 'Sucres_g'] = profils.loc['b2', 'Sucres_g']
+    return profils
+
+
+def seuils_de(profils: pd.DataFrame, cas: str) -> pd.DataFrame:
+    if cas == 'aucun':
+        return None
+    if cas == 'nuls':
+        return pd.DataFrame(0.0, index=['q', 'p', 'v'], columns=list(definir_poids_criteres()))
+    ecart = (profils.max() - profils.min()) / (len(profils) - 1)
+    seuils = pd.DataFrame([ecart * 0.1, ecart * 0.3, ecart * 1.5], index=['q', 'p', 'v'])
+    seuils.loc['v', 'Proteines_g'] = np.nan
+    return seuils
+
+
+def indices_scalaires(electre: ElectreTri, lignes: list, methode: str) -> np.ndarray:
+    affecter = getattr(electre, f'affectation_{methode}')
+    return np.array([electre.CLASSES.index(affecter(ligne)) for ligne in lignes])
+
+
+@pytest.mark.parametrize('cas_seuils', ['aucun', 'nuls', 'actifs'])
+@pytest.mark.parametrize('cas_profils', ['defaut', 'k12', 'melanges', 'non_ordonnes'])
+def test_moteurs_comme_affectation_scalaire(base, lignes, cas_profils, cas_seuils):
+    profils = profils_de(base, cas_profils)
+    seuils = seuils_de(profils, cas_seuils)
+    poids = definir_poids_criteres()
+    
+    for lambda_seuil in LAMBDAS:
+        electre = ElectreTri(poids, profils, lambda_seuil, seuils=seuils)
+        assert electre.profils_ordonnes() == (cas_profils != 'non_ordonnes')
+        assert electre.a_seuils() == (cas_seuils == 'actifs')
+        C_ab, C_ba = electre.concordances_lot(base)
+        
+        for methode in METHODES:
+            attendu = indices_scalaires(electre, lignes, methode)
+            np.testing.assert_array_equal(electre.indices_classes(base, methode), attendu)
+            np.testing.assert_array_equal(
+                electre.indices_classes_lot(C_ab, C_ba, methode), attendu)
+            
+            if cas_seuils != 'actifs':
+                masques = ElectreTri(poids, profils, lambda_seuil, moteur='masques')
+                M_ab, M_ba = masques.masques_comparaison(base)
+                C_ab_m, C_ba_m = masques.concordances_depuis_masques(
+                    M_ab, M_ba, masques.table_poids_sous_ensembles())
+                np.testing.assert_array_equal(
+                    masques.indices_classes_lot(C_ab_m, C_ba_m, methode), attendu)
+
+
+def test_seuils_nuls_concordances_identiques(base):
+    poids = definir_poids_criteres()
+    profils = creer_profils_limites(base)
+    sans = ElectreTri(poids, profils).concordances_lot(base)
+    nuls = ElectreTri(poids, profils, seuils=seuils_de(profils, 'nuls')).concordances_lot(base)
+    for a, b in zip(sans, nuls):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_profils_melanges_memes_classes(base):
+    poids = definir_poids_criteres()
+    profils = creer_profils_limites(base)
+    reference = ElectreTri(poids, profils).classifier_lot(base)
+    for graine in range(3):
+        melanges = ElectreTri(poids, profils.sample(frac=1, random_state=graine))
+        assert melanges.PROFILS == list(profils.index)
+        pd.testing.assert_frame_equal(melanges.classifier_lot(base), reference)
+
+
+@pytest.mark.parametrize('seuils', [
+    pd.DataFrame({'Sucres_g': {'q': 1.0, 'p': 2.0, 'v': 5.0}}).T,
+    pd.DataFrame({'Sucre_g': {'q': 1.0, 'p': 2.0, 'v': 5.0}}),
+    pd.DataFrame({'Sucres_g': {'Q': 1.0, 'P': 2.0, 'V': 5.0}})
+], ids=['transposes', 'critere_inconnu', 'majuscules'])
+def test_seuils_mal_formes(base, seuils):
+    with pytest.raises(ValueError):
+        ElectreTri(definir_poids_criteres(), creer_profils_limites(base), seuils=seuils)
@@ -0,0 +1,112 @@
+"""
+Reclassification incrémentale : après chaque delta ou changement de
+paramètres, les résultats doivent être ceux d'un calcul complet sur la base
+à jour
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reclassification_incrementale import ReclassificationIncrementale
+from supernutriscore import creer_profils_limites, definir_poids_criteres
+
+
+def entrees(modele: ReclassificationIncrementale, df: pd.DataFrame) -> pd.DataFrame:
+    return df[[modele.colonne_cle] + modele.colonnes_entrees]
+
+
+def verifier_comme_complet(modele: ReclassificationIncrementale, df: pd.DataFrame):
+    """resultats() identiques à ceux d'un modèle neuf chargé avec toute la base"""
+    complet = ReclassificationIncrementale(modele.poids, modele.configurations,
+                                           modele.colonne_cle, modele.profils_fixes)
+    complet.mettre_a_jour(entrees(complet, df))
+    attendu = complet.resultats()
+    obtenu = modele.resultats().loc[attendu.index]
+    pd.testing.assert_frame_equal(obtenu, attendu)
+
+
+@pytest.fixture
+def modele(base):
+    modele = ReclassificationIncrementale()
+    modele.mettre_a_jour(entrees(modele, base))
+    return modele
+
+
+def test_premier_chargement(modele, base):
+    verifier_comme_complet(modele, base)
+
+
+def test_delta_modifies_et_nouveaux(modele, base):
+    rng = np.random.default_rng(0)
+    modifies = base.sample(20, random_state=1).copy()
+    modifies['Sucres_g'] += rng.uniform(0, 10, len(modifies))
+    modifies['Proteines_g'] *= 1.5
+    nouveaux = base.sample(5, random_state=2).copy()
+    nouveaux['Code_Barres'] = np.arange(10 ** 12, 10 ** 12 + len(nouveaux))
+    nouveaux['Sodium_mg'] += 100
+    
+    rapport = modele.mettre_a_jour(entrees(modele, pd.concat([modifies, nouveaux])))
+    assert rapport['nouveaux'] == 5
+    
+    a_jour = base.set_index('Code_Barres')
+    a_jour.loc[modifies['Code_Barres']] = modifies.set_index('Code_Barres')
+    a_jour = pd.concat([a_jour, nouveaux.set_index('Code_Barres')]).reset_index()
+    verifier_comme_complet(modele, a_jour)
+
+
+def test_base_complete_avec_suppressions(modele, base):
+    restants = base.drop(index=base.sample(15, random_state=3).index)
+    rapport = modele.mettre_a_jour(entrees(modele, restants), supprimer_absents=True)
+    assert rapport['supprimes'] == 15
+    verifier_comme_complet(modele, restants)
+
+
+def test_supprimer(modele, base):
+    cles = base['Code_Barres'].iloc[:10]
+    modele.supprimer(cles)
+    verifier_comme_complet(modele, base.iloc[10:])
+
+
+def test_changement_poids(modele, base):
+    poids = definir_poids_criteres()
+    poids['Sucres_g'] *= 2
+    poids['Fibres_g'] /= 2
+    modele.changer_parametres(poids=poids)
+    verifier_comme_complet(modele, base)
+
+
+@pytest.mark.parametrize('configurations', [
+    ((0.65, 'pessimiste'), (0.6, 'optimiste'), (0.7, 'pessimiste'), (0.75, 'optimiste')),
+    ((0.6, 'optimiste'), (0.55, 'pessimiste')),
+    ((0.6, 'pessimiste'), (0.6, 'optimiste'), (0.7, 'pessimiste'), (0.7, 'optimiste'),
+     (0.8, 'pessimiste'))
+])
+def test_changement_lambda_et_procedure(modele, base, configurations):
+    modele.changer_parametres(configurations=configurations)
+    verifier_comme_complet(modele, base)
+
+
+def test_profils_fixes_autre_nombre_puis_retour(modele, base):
+    huit = creer_profils_limites(base, quantiles=(0.15, 0.3, 0.45, 0.6, 0.75, 0.9))
+    modele.changer_parametres(profils=huit)
+    verifier_comme_complet(modele, base)
+    
+    six = creer_profils_limites(base)
+    six.loc['b3', 'Sucres_g'] *= 1.2
+    modele.changer_parametres(profils=six)
+    verifier_comme_complet(modele, base)
+
+
+def test_sauvegarde_et_rechargement(modele, base, tmp_path):
+    chemin = str(tmp_path / 'etat.pkl')
+    modele.sauvegarder(chemin)
+    recharge = ReclassificationIncrementale.charger(chemin)
+    
+    delta = base.sample(10, random_state=4).copy()
+    delta['Energie_kJ'] *= 2
+    recharge.mettre_a_jour(entrees(recharge, delta))
+    
+    a_jour = base.set_index('Code_Barres')
+    a_jour.loc[delta['Code_Barres']] = delta.set_index('Code_Barres')
+    verifier_comme_complet(recharge, a_jour.reset_index())